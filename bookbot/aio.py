@@ -0,0 +1,143 @@
+import asyncio
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor
+from pathlib import Path
+from typing import AsyncIterator, Dict, List, NamedTuple, Optional, Sequence, Set
+
+from .cache import ResultCache
+from .corpus import STDIN, collect_file_infos
+from .metrics.engine import analyze_stream
+from .parallel import plan_in_segments, plan_largest_first, run_unit
+
+# asyncio front end for embedding bookbot in async services: files are read
+# and counted on a process pool (small files batched into shared tasks, as
+# the CLI does) while the event loop only waits for results.
+
+
+class FileResult(NamedTuple):
+    path: str
+    results: Optional[Dict[str, object]]
+    error: Optional[str] = None
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def shared_pool(jobs: Optional[int] = None) -> Executor:
+    # One process pool for every call in this process, started on first use.
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=jobs or os.cpu_count() or 1)
+    return _pool
+
+
+def shutdown_pool() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(cancel_futures=True)
+        _pool = None
+
+
+def _analyze_file(path: str, metrics: Sequence[str], options: Dict[str, object]) -> FileResult:
+    try:
+        return FileResult(path, analyze_stream(path, metrics, **options))
+    except Exception as e:
+        return FileResult(path, None, str(e))
+
+
+async def stream_results(
+    paths: Sequence[str | Path],
+    metrics: Sequence[str],
+    *,
+    letters_only: bool = False,
+    stopwords: Optional[Set[str]] = None,
+    n: int = 2,
+    normalize_form: Optional[str] = None,
+    ascii_only: bool = False,
+    skip: int = 0,
+    epsilon: Optional[float] = None,
+    approx: Optional[int] = None,
+    cache: Optional[ResultCache] = None,
+    include: Optional[Sequence[str]] = None,
+    exclude: Optional[Sequence[str]] = None,
+    extensions: Optional[Sequence[str]] = None,
+    executor: Optional[Executor] = None,
+    concurrency: Optional[int] = None,
+    ordered: bool = False,
+) -> AsyncIterator[FileResult]:
+    # Yields one FileResult per file found under `paths` (see walk_files),
+    # as files finish or, with `ordered`, in path order. At most
+    # `concurrency` work units (default: two per CPU) are submitted and not
+    # yet yielded, including results waiting for an earlier path; ordered
+    # work is planned largest first within path-order segments of that many
+    # units, so the next path to yield is always among them. Closing the
+    # iterator early, or cancelling the task consuming it, cancels every
+    # unit that has not started.
+    loop = asyncio.get_running_loop()
+    executor = executor or shared_pool()
+    infos = await loop.run_in_executor(None, collect_file_infos, paths, include, exclude, extensions)
+    options = dict(
+        letters_only=letters_only, stopwords=stopwords, n=n, normalize_form=normalize_form, ascii_only=ascii_only,
+        skip=skip, epsilon=epsilon, approx=approx, cache=cache,
+    )
+    limit = concurrency or 2 * (os.cpu_count() or 1)
+    paths, sizes = [str(i.path) for i in infos], [i.size for i in infos]
+    if ordered:
+        units = list(plan_in_segments(paths, sizes, limit))
+    else:
+        units = plan_largest_first(paths, sizes)
+    # Ordered results hold their unit's slot until the last one is yielded.
+    unit_of = {i: u for u, unit in enumerate(units) for i, _ in unit}
+    unit_left = [len(unit) for unit in units]
+    slots = asyncio.Semaphore(limit)
+    done: asyncio.Queue = asyncio.Queue()
+    pending: Set[asyncio.Future] = set()
+
+    async def submit() -> None:
+        try:
+            for unit in units:
+                await slots.acquire()
+                # Pool workers cannot read this process's standard input.
+                target = None if any(path == STDIN for _, path in unit) else executor
+                fut = loop.run_in_executor(target, run_unit, unit, _analyze_file, list(metrics), options)
+                pending.add(fut)
+                fut.add_done_callback(done.put_nowait)
+        except Exception as e:
+            # e.g. a broken pool: handed to the consumer below to raise.
+            failed = loop.create_future()
+            failed.set_exception(e)
+            done.put_nowait(failed)
+
+    producer = asyncio.ensure_future(submit())
+    buffered: Dict[int, FileResult] = {}
+    emitted = 0
+    remaining = len(infos)
+    try:
+        while remaining:
+            fut = await done.get()
+            pending.discard(fut)
+            if not ordered:
+                slots.release()
+            for i, res in fut.result():
+                remaining -= 1
+                if not ordered:
+                    yield res
+                    continue
+                buffered[i] = res
+                while emitted in buffered:
+                    yield buffered.pop(emitted)
+                    u = unit_of.pop(emitted)
+                    unit_left[u] -= 1
+                    if not unit_left[u]:
+                        slots.release()
+                    emitted += 1
+    finally:
+        producer.cancel()
+        for fut in pending:
+            fut.cancel()
+
+
+async def analyze_many(paths: Sequence[str | Path], metrics: Sequence[str], **kwargs) -> List[FileResult]:
+    # Every file's FileResult, in path order; accepts stream_results' options.
+    kwargs["ordered"] = True
+    return [res async for res in stream_results(paths, metrics, **kwargs)]
@@ -0,0 +1,245 @@
+import heapq
+from array import array
+from collections.abc import Mapping
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Set, Tuple
+
+from .cache import ResultCache
+from .corpus import STDIN, collect_file_infos
+from .metrics.counts import NgramCounts, ngram_label
+from .metrics.engine import analyze_stream
+from .parallel import map_largest_first, process_pool
+
+# Library interface returning compact results. A frequency table is two
+# parallel arrays (keys, counts) instead of one {"word": k, "num": v} dict
+# per row: the keys are the analysis' own key objects (n-grams stay packed
+# ints) and the counts an array of the narrowest unsigned integer type.
+# Rows, labels and JSON are only built for the rows a caller asks for.
+
+_KEY_FIELDS = {"chars": "char", "words": "word"}
+
+
+def _int_array(values) -> array:
+    # The narrowest unsigned array holding every value: most counts are small.
+    values = array("Q", values)
+    largest = max(values, default=0)
+    for code in "BHI":
+        if largest < 1 << (8 * array(code).itemsize):
+            return array(code, values)
+    return values
+
+
+class Table:
+    # `errors`, when set, holds each row's largest possible undercount
+    # (approximate counts, see ApproxCounts); anything missing occurred at
+    # most `max_error` times out of `total` items counted.
+    __slots__ = ("key_field", "keys", "counts", "errors", "max_error", "_total", "_codec", "_index")
+
+    def __init__(
+        self,
+        key_field: str,
+        keys: Sequence,
+        counts: array,
+        errors: Optional[array] = None,
+        max_error: Optional[int] = None,
+        total: Optional[int] = None,
+        codec: Optional[NgramCounts] = None,
+    ):
+        self.key_field = key_field
+        self.keys = keys
+        self.counts = counts
+        self.errors = errors
+        self.max_error = max_error
+        self._total = total
+        self._codec = codec
+        self._index: Optional[Dict[str, int]] = None
+
+    @classmethod
+    def from_counts(cls, counts: Mapping, key_field: str) -> "Table":
+        codec = None
+        source = counts
+        if isinstance(counts, NgramCounts):
+            # Only the word list is kept to decode packed keys; bigram keys
+            # fit an unsigned 64-bit array.
+            codec = NgramCounts(counts.n, counts.words, {})
+            source = counts.packed
+            keys = array("Q", source) if counts.n <= 2 else list(source)
+        else:
+            keys = list(source)
+        errors = max_error = total = None
+        if getattr(counts, "errors", None) is not None:
+            errors = _int_array(counts.errors.get(k, 0) for k in keys)
+            max_error, total = counts.floor, counts.total
+        return cls(key_field, keys, _int_array(source.values()), errors, max_error, total, codec)
+
+    def __getstate__(self):
+        return self.key_field, self.keys, self.counts, self.errors, self.max_error, self._total, self._codec
+
+    def __setstate__(self, state):
+        self.key_field, self.keys, self.counts, self.errors, self.max_error, self._total, self._codec = state
+        self._index = None
+
+    def __len__(self) -> int:
+        return len(self.counts)
+
+    def __repr__(self) -> str:
+        return f"<Table {self.key_field}: {len(self)} rows, total {self.total}>"
+
+    @property
+    def total(self) -> int:
+        # Items counted: the sum of the counts unless they are approximate.
+        return sum(self.counts) if self._total is None else self._total
+
+    def label(self, i: int) -> str:
+        key = self.keys[i]
+        if self._codec is not None:
+            return ngram_label(self._codec.decode(key))
+        return ngram_label(key) if isinstance(key, tuple) else key
+
+    def __getitem__(self, key) -> int:
+        # Count of a key (a char, word, n-gram tuple or "a b" label), 0 if absent.
+        if self._index is None:
+            self._index = {self.label(i): i for i in range(len(self))}
+        i = self._index.get(ngram_label(key) if isinstance(key, tuple) else key)
+        return 0 if i is None else self.counts[i]
+
+    def __contains__(self, key) -> bool:
+        return self[key] > 0
+
+    def top(self, k: Optional[int] = None, sort_by: str = "count", desc: bool = True) -> "Table":
+        # Same order as rank_rows(): ties keep first appearance, and with `k`
+        # only the survivors are labelled.
+        if sort_by == "count":
+            key = self.counts.__getitem__
+        else:
+            key = self.label
+        rows = range(len(self))
+        if k is None or k < 0:
+            order = sorted(rows, key=key, reverse=desc)
+            if k is not None:
+                order = order[:k]
+        elif desc:
+            order = heapq.nlargest(k, rows, key=key)
+        else:
+            order = heapq.nsmallest(k, rows, key=key)
+        return self.take(order)
+
+    def take(self, rows: Sequence[int]) -> "Table":
+        # The given rows, in that order; `total` stays the whole table's.
+        keys = self.keys
+        keys = array(keys.typecode, (keys[i] for i in rows)) if isinstance(keys, array) else [keys[i] for i in rows]
+        counts = array(self.counts.typecode, (self.counts[i] for i in rows))
+        errors = None if self.errors is None else array(self.errors.typecode, (self.errors[i] for i in rows))
+        return Table(self.key_field, keys, counts, errors, self.max_error, self.total, self._codec)
+
+    def items(self) -> Iterator[Tuple[str, int]]:
+        return ((self.label(i), self.counts[i]) for i in range(len(self)))
+
+    def rows(self) -> Iterator[Dict[str, int]]:
+        # Row dicts as in formats.py (CharsItem, WordsItem, NgramItem), one at a time.
+        field = self.key_field
+        if self.errors is not None:
+            return ({field: k, "num": v, "err": e} for (k, v), e in zip(self.items(), self.errors))
+        return ({field: k, "num": v} for k, v in self.items())
+
+    def to_json(self) -> List[Dict[str, int]]:
+        return list(self.rows())
+
+
+class FileAnalysis:
+    # One file's results. Frequency tables are Tables (`ngrams` maps each
+    # n-gram metric, e.g. "ngrams" or "ngrams3", to its Table); readability,
+    # vocab and categories are their usual small dicts. Metrics that were
+    # not requested are None.
+    __slots__ = ("path", "num_words", "chars", "words", "ngrams", "readability", "vocab", "categories")
+
+    def __init__(self, path: str, results: Dict[str, object]):
+        self.path = path
+        self.num_words: Optional[int] = results.get("num_words")
+        self.chars = self.words = None
+        self.ngrams: Dict[str, Table] = {}
+        for metric, value in results.items():
+            if metric in _KEY_FIELDS:
+                setattr(self, metric, Table.from_counts(value, _KEY_FIELDS[metric]))
+            elif metric.startswith("ngrams"):
+                self.ngrams[metric] = Table.from_counts(value, "ngram")
+        self.readability: Optional[Dict[str, object]] = results.get("readability")
+        self.vocab: Optional[Dict[str, float]] = results.get("vocab")
+        self.categories: Optional[Dict[str, int]] = results.get("categories")
+
+    def __getstate__(self):
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def __setstate__(self, state):
+        for name, value in zip(self.__slots__, state):
+            setattr(self, name, value)
+
+    def __repr__(self) -> str:
+        return f"<FileAnalysis {self.path}>"
+
+    def to_json(self, top: Optional[int] = None) -> Dict[str, object]:
+        # An AnalyzeFile dict (formats.py) with the `top` rows of each table.
+        out: Dict[str, object] = {"path": self.path}
+        if self.num_words is not None:
+            out["num_words"] = self.num_words
+        tables = {"chars": self.chars, "words": self.words, **self.ngrams}
+        for metric, table in tables.items():
+            if table is not None:
+                out[metric] = table.top(top).to_json()
+        for metric in ("readability", "vocab", "categories"):
+            value = getattr(self, metric)
+            if value is not None:
+                out[metric] = value
+        return out
+
+
+def analyze(
+    path: str | Path,
+    metrics: Sequence[str],
+    *,
+    letters_only: bool = False,
+    stopwords: Optional[Set[str]] = None,
+    n: int = 2,
+    normalize_form: Optional[str] = None,
+    ascii_only: bool = False,
+    jobs: int = 1,
+    cache: Optional[ResultCache] = None,
+    skip: int = 0,
+    epsilon: Optional[float] = None,
+    approx: Optional[int] = None,
+) -> FileAnalysis:
+    results = analyze_stream(
+        path, metrics, letters_only=letters_only, stopwords=stopwords, n=n, normalize_form=normalize_form,
+        ascii_only=ascii_only, jobs=jobs, cache=cache, skip=skip, epsilon=epsilon, approx=approx,
+    )
+    return FileAnalysis(str(path), results)
+
+
+def _analyze_file(path: str, metrics: Sequence[str], options: Dict[str, object]) -> FileAnalysis:
+    return analyze(path, metrics, **options)
+
+
+def analyze_files(
+    paths: Sequence[str | Path],
+    metrics: Sequence[str],
+    *,
+    jobs: int = 1,
+    include: Optional[Sequence[str]] = None,
+    exclude: Optional[Sequence[str]] = None,
+    extensions: Optional[Sequence[str]] = None,
+    **options,
+) -> Iterator[FileAnalysis]:
+    # One FileAnalysis per file found under `paths` (see walk_files), in
+    # path order; accepts analyze()'s options. With `jobs`, files are
+    # analyzed on a process pool and sent back in their compact form.
+    infos = collect_file_infos(paths, include, exclude, extensions)
+    files = [str(i.path) for i in infos]
+    # Pool workers cannot read this process's standard input.
+    if jobs <= 1 or STDIN in files:
+        for path in files:
+            yield _analyze_file(path, metrics, options)
+        return
+    with process_pool(jobs) as executor:
+        yield from map_largest_first(
+            executor, _analyze_file, files, list(metrics), options, window=2 * jobs, sizes=[i.size for i in infos]
+        )
@@ -0,0 +1,229 @@
+import hashlib
+import json
+import os
+import pickle
+import re
+import tempfile
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from .corpus import MEMBER_SEP, split_member
+
+# Bump whenever the shape of cached analysis results changes.
+CACHE_VERSION = 4
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024
+# Entries are <root>/<first two hex digits>/<sha256 hex>.pkl.
+_SHARD_NAME = re.compile(r"[0-9a-f]{2}")
+_ENTRY_NAME = re.compile(r"[0-9a-f]{64}\.pkl")
+
+
+def default_cache_dir() -> Path:
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return Path(base) / "bookbot"
+
+
+def _file_digest(path: str | Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _hash_range(h, path: str | Path, start: int, end: int):
+    # Feeds bytes [start, end) of the file to hash object `h`.
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = end - start
+        while remaining > 0:
+            block = f.read(min(remaining, 1 << 20))
+            if not block:
+                raise OSError(f"{path}: shorter than {end} bytes")
+            h.update(block)
+            remaining -= len(block)
+    return h
+
+
+class ResultCache:
+    # Per-file analysis results keyed by path, size, mtime (and optionally a
+    # content hash) plus the analysis options. Entries are pickled files;
+    # a hit refreshes the entry's mtime, which prune() uses as LRU order.
+    # With `checkpoints`, the analysis state of each file's complete lines is
+    # also kept (keyed by path and options only), so a file that has only
+    # grown since is analyzed from where the last run stopped.
+    #
+    # In a long-running process (`bookbot serve` and its workers) up to
+    # `memory_entries` recently used entries are also kept in memory, still
+    # pickled so that every caller gets its own copy.
+
+    memory_entries = 0
+    _memory: "OrderedDict[str, bytes]" = OrderedDict()
+
+    def __init__(
+        self, root: str | Path, max_bytes: int = DEFAULT_MAX_BYTES, hash_contents: bool = False, checkpoints: bool = False
+    ):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.hash_contents = hash_contents
+        self.checkpoints = checkpoints
+        self._prefix = None
+
+    def key(self, path: str | Path, options: tuple) -> Optional[str]:
+        # An archive member is keyed by the archive file's size and mtime.
+        archive, member = split_member(path)
+        try:
+            st = os.stat(archive)
+            ident = {
+                "version": CACHE_VERSION,
+                "path": os.path.abspath(archive) + (MEMBER_SEP + member if member is not None else ""),
+                "size": st.st_size,
+                "mtime_ns": st.st_mtime_ns,
+                "sha256": _file_digest(archive) if self.hash_contents else None,
+                "options": options,
+            }
+        except OSError:
+            return None
+        blob = json.dumps(ident, sort_keys=True, default=list).encode("utf-8")
+        return hashlib.sha256(blob).hexdigest()
+
+    def _checkpoint_key(self, path: str | Path, options: tuple) -> str:
+        ident = {"version": CACHE_VERSION, "checkpoint": os.path.abspath(path), "options": options}
+        blob = json.dumps(ident, sort_keys=True, default=list).encode("utf-8")
+        return hashlib.sha256(blob).hexdigest()
+
+    def get_checkpoint(self, path: str | Path, options: tuple) -> Optional[Tuple[int, object]]:
+        # (offset, state) saved for a prefix of the file that is still
+        # intact, or None if there is none or the file was truncated or
+        # rewritten since. The whole prefix is hashed: reading it is far
+        # cheaper than analyzing it, and an edit anywhere must be caught.
+        entry = self.get(self._checkpoint_key(path, options))
+        if entry is None:
+            return None
+        offset = entry["offset"]
+        try:
+            if os.path.getsize(path) < offset:
+                return None
+            h = _hash_range(hashlib.sha256(), path, 0, offset)
+        except OSError:
+            return None
+        if h.hexdigest() != entry["digest"]:
+            return None
+        # put_checkpoint() carries on from here instead of re-reading the prefix.
+        self._prefix = (os.path.abspath(path), offset, h)
+        return offset, entry["state"]
+
+    def put_checkpoint(self, path: str | Path, options: tuple, offset: int, state: object) -> None:
+        start, h = 0, hashlib.sha256()
+        if self._prefix is not None and self._prefix[0] == os.path.abspath(path) and self._prefix[1] <= offset:
+            start, h = self._prefix[1], self._prefix[2]
+        self._prefix = None
+        try:
+            digest = _hash_range(h, path, start, offset).hexdigest()
+        except OSError:
+            return
+        self.put(self._checkpoint_key(path, options), {"offset": offset, "digest": digest, "state": state})
+
+    def _entry(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.pkl"
+
+    def _remember(self, key: str, blob: bytes) -> None:
+        if self.memory_entries:
+            self._memory[key] = blob
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def get(self, key: Optional[str]) -> Optional[Dict[str, object]]:
+        if key is None:
+            return None
+        blob = self._memory.get(key)
+        if blob is not None:
+            self._memory.move_to_end(key)
+            return pickle.loads(blob)
+        entry = self._entry(key)
+        try:
+            with open(entry, "rb") as f:
+                blob = f.read()
+            value = pickle.loads(blob)
+            os.utime(entry)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+        self._remember(key, blob)
+        return value
+
+    def put(self, key: Optional[str], value: Dict[str, object]) -> None:
+        if key is None:
+            return
+        entry = self._entry(key)
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        self._remember(key, blob)
+        try:
+            entry.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=entry.parent, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(blob)
+            os.replace(tmp, entry)
+        except OSError:
+            pass
+
+    def _entries(self):
+        if not self.root.is_dir():
+            return []
+        entries = []
+        for sub in os.scandir(self.root):
+            if not (_SHARD_NAME.fullmatch(sub.name) and sub.is_dir()):
+                continue
+            for e in os.scandir(sub.path):
+                if _ENTRY_NAME.fullmatch(e.name) and e.name.startswith(sub.name):
+                    try:
+                        st = e.stat()
+                    except OSError:
+                        continue
+                    entries.append((st.st_mtime, st.st_size, e.path))
+        return entries
+
+    def stats(self) -> Dict[str, object]:
+        entries = self._entries()
+        return {
+            "path": str(self.root),
+            "entries": len(entries),
+            "bytes": sum(size for _, size, _ in entries),
+            "max_bytes": self.max_bytes,
+        }
+
+    def prune(self, max_bytes: Optional[int] = None) -> int:
+        limit = self.max_bytes if max_bytes is None else max_bytes
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in entries:
+            if total <= limit:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        return removed
+
+    def clear(self) -> int:
+        # Removes only cache entries and the shard directories they leave
+        # empty: --cache-dir may point anywhere, and nothing else in it is ours.
+        self._memory.clear()
+        removed = 0
+        shards = set()
+        for _, _, path in self._entries():
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            removed += 1
+            shards.add(os.path.dirname(path))
+        for shard in shards:
+            try:
+                os.rmdir(shard)
+            except OSError:
+                pass
+        return removed
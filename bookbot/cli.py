@@ -1,28 +1,33 @@
 import argparse
+import hashlib
+import html
 import json
 import logging
+import os
+import re
 import sys
-from concurrent.futures import ProcessPoolExecutor
+import time
+from itertools import chain, islice
 from pathlib import Path
 from typing import List
 
-from .corpus import collect_files, get_book_text
-from .metrics.categories import category_counts
+from .cache import DEFAULT_MAX_BYTES, ResultCache, default_cache_dir
+from .corpus import MEMBER_SEP, STDIN, FileInfo, collect_file_infos, walk_files
 from .metrics.counts import (
-    count_ngrams,
-    count_ngrams_stream,
-    count_chars_stream,
-    get_num_chars_dict,
-    get_num_words,
-    get_num_words_whitespace_stream,
-    get_word_counts,
-    get_word_counts_stream,
+    merge_packed_counts,
+    ngram_label,
+    pack_counts,
+    rank_counts,
+    rank_pairs,
+    rank_rows,
     sort_counts,
     sort_ngrams,
     sort_words,
+    unpack_counts,
 )
-from .metrics.readability import readability_metrics
-from .metrics.vocabulary import STOPWORDS_EN, vocabulary_metrics
+from .metrics.engine import analyze_stream
+from .metrics.vocabulary import STOPWORDS_EN
+from .parallel import map_discovered, map_largest_first, process_pool, tree_reduce_stream
 from .rendering import (
     print_histogram,
     render_table_csv,
@@ -30,59 +35,206 @@ from .rendering import (
     render_table_md,
     render_table_text,
 )
+from .server import serve
+from .watch import DEBOUNCE_SECONDS, POLL_SECONDS, Watcher, watch_results
 
 
 logger = logging.getLogger("bookbot")
 
 
-def _sort_items(items, sort_by: str, desc: bool, key_field: str):
-    if sort_by == "count":
-        return sorted(items, key=lambda x: x["num"], reverse=desc)
-    return sorted(items, key=lambda x: str(x[key_field]), reverse=desc)
+# Work units allowed in flight per worker: enough to keep every worker busy
+# while output is rendered, without holding thousands of pending results.
+_WINDOW_PER_WORKER = 4
 
 
-def _mp_chars_task(path: str, letters_only: bool, sort: str, asc: bool, top: int | None, normalize: str, ascii_only: bool):
+def _collect_files(args):
+    # A sorted list of FileInfo, or, for unordered -j runs, a lazy iterator
+    # so analysis starts while the tree is still being walked (unless stdin
+    # is among the paths: it has to be read by this process).
+    filters = (args.include, args.exclude, args.ext)
+    lazy = getattr(args, "unordered", False) and args.jobs > 1 and not getattr(args, "aggregate", False)
+    if lazy and STDIN not in args.paths:
+        infos = walk_files(args.paths, *filters, workers=args.jobs)
+        head = list(islice(infos, 2))
+        files = chain(head, infos) if len(head) == 2 else head
+    else:
+        files = collect_file_infos(args.paths, *filters, workers=args.jobs)
+    if not files:
+        print("Error: no files to analyze", file=sys.stderr)
+        sys.exit(1)
+    return files
+
+
+def _is_stdin(f: FileInfo) -> bool:
+    return str(f.path) == STDIN
+
+
+def _map_files(task, files, jobs: int | None, *task_args, ordered: bool = True):
+    window = (jobs or 1) * _WINDOW_PER_WORKER
+    if jobs and jobs > 1 and isinstance(files, list) and any(map(_is_stdin, files)):
+        # Worker processes see /dev/null as stdin, so it is analyzed here
+        # first; "-" sorts before every other path.
+        yield from _map_files(task, [f for f in files if _is_stdin(f)], 1, *task_args)
+        files = [f for f in files if not _is_stdin(f)]
+    if jobs and jobs > 1 and not isinstance(files, list):
+        with process_pool(jobs) as ex:
+            yield from map_discovered(ex, task, ((str(f.path), f.size) for f in files), *task_args, window=window)
+    elif jobs and jobs > 1 and len(files) > 1:
+        with process_pool(jobs) as ex:
+            yield from map_largest_first(
+                ex, task, [str(f.path) for f in files], *task_args, window=window, ordered=ordered, sizes=[f.size for f in files]
+            )
+    else:
+        # A single file can still use the workers by splitting it into byte ranges.
+        for f in files:
+            yield task(str(f.path), *task_args, split_jobs=jobs or 1)
+
+
+def _mp_partial_task(path: str, metric: str, letters_only: bool, stopwords_key: str, n: int, skip: int, epsilon: float | None, approx: int | None, normalize: str, ascii_only: bool, cache: ResultCache | None = None, split_jobs: int = 1):
     try:
-        nw = get_num_words_whitespace_stream(path, normalize_form=normalize, ascii_only=ascii_only)
-        counts = count_chars_stream(path, letters_only=letters_only, normalize_form=normalize, ascii_only=ascii_only)
-        items = sort_counts(counts)
-        items = _sort_items(items, sort, not asc, key_field="char")
-        to_show = items if top is None else items[: top]
-        return {"path": path, "num_words": nw, "items": items, "to_show": to_show}
+        stopwords = STOPWORDS_EN if stopwords_key == "english" else None
+        res = analyze_stream(
+            path,
+            [metric] if metric == "ngrams" else ["num_words", metric],
+            letters_only=letters_only,
+            stopwords=stopwords,
+            n=n,
+            normalize_form=normalize,
+            ascii_only=ascii_only,
+            jobs=split_jobs,
+            cache=cache,
+            skip=skip,
+            epsilon=epsilon,
+            approx=approx,
+        )
+        return {"num_words": res.get("num_words", 0), "counts": pack_counts(res[metric]), "num_files": 1, "errors": []}
+    except Exception as e:
+        return {"num_words": 0, "counts": ([], []), "num_files": 0, "errors": [[path, str(e)]]}
+
+
+def _merge_partials(a: dict, b: dict) -> dict:
+    a["num_words"] += b["num_words"]
+    a["counts"] = pack_counts(merge_packed_counts(unpack_counts(a["counts"]), b["counts"]))
+    a["num_files"] += b["num_files"]
+    a["errors"].extend(b["errors"])
+    return a
+
+
+def _aggregate_files(files, jobs: int | None, metric: str, *task_args) -> dict:
+    if jobs and jobs > 1 and len(files) > 1:
+        with process_pool(jobs) as ex:
+            # Partials come back in path order through the bounded window
+            # (standard input, which sorts first, is read here) and are
+            # merged pairwise on the same pool as they arrive.
+            head = [_mp_partial_task(STDIN, metric, *task_args)] if any(map(_is_stdin, files)) else []
+            rest = [f for f in files if not _is_stdin(f)]
+            parts = map_largest_first(
+                ex, _mp_partial_task, [str(f.path) for f in rest], metric, *task_args,
+                window=jobs * _WINDOW_PER_WORKER, sizes=[f.size for f in rest],
+            )
+            return tree_reduce_stream(ex, chain(head, parts), _merge_partials)
+    total = None
+    for f in files:
+        part = _mp_partial_task(str(f.path), metric, *task_args, split_jobs=jobs or 1)
+        total = part if total is None else _merge_partials(total, part)
+    return total
+
+
+def _aggregate_result(files, args, metric: str, key_field: str, label=None) -> List[dict]:
+    stopwords = getattr(args, "stopwords", "none")
+    total = _aggregate_files(
+        files, args.jobs, metric, getattr(args, "letters_only", False), stopwords, getattr(args, "n", 2), getattr(args, "skip", 0),
+        getattr(args, "epsilon", None), getattr(args, "approx", None), args.normalize, args.ascii_only, _cache_from_args(args),
+    )
+    results = [{"path": path, "error": err} for path, err in total["errors"]]
+    counts = unpack_counts(total["counts"])
+    pairs, errors = rank_rows(counts, args.sort, not args.asc, args.top, label)
+    results.append(
+        {
+            "path": f"corpus ({total['num_files']} files)",
+            "num_words": total["num_words"],
+            **_pack_rows(pairs, errors),
+            **_error_bounds(counts),
+        }
+    )
+    return results
+
+
+# Workers send back only the rows the report shows, as parallel key/count
+# lists; the parent turns them into row dicts. Approximate counts also send
+# each row's largest possible undercount.
+def _pack_rows(pairs, errors=None) -> dict:
+    packed = {"keys": [k for k, _ in pairs], "nums": [v for _, v in pairs]}
+    if errors is not None:
+        packed["errs"] = errors
+    return packed
+
+
+def _unpack_rows(res: dict, key_field: str) -> List[dict]:
+    if "errs" in res:
+        return [{key_field: k, "num": v, "err": e} for k, v, e in zip(res["keys"], res["nums"], res["errs"])]
+    return [{key_field: k, "num": v} for k, v in zip(res["keys"], res["nums"])]
+
+
+def _error_bounds_of(res: dict) -> dict:
+    return {k: res[k] for k in ("max_error", "total") if k in res}
+
+
+def _error_bounds(counts) -> dict:
+    # Approximate counts: anything not reported occurred at most `max_error`
+    # times, out of `total` items counted.
+    if getattr(counts, "errors", None) is None:
+        return {}
+    return {"max_error": counts.floor, "total": counts.total}
+
+
+def _print_error_bounds(args, bounds: dict, unit: str) -> None:
+    method = f"epsilon={args.epsilon}" if getattr(args, "epsilon", None) else f"approx={args.approx}"
+    print(
+        f"Approximate counts ({method}): true counts may be up to (+N) higher; "
+        f"{unit} not kept occurred at most {bounds['max_error']} times ({bounds['total']} counted)"
+    )
+
+
+def _mp_chars_task(path: str, letters_only: bool, sort: str, asc: bool, top: int | None, normalize: str, ascii_only: bool, cache: ResultCache | None = None, split_jobs: int = 1):
+    try:
+        res = analyze_stream(
+            path, ["num_words", "chars"], letters_only=letters_only, normalize_form=normalize, ascii_only=ascii_only, jobs=split_jobs, cache=cache
+        )
+        pairs = rank_pairs(res["chars"], sort, not asc, top)
+        return {"path": path, "num_words": res["num_words"], **_pack_rows(pairs)}
     except Exception as e:
         return {"path": path, "error": str(e)}
 
 
-def _mp_words_task(path: str, stopwords_key: str, sort: str, asc: bool, top: int | None, normalize: str, ascii_only: bool):
+def _mp_words_task(path: str, stopwords_key: str, approx: int | None, sort: str, asc: bool, top: int | None, normalize: str, ascii_only: bool, cache: ResultCache | None = None, split_jobs: int = 1):
     try:
         stopwords = STOPWORDS_EN if stopwords_key == "english" else None
-        nw = get_num_words_whitespace_stream(path, normalize_form=normalize, ascii_only=ascii_only)
-        counts = get_word_counts_stream(path, stopwords=stopwords, normalize_form=normalize, ascii_only=ascii_only)
-        items = sort_words(counts)
-        items = _sort_items(items, sort, not asc, key_field="word")
-        to_show = items if top is None else items[: top]
-        return {"path": path, "num_words": nw, "items": items, "to_show": to_show}
+        res = analyze_stream(
+            path, ["num_words", "words"], stopwords=stopwords, normalize_form=normalize, ascii_only=ascii_only, jobs=split_jobs, cache=cache,
+            approx=approx,
+        )
+        pairs, errors = rank_rows(res["words"], sort, not asc, top)
+        return {"path": path, "num_words": res["num_words"], **_pack_rows(pairs, errors), **_error_bounds(res["words"])}
     except Exception as e:
         return {"path": path, "error": str(e)}
 
 
-def _mp_ngrams_task(path: str, n: int, stopwords_key: str, sort: str, asc: bool, top: int | None, normalize: str, ascii_only: bool):
+def _mp_ngrams_task(path: str, n: int, skip: int, epsilon: float | None, approx: int | None, stopwords_key: str, sort: str, asc: bool, top: int | None, normalize: str, ascii_only: bool, cache: ResultCache | None = None, split_jobs: int = 1):
     try:
         stopwords = STOPWORDS_EN if stopwords_key == "english" else None
-        counts = count_ngrams_stream(path, n=n, stopwords=stopwords, normalize_form=normalize, ascii_only=ascii_only)
-        items = sort_ngrams(counts)
-        items = _sort_items(items, sort, not asc, key_field="ngram")
-        to_show = items if top is None else items[: top]
-        return {"path": path, "n": n, "items": items, "to_show": to_show}
+        res = analyze_stream(
+            path, ["ngrams"], stopwords=stopwords, n=n, normalize_form=normalize, ascii_only=ascii_only, jobs=split_jobs, cache=cache,
+            skip=skip, epsilon=epsilon, approx=approx,
+        )
+        pairs, errors = rank_rows(res["ngrams"], sort, not asc, top, ngram_label)
+        return {"path": path, "n": n, **_pack_rows(pairs, errors), **_error_bounds(res["ngrams"])}
     except Exception as e:
         return {"path": path, "error": str(e)}
 
 
 def run_chars_cmd(args):
-    files = collect_files(args.paths)
-    if not files:
-        print("Error: no files to analyze", file=sys.stderr)
-        sys.exit(1)
+    files = _collect_files(args)
 
     results = []
     flat_rows = []
@@ -92,8 +244,9 @@ def run_chars_cmd(args):
             if not args.quiet:
                 print(f"Error reading '{res['path']}': {res['error']}", file=sys.stderr)
             return
-        results.append({"path": res["path"], "num_words": res["num_words"], "items": res["to_show"]})
-        for it in res["to_show"]:
+        items = _unpack_rows(res, "char")
+        results.append({"path": res["path"], "num_words": res["num_words"], "items": items})
+        for it in items:
             flat_rows.append([res["path"], it["char"], it["num"]])
         if args.format == "text":
             if not args.quiet:
@@ -104,7 +257,7 @@ def run_chars_cmd(args):
                 print("--------- CHARACTER COUNT -----------")
             else:
                 print(f"-- {res['path']}")
-            for it in res["to_show"]:
+            for it in items:
                 ch = it["char"]
                 if args.letters_only and not str(ch).isalpha():
                     continue
@@ -113,22 +266,17 @@ def run_chars_cmd(args):
                 print("============= END =============")
             if args.histogram == "chars":
                 print("\n--------- CHARACTER HISTOGRAM ---------")
-                print_histogram(res["items"], key_field="char", top=args.top)
+                print_histogram(items, key_field="char", top=args.top)
 
-    if args.jobs and args.jobs > 1 and len(files) > 1:
-        with ProcessPoolExecutor(max_workers=args.jobs) as ex:
-            futs = [
-                ex.submit(
-                    _mp_chars_task, str(f), args.letters_only, args.sort, args.asc, args.top, args.normalize, args.ascii_only
-                )
-                for f in files
-            ]
-            for fut in futs:
-                handle_result(fut.result())
+    if args.aggregate:
+        all_results = _aggregate_result(files, args, "chars", "char")
     else:
-        for f in files:
-            res = _mp_chars_task(str(f), args.letters_only, args.sort, args.asc, args.top, args.normalize, args.ascii_only)
-            handle_result(res)
+        all_results = _map_files(
+            _mp_chars_task, files, args.jobs, args.letters_only, args.sort, args.asc, args.top, args.normalize, args.ascii_only, _cache_from_args(args),
+            ordered=not args.unordered,
+        )
+    for res in all_results:
+        handle_result(res)
 
     if args.format == "json":
         payload = {
@@ -138,6 +286,7 @@ def run_chars_cmd(args):
             "sort": args.sort,
             "order": "asc" if args.asc else "desc",
             "top": args.top,
+            **({"aggregate": True} if args.aggregate else {}),
             "files": results,
         }
         output = json.dumps(payload, ensure_ascii=False, indent=2)
@@ -160,10 +309,7 @@ def run_chars_cmd(args):
 
 
 def run_words_cmd(args):
-    files = collect_files(args.paths)
-    if not files:
-        print("Error: no files to analyze", file=sys.stderr)
-        sys.exit(1)
+    files = _collect_files(args)
 
     results = []
     flat_rows = []
@@ -173,9 +319,11 @@ def run_words_cmd(args):
             if not args.quiet:
                 print(f"Error reading '{res['path']}': {res['error']}", file=sys.stderr)
             return
-        results.append({"path": res["path"], "num_words": res["num_words"], "items": res["to_show"]})
-        for it in res["to_show"]:
-            flat_rows.append([res["path"], it["word"], it["num"]])
+        items = _unpack_rows(res, "word")
+        bounds = _error_bounds_of(res)
+        results.append({"path": res["path"], "num_words": res["num_words"], **bounds, "items": items})
+        for it in items:
+            flat_rows.append([res["path"], it["word"], it["num"], *([it["err"]] if "err" in it else [])])
         if args.format == "text":
             if not args.quiet:
                 print("============ BOOKBOT (WORDS) ============")
@@ -183,37 +331,39 @@ def run_words_cmd(args):
                 print("------------ WORD COUNT ------------")
                 print(f"Found {res['num_words']} total words")
                 print("----------- WORD FREQUENCY -----------")
+                if bounds:
+                    _print_error_bounds(args, bounds, "words")
             else:
                 print(f"-- {res['path']}")
-            for it in res["to_show"]:
-                print(f"{it['word']}: {it['num']}")
+            for it in items:
+                if "err" in it:
+                    print(f"{it['word']}: {it['num']} (+{it['err']})")
+                else:
+                    print(f"{it['word']}: {it['num']}")
             if args.histogram == "words":
                 print("\n----------- WORD HISTOGRAM ------------")
-                print_histogram(res["items"], key_field="word", top=args.top)
+                print_histogram(items, key_field="word", top=args.top)
 
-    if args.jobs and args.jobs > 1 and len(files) > 1:
-        with ProcessPoolExecutor(max_workers=args.jobs) as ex:
-            futs = [
-                ex.submit(
-                    _mp_words_task, str(f), args.stopwords, args.sort, args.asc, args.top, args.normalize, args.ascii_only
-                )
-                for f in files
-            ]
-            for fut in futs:
-                handle_result(fut.result())
+    if args.aggregate:
+        all_results = _aggregate_result(files, args, "words", "word")
     else:
-        for f in files:
-            res = _mp_words_task(str(f), args.stopwords, args.sort, args.asc, args.top, args.normalize, args.ascii_only)
-            handle_result(res)
+        all_results = _map_files(
+            _mp_words_task, files, args.jobs, args.stopwords, args.approx, args.sort, args.asc, args.top, args.normalize, args.ascii_only, _cache_from_args(args),
+            ordered=not args.unordered,
+        )
+    for res in all_results:
+        handle_result(res)
 
     if args.format == "json":
         payload = {
             "report_version": 1,
             "command": "words",
             "stopwords": args.stopwords,
+            **({"approx": args.approx} if args.approx else {}),
             "sort": args.sort,
             "order": "asc" if args.asc else "desc",
             "top": args.top,
+            **({"aggregate": True} if args.aggregate else {}),
             "files": results,
         }
         output = json.dumps(payload, ensure_ascii=False, indent=2)
@@ -222,7 +372,7 @@ def run_words_cmd(args):
         else:
             print(output)
     elif args.format in ("csv", "md", "html"):
-        headers = ["path", "word", "count"]
+        headers = ["path", "word", "count"] + (["err"] if args.approx else [])
         if args.format == "csv":
             output = render_table_csv(headers, flat_rows)
         elif args.format == "md":
@@ -245,19 +395,18 @@ def run_compare_cmd(args):
     counts_list = []
 
     def analyze(p: Path):
-        nw = get_num_words_whitespace_stream(p, normalize_form=args.normalize, ascii_only=args.ascii_only)
-        if args.type == "chars":
-            counts = count_chars_stream(p, letters_only=args.letters_only, normalize_form=args.normalize, ascii_only=args.ascii_only)
-            items = sort_counts(counts)
-            items = _sort_items(items, args.sort, not args.asc, key_field="char")
-        else:
-            stopwords = STOPWORDS_EN if args.stopwords == "english" else None
-            counts = get_word_counts_stream(p, stopwords=stopwords, normalize_form=args.normalize, ascii_only=args.ascii_only)
-            items = sort_words(counts)
-            items = _sort_items(items, args.sort, not args.asc, key_field="word")
-        if args.top is not None:
-            items = items[: args.top]
-        return nw, counts, items
+        stopwords = STOPWORDS_EN if args.stopwords == "english" else None
+        res = analyze_stream(
+            p,
+            ["num_words", args.type],
+            letters_only=args.letters_only,
+            stopwords=stopwords,
+            normalize_form=args.normalize,
+            ascii_only=args.ascii_only,
+        )
+        counts = res[args.type]
+        items = rank_counts(counts, "char" if args.type == "chars" else "word", args.sort, not args.asc, args.top)
+        return res["num_words"], counts, items
 
     for p in paths:
         try:
@@ -320,10 +469,7 @@ def run_compare_cmd(args):
 
 
 def run_ngrams_cmd(args):
-    files = collect_files(args.paths)
-    if not files:
-        print("Error: no files to analyze", file=sys.stderr)
-        sys.exit(1)
+    files = _collect_files(args)
     results = []
     flat_rows = []
 
@@ -332,44 +478,51 @@ def run_ngrams_cmd(args):
             if not args.quiet:
                 print(f"Error reading '{res['path']}': {res['error']}", file=sys.stderr)
             return
-        results.append({"path": res["path"], "n": args.n, "items": res["to_show"]})
-        for it in res["to_show"]:
-            flat_rows.append([res["path"], it["ngram"], it["num"]])
+        items = _unpack_rows(res, "ngram")
+        bounds = _error_bounds_of(res)
+        results.append({"path": res["path"], "n": args.n, **bounds, "items": items})
+        for it in items:
+            flat_rows.append([res["path"], it["ngram"], it["num"], *([it["err"]] if "err" in it else [])])
         if args.format == "text":
             if not args.quiet:
-                print(f"============ BOOKBOT (NGRAMS n={args.n}) ============")
+                skip = f", skip={args.skip}" if args.skip else ""
+                print(f"============ BOOKBOT (NGRAMS n={args.n}{skip}) ============")
                 print(f"Analyzing book found at {res['path']}...")
                 print("----------- NGRAM FREQUENCY -----------")
-            for it in res["to_show"]:
-                print(f"{it['ngram']}: {it['num']}")
+                if bounds:
+                    _print_error_bounds(args, bounds, "grams")
+            for it in items:
+                if "err" in it:
+                    print(f"{it['ngram']}: {it['num']} (+{it['err']})")
+                else:
+                    print(f"{it['ngram']}: {it['num']}")
             if args.histogram:
                 print("\n----------- NGRAM HISTOGRAM -----------")
-                print_histogram(res.get("items", res["to_show"]), key_field="ngram", top=args.top)
+                print_histogram(items, key_field="ngram", top=args.top)
 
-    if args.jobs and args.jobs > 1 and len(files) > 1:
-        with ProcessPoolExecutor(max_workers=args.jobs) as ex:
-            futs = [
-                ex.submit(
-                    _mp_ngrams_task, str(f), args.n, args.stopwords, args.sort, args.asc, args.top, args.normalize, args.ascii_only
-                )
-                for f in files
-            ]
-            for fut in futs:
-                handle_result(fut.result())
+    if args.aggregate:
+        all_results = _aggregate_result(files, args, "ngrams", "ngram", ngram_label)
     else:
-        for f in files:
-            res = _mp_ngrams_task(str(f), args.n, args.stopwords, args.sort, args.asc, args.top, args.normalize, args.ascii_only)
-            handle_result(res)
+        all_results = _map_files(
+            _mp_ngrams_task, files, args.jobs, args.n, args.skip, args.epsilon, args.approx, args.stopwords, args.sort, args.asc, args.top, args.normalize, args.ascii_only, _cache_from_args(args),
+            ordered=not args.unordered,
+        )
+    for res in all_results:
+        handle_result(res)
 
     if args.format == "json":
         payload = {
             "report_version": 1,
             "command": "ngrams",
             "n": args.n,
+            **({"skip": args.skip} if args.skip else {}),
+            **({"epsilon": args.epsilon} if args.epsilon else {}),
+            **({"approx": args.approx} if args.approx else {}),
             "stopwords": args.stopwords,
             "sort": args.sort,
             "order": "asc" if args.asc else "desc",
             "top": args.top,
+            **({"aggregate": True} if args.aggregate else {}),
             "files": results,
         }
         output = json.dumps(payload, ensure_ascii=False, indent=2)
@@ -378,7 +531,7 @@ def run_ngrams_cmd(args):
         else:
             print(output)
     elif args.format in ("csv", "md", "html"):
-        headers = ["path", f"{args.n}-gram", "count"]
+        headers = ["path", f"{args.n}-gram", "count"] + (["err"] if args.epsilon or args.approx else [])
         if args.format == "csv":
             output = render_table_csv(headers, flat_rows)
         elif args.format == "md":
@@ -391,24 +544,46 @@ def run_ngrams_cmd(args):
             print(output)
 
 
+def _mp_readability_task(path: str, normalize: str, ascii_only: bool, cache: ResultCache | None = None, split_jobs: int = 1):
+    try:
+        res = analyze_stream(path, ["readability"], normalize_form=normalize, ascii_only=ascii_only, jobs=split_jobs, cache=cache)
+        return {"path": path, "metrics": res["readability"]}
+    except Exception as e:
+        return {"path": path, "error": str(e)}
+
+
+def _mp_vocab_task(path: str, stopwords_key: str, normalize: str, ascii_only: bool, cache: ResultCache | None = None, split_jobs: int = 1):
+    try:
+        stopwords = STOPWORDS_EN if stopwords_key == "english" else None
+        res = analyze_stream(path, ["vocab"], stopwords=stopwords, normalize_form=normalize, ascii_only=ascii_only, jobs=split_jobs, cache=cache)
+        return {"path": path, "metrics": res["vocab"]}
+    except Exception as e:
+        return {"path": path, "error": str(e)}
+
+
+def _mp_categories_task(path: str, normalize: str, ascii_only: bool, cache: ResultCache | None = None, split_jobs: int = 1):
+    try:
+        res = analyze_stream(path, ["categories"], normalize_form=normalize, ascii_only=ascii_only, jobs=split_jobs, cache=cache)
+        return {"path": path, "metrics": res["categories"]}
+    except Exception as e:
+        return {"path": path, "error": str(e)}
+
+
 def run_readability_cmd(args):
-    files = collect_files(args.paths)
-    if not files:
-        print("Error: no files to analyze", file=sys.stderr)
-        sys.exit(1)
+    files = _collect_files(args)
     results = []
     flat_rows = []
-    for f in files:
-        try:
-            text = get_book_text(f)
-        except OSError as e:
+    for res in _map_files(
+        _mp_readability_task, files, args.jobs, args.normalize, args.ascii_only, _cache_from_args(args), ordered=not args.unordered
+    ):
+        if res.get("error"):
             if not args.quiet:
-                print(f"Error reading '{f}': {e}", file=sys.stderr)
+                print(f"Error reading '{res['path']}': {res['error']}", file=sys.stderr)
             continue
-        m = readability_metrics(text)
-        results.append({"path": str(f), **m})
+        m = res["metrics"]
+        results.append({"path": res["path"], **m})
         flat_rows.append([
-            str(f),
+            res["path"],
             int(m['num_sentences']),
             int(m['num_words']),
             int(m['num_syllables']),
@@ -462,24 +637,20 @@ def run_readability_cmd(args):
 
 
 def run_vocab_cmd(args):
-    files = collect_files(args.paths)
-    if not files:
-        print("Error: no files to analyze", file=sys.stderr)
-        sys.exit(1)
+    files = _collect_files(args)
     results = []
     flat_rows = []
-    stopwords = STOPWORDS_EN if args.stopwords == "english" else None
-    for f in files:
-        try:
-            text = get_book_text(f)
-        except OSError as e:
+    for res in _map_files(
+        _mp_vocab_task, files, args.jobs, args.stopwords, args.normalize, args.ascii_only, _cache_from_args(args), ordered=not args.unordered
+    ):
+        if res.get("error"):
             if not args.quiet:
-                print(f"Error reading '{f}': {e}", file=sys.stderr)
+                print(f"Error reading '{res['path']}': {res['error']}", file=sys.stderr)
             continue
-        m = vocabulary_metrics(text, stopwords=stopwords)
-        results.append({"path": str(f), **m})
+        m = res["metrics"]
+        results.append({"path": res["path"], **m})
         flat_rows.append([
-            str(f),
+            res["path"],
             int(m['tokens']),
             int(m['types']),
             f"{m['type_token_ratio']:.4f}",
@@ -531,23 +702,20 @@ def run_vocab_cmd(args):
 
 
 def run_categories_cmd(args):
-    files = collect_files(args.paths)
-    if not files:
-        print("Error: no files to analyze", file=sys.stderr)
-        sys.exit(1)
+    files = _collect_files(args)
     results = []
     flat_rows = []
-    for f in files:
-        try:
-            text = get_book_text(f)
-        except OSError as e:
+    for res in _map_files(
+        _mp_categories_task, files, args.jobs, args.normalize, args.ascii_only, _cache_from_args(args), ordered=not args.unordered
+    ):
+        if res.get("error"):
             if not args.quiet:
-                print(f"Error reading '{f}': {e}", file=sys.stderr)
+                print(f"Error reading '{res['path']}': {res['error']}", file=sys.stderr)
             continue
-        m = category_counts(text)
-        results.append({"path": str(f), **m})
+        m = res["metrics"]
+        results.append({"path": res["path"], **m})
         flat_rows.append([
-            str(f),
+            res["path"],
             m['uppercase'],
             m['lowercase'],
             m['digits'],
@@ -597,7 +765,296 @@ def run_categories_cmd(args):
             print(f"Other: {m['other']}")
 
 
-def run_with_subcommands(argv: List[str]):
+ANALYZE_METRICS = ("chars", "words", "readability", "vocab", "categories")
+ANALYZE_TITLES = {
+    "chars": "CHARACTER COUNT",
+    "words": "WORD FREQUENCY",
+    "readability": "READABILITY",
+    "vocab": "VOCABULARY",
+    "categories": "CATEGORIES",
+}
+# Fields of the readability/vocab metric dicts that are counts, not ratios.
+_COUNT_FIELDS = {"num_sentences", "num_words", "num_syllables", "tokens", "types", "hapax_legomena", "dis_legomena"}
+
+
+def _parse_analyze_metrics(value: str) -> List[str]:
+    metrics = []
+    for m in value.split(","):
+        m = m.strip()
+        if not m:
+            continue
+        if m not in ANALYZE_METRICS and not re.fullmatch(r"ngrams[1-9][0-9]*", m):
+            raise argparse.ArgumentTypeError(f"unknown metric '{m}'")
+        if m not in metrics:
+            metrics.append(m)
+    if not metrics:
+        raise argparse.ArgumentTypeError("no metrics given")
+    return metrics
+
+
+def _mp_analyze_task(path: str, metrics: List[str], letters_only: bool, stopwords_key: str, top: int | None, normalize: str, ascii_only: bool, cache: ResultCache | None = None, split_jobs: int = 1):
+    try:
+        stopwords = STOPWORDS_EN if stopwords_key == "english" else None
+        res = analyze_stream(
+            path,
+            ["num_words", *metrics],
+            letters_only=letters_only,
+            stopwords=stopwords,
+            normalize_form=normalize,
+            ascii_only=ascii_only,
+            jobs=split_jobs,
+            cache=cache,
+        )
+        return _analyze_bundle(path, res, metrics, top)
+    except Exception as e:
+        return {"path": path, "error": str(e)}
+
+
+def _analyze_bundle(path: str, res: dict, metrics: List[str], top: int | None) -> dict:
+    bundle = {"path": path, "num_words": res["num_words"]}
+    for m in metrics:
+        if m == "chars":
+            bundle[m] = sort_counts(res[m], top)
+        elif m == "words":
+            bundle[m] = sort_words(res[m], top)
+        elif m.startswith("ngrams"):
+            bundle[m] = sort_ngrams(res[m], top)
+        else:
+            bundle[m] = res[m]
+    return bundle
+
+
+def _analyze_sections(bundle: dict, metrics: List[str]):
+    for m in metrics:
+        if m in ("chars", "words"):
+            key = "char" if m == "chars" else "word"
+            yield ANALYZE_TITLES[m], [key, "count"], [[it[key], it["num"]] for it in bundle[m]]
+        elif m.startswith("ngrams"):
+            n = m[len("ngrams"):]
+            yield f"{n}-GRAM FREQUENCY", [f"{n}-gram", "count"], [[it["ngram"], it["num"]] for it in bundle[m]]
+        else:
+            digits = 2 if m == "readability" else 4
+            rows = [
+                [k, int(v) if m == "categories" or k in _COUNT_FIELDS else f"{v:.{digits}f}"]
+                for k, v in bundle[m].items()
+            ]
+            yield ANALYZE_TITLES[m], ["metric", "value"], rows
+
+
+def _render_analyze_bundle(bundle: dict, metrics: List[str], fmt: str, quiet: bool) -> str:
+    sections = list(_analyze_sections(bundle, metrics))
+    if fmt == "json":
+        payload = {"report_version": 1, "command": "analyze", "metrics": metrics, **bundle}
+        return json.dumps(payload, ensure_ascii=False, indent=2)
+    if fmt == "md":
+        parts = [f"# BookBot analysis: {bundle['path']}", f"Found {bundle['num_words']} total words"]
+        for title, headers, rows in sections:
+            parts.append(f"## {title.title()}")
+            parts.append(render_table_md(headers, rows))
+        return "\n\n".join(parts) + "\n"
+    if fmt == "html":
+        esc = html.escape
+        parts = [f"<h1>BookBot analysis: {esc(bundle['path'])}</h1>", f"<p>Found {bundle['num_words']} total words</p>"]
+        for title, headers, rows in sections:
+            parts.append(f"<h2>{esc(title.title())}</h2>")
+            parts.append(render_table_html(headers, rows))
+        return "<section>" + "".join(parts) + "</section>"
+    lines = []
+    if quiet:
+        lines.append(f"-- {bundle['path']}")
+    else:
+        lines.append("============ BOOKBOT (ANALYZE) ============")
+        lines.append(f"Analyzing book found at {bundle['path']}...")
+        lines.append("------------ WORD COUNT ------------")
+        lines.append(f"Found {bundle['num_words']} total words")
+    for title, headers, rows in sections:
+        if not quiet:
+            lines.append(f"----------- {title} -----------")
+        lines.append(render_table_text(headers, rows))
+    return "\n".join(lines)
+
+
+def _bundle_file_name(path: str, ext: str) -> str:
+    # Path parts joined with "__", which can be split back unless a part
+    # contains "__" or starts or ends with "_" (a/b__c and a__b/c). Those
+    # names get a hash of the path after "___", a run of underscores that
+    # no other name contains.
+    p = Path(path.replace(MEMBER_SEP, "/"))
+    parts = [part for part in p.parts if part not in (p.anchor, ".", "..")]
+    name = "__".join(parts)
+    if any("__" in part or part.startswith("_") or part.endswith("_") for part in parts):
+        name += "___" + hashlib.sha256("/".join(parts).encode("utf-8")).hexdigest()[:8]
+    return name + f".{ext}"
+
+
+def run_analyze_cmd(args):
+    files = _collect_files(args)
+    out_dir = Path(args.out_dir) if args.out_dir else None
+    if out_dir is not None:
+        out_dir.mkdir(parents=True, exist_ok=True)
+    ext = {"text": "txt"}.get(args.format, args.format)
+    bundles = []
+
+    def handle_result(res):
+        if res.get("error"):
+            if not args.quiet:
+                print(f"Error reading '{res['path']}': {res['error']}", file=sys.stderr)
+            return
+        if out_dir is not None:
+            output = _render_analyze_bundle(res, args.metrics, args.format, args.quiet)
+            (out_dir / _bundle_file_name(res["path"], ext)).write_text(output, encoding="utf-8")
+        elif args.format == "json":
+            bundles.append(res)
+        else:
+            print(_render_analyze_bundle(res, args.metrics, args.format, args.quiet))
+
+    for res in _map_files(
+        _mp_analyze_task, files, args.jobs, args.metrics, args.letters_only, args.stopwords, args.top, args.normalize, args.ascii_only,
+        _cache_from_args(args),
+        ordered=not args.unordered,
+    ):
+        handle_result(res)
+
+    if out_dir is None and args.format == "json":
+        payload = {"report_version": 1, "command": "analyze", "metrics": args.metrics, "files": bundles}
+        print(json.dumps(payload, ensure_ascii=False, indent=2))
+
+
+_PATHS_HELP = (
+    "Files, directories (recursive) and zip/tar archives to analyze; gzip/bzip2/xz files are decompressed, "
+    "archive::member names one file in an archive and - reads standard input"
+)
+
+
+def run_watch_cmd(args):
+    metrics = args.on_save
+    stopwords = STOPWORDS_EN if args.stopwords == "english" else None
+    out_dir = Path(args.out_dir) if args.out_dir else None
+    if out_dir is not None:
+        out_dir.mkdir(parents=True, exist_ok=True)
+    ext = {"text": "txt"}.get(args.format, args.format)
+    try:
+        watcher = Watcher(
+            args.paths, args.include, args.exclude, args.ext, debounce=args.debounce / 1000, poll=args.poll, use_inotify=not args.no_inotify
+        )
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(2)
+    if not args.quiet:
+        mode = "inotify" if watcher.inotify is not None else f"polling every {args.poll}s"
+        print(f"Watching {', '.join(args.paths)} ({mode}); Ctrl-C to stop", file=sys.stderr)
+    results = watch_results(
+        watcher, ["num_words", *metrics], args.letters_only, stopwords, normalize_form=args.normalize, ascii_only=args.ascii_only
+    )
+    try:
+        for path, res in results:
+            if res is None:
+                if not args.quiet:
+                    print(f"Removed '{path}'", file=sys.stderr)
+                continue
+            bundle = _analyze_bundle(path, res, metrics, args.top)
+            if out_dir is not None:
+                (out_dir / _bundle_file_name(path, ext)).write_text(
+                    _render_analyze_bundle(bundle, metrics, args.format, args.quiet), encoding="utf-8"
+                )
+                if not args.quiet:
+                    print(f"[{time.strftime('%H:%M:%S')}] {path} -> {out_dir}", file=sys.stderr)
+            else:
+                print(_render_analyze_bundle(bundle, metrics, args.format, args.quiet), flush=True)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
+
+
+def run_serve_cmd(args):
+    serve(build_parser(), run_args, socket_path=args.socket, port=args.port, jobs=args.jobs, memory_entries=args.memory_entries, quiet=args.quiet)
+
+
+def _add_filter_args(p):
+    p.add_argument("--include", action="append", default=None, metavar="GLOB", help="When walking directories, only analyze files matching GLOB (repeatable)")
+    p.add_argument("--exclude", action="append", default=None, metavar="GLOB", help="When walking directories, skip files and subdirectories matching GLOB (repeatable)")
+    p.add_argument("--ext", type=_parse_extensions, default=None, help="Comma-separated file extensions to analyze in directories, e.g. txt,md")
+
+
+def _positive_int(value: str) -> int:
+    n = int(value)
+    if n < 1:
+        raise argparse.ArgumentTypeError("must be at least 1")
+    return n
+
+
+def _non_negative_int(value: str) -> int:
+    n = int(value)
+    if n < 0:
+        raise argparse.ArgumentTypeError("must not be negative")
+    return n
+
+
+def _epsilon(value: str) -> float:
+    eps = float(value)
+    if not 0 < eps < 1:
+        raise argparse.ArgumentTypeError("must be between 0 and 1")
+    return eps
+
+
+def _parse_extensions(value: str) -> List[str]:
+    return ["." + e.strip().lstrip(".").lower() for e in value.split(",") if e.strip()]
+
+
+def _add_approx_arg(p):
+    p.add_argument(
+        "--approx",
+        type=_positive_int,
+        default=None,
+        metavar="K",
+        help="Report only K heavy hitters (Space-Saving), holding at most 2 x max(K, 1024) while counting; rows report how far below the true count they may be",
+    )
+
+
+def _add_cache_args(p):
+    p.add_argument("--cache-dir", type=str, default=None, help="Result cache directory (default: $XDG_CACHE_HOME/bookbot)")
+    mode = p.add_mutually_exclusive_group()
+    mode.add_argument("--no-cache", action="store_true", help="Do not read or write the result cache")
+    mode.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Checkpoint each file's analysis state in the cache and, for files that only grew since, analyze just the appended text",
+    )
+    p.add_argument("--cache-hash", action="store_true", help="Also key cached results on a SHA-256 of the file contents")
+    p.add_argument(
+        "--cache-max-mb", type=int, default=DEFAULT_MAX_BYTES // 2**20, help="Evict least recently used entries above this size"
+    )
+
+
+def _cache_from_args(args) -> ResultCache | None:
+    if getattr(args, "no_cache", True):
+        return None
+    return ResultCache(
+        args.cache_dir or default_cache_dir(),
+        max_bytes=args.cache_max_mb * 2**20,
+        hash_contents=getattr(args, "cache_hash", False),
+        checkpoints=getattr(args, "incremental", False),
+    )
+
+
+def run_cache_cmd(args):
+    cache = ResultCache(args.cache_dir or default_cache_dir(), max_bytes=args.cache_max_mb * 2**20)
+    if args.action == "stats":
+        st = cache.stats()
+        if args.format == "json":
+            print(json.dumps(st, indent=2))
+        else:
+            print(f"Cache directory: {st['path']}")
+            print(f"Entries: {st['entries']}")
+            print(f"Size: {st['bytes'] / 2**20:.1f} MiB (limit {st['max_bytes'] / 2**20:.0f} MiB)")
+    elif args.action == "prune":
+        print(f"Removed {cache.prune()} entries")
+    else:
+        print(f"Removed {cache.clear()} entries")
+
+
+def build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(prog="bookbot", description="Analyze text files.")
     parser.add_argument("--quiet", action="store_true", help="Minimal text output")
     parser.add_argument("--verbose", action="store_true", help="Extra diagnostic output")
@@ -605,7 +1062,7 @@ def run_with_subcommands(argv: List[str]):
 
     # chars subcommand
     p_chars = sub.add_parser("chars", help="Character frequency analysis")
-    p_chars.add_argument("paths", nargs="+", help="Files and/or directories to analyze (recursive)")
+    p_chars.add_argument("paths", nargs="+", help=_PATHS_HELP)
     p_chars.add_argument("--letters-only", action="store_true", help="Count only alphabetic characters")
     p_chars.add_argument("--ascii-only", action="store_true", help="Drop non-ASCII characters (after normalization)")
     p_chars.add_argument("--normalize", choices=["none", "NFC", "NFKC", "NFD", "NFKD"], default="none", help="Unicode normalization form")
@@ -618,16 +1075,21 @@ def run_with_subcommands(argv: List[str]):
     p_chars.add_argument("--out", type=str, default=None, help="Write JSON output to file")
     p_chars.add_argument("--histogram", choices=["chars"], default=None, help="Print ASCII histogram")
     p_chars.add_argument("-j", "--jobs", type=int, default=1, help="Parallel workers for multi-file analysis")
+    p_chars.add_argument("--unordered", action="store_true", help="With -j, report files as they finish instead of in path order")
+    p_chars.add_argument("--aggregate", action="store_true", help="Merge all files into a single corpus report")
+    _add_filter_args(p_chars)
+    _add_cache_args(p_chars)
     p_chars.set_defaults(func=run_chars_cmd)
 
     # words subcommand
     p_words = sub.add_parser("words", help="Word frequency analysis")
-    p_words.add_argument("paths", nargs="+", help="Files and/or directories to analyze (recursive)")
+    p_words.add_argument("paths", nargs="+", help=_PATHS_HELP)
     p_words.add_argument("--stopwords", choices=["none", "english"], default="none", help="Stopword list")
     p_words.add_argument("--ascii-only", action="store_true", help="Drop non-ASCII characters (after normalization)")
     p_words.add_argument("--normalize", choices=["none", "NFC", "NFKC", "NFD", "NFKD"], default="none", help="Unicode normalization form")
     p_words.add_argument("--top", type=int, default=None, help="Limit report to top N items")
     p_words.add_argument("--sort", choices=["count", "word"], default="count", help="Sort by count or word")
+    _add_approx_arg(p_words)
     order = p_words.add_mutually_exclusive_group()
     order.add_argument("--asc", action="store_true", help="Sort ascending")
     order.add_argument("--desc", action="store_true", help="Sort descending (default)")
@@ -635,6 +1097,10 @@ def run_with_subcommands(argv: List[str]):
     p_words.add_argument("--out", type=str, default=None, help="Write JSON output to file")
     p_words.add_argument("--histogram", choices=["words"], default=None, help="Print ASCII histogram")
     p_words.add_argument("-j", "--jobs", type=int, default=1, help="Parallel workers for multi-file analysis")
+    p_words.add_argument("--unordered", action="store_true", help="With -j, report files as they finish instead of in path order")
+    p_words.add_argument("--aggregate", action="store_true", help="Merge all files into a single corpus report")
+    _add_filter_args(p_words)
+    _add_cache_args(p_words)
     p_words.set_defaults(func=run_words_cmd)
 
     # compare subcommand
@@ -656,9 +1122,20 @@ def run_with_subcommands(argv: List[str]):
     p_cmp.set_defaults(func=run_compare_cmd)
 
     # ngrams subcommand
-    p_ng = sub.add_parser("ngrams", help="N-gram frequency analysis (bigrams/trigrams)")
-    p_ng.add_argument("paths", nargs="+", help="Files and/or directories to analyze (recursive)")
-    p_ng.add_argument("--n", type=int, choices=[2, 3], default=2, help="Size of n-gram")
+    p_ng = sub.add_parser("ngrams", help="N-gram frequency analysis (bigrams, trigrams, ... and skip-grams)")
+    p_ng.add_argument("paths", nargs="+", help=_PATHS_HELP)
+    p_ng.add_argument("--n", type=_positive_int, default=2, help="Size of n-gram")
+    p_ng.add_argument(
+        "--skip", type=_non_negative_int, default=0, help="Count k-skip-n-grams: up to K tokens left out between the n (default 0)"
+    )
+    bounded = p_ng.add_mutually_exclusive_group()
+    bounded.add_argument(
+        "--epsilon",
+        type=_epsilon,
+        default=None,
+        help="Bound memory with lossy counting; counts may be up to EPSILON x total grams too low (reported per row)",
+    )
+    _add_approx_arg(bounded)
     p_ng.add_argument("--stopwords", choices=["none", "english"], default="none", help="Stopword list")
     p_ng.add_argument("--ascii-only", action="store_true", help="Drop non-ASCII characters (after normalization)")
     p_ng.add_argument("--normalize", choices=["none", "NFC", "NFKC", "NFD", "NFKD"], default="none", help="Unicode normalization form")
@@ -671,10 +1148,122 @@ def run_with_subcommands(argv: List[str]):
     p_ng.add_argument("--out", type=str, default=None, help="Write JSON output to file")
     p_ng.add_argument("--histogram", action="store_true", help="Print ASCII histogram")
     p_ng.add_argument("-j", "--jobs", type=int, default=1, help="Parallel workers for multi-file analysis")
+    p_ng.add_argument("--unordered", action="store_true", help="With -j, report files as they finish instead of in path order")
+    p_ng.add_argument("--aggregate", action="store_true", help="Merge all files into a single corpus report")
+    _add_filter_args(p_ng)
+    _add_cache_args(p_ng)
     p_ng.set_defaults(func=run_ngrams_cmd)
 
-    args = parser.parse_args(argv)
+    # readability subcommand
+    p_read = sub.add_parser("readability", help="Readability metrics (Flesch, Flesch-Kincaid)")
+    p_read.add_argument("paths", nargs="+", help=_PATHS_HELP)
+    p_read.add_argument("--ascii-only", action="store_true", help="Drop non-ASCII characters (after normalization)")
+    p_read.add_argument("--normalize", choices=["none", "NFC", "NFKC", "NFD", "NFKD"], default="none", help="Unicode normalization form")
+    p_read.add_argument("--format", choices=["text", "json", "csv", "md", "html"], default="text", help="Output format")
+    p_read.add_argument("--out", type=str, default=None, help="Write output to file")
+    p_read.add_argument("-j", "--jobs", type=int, default=1, help="Parallel workers for multi-file analysis")
+    p_read.add_argument("--unordered", action="store_true", help="With -j, report files as they finish instead of in path order")
+    _add_filter_args(p_read)
+    _add_cache_args(p_read)
+    p_read.set_defaults(func=run_readability_cmd)
+
+    # vocab subcommand
+    p_voc = sub.add_parser("vocab", help="Vocabulary richness (type-token ratio, hapax/dis legomena)")
+    p_voc.add_argument("paths", nargs="+", help=_PATHS_HELP)
+    p_voc.add_argument("--stopwords", choices=["none", "english"], default="none", help="Stopword list")
+    p_voc.add_argument("--ascii-only", action="store_true", help="Drop non-ASCII characters (after normalization)")
+    p_voc.add_argument("--normalize", choices=["none", "NFC", "NFKC", "NFD", "NFKD"], default="none", help="Unicode normalization form")
+    p_voc.add_argument("--format", choices=["text", "json", "csv", "md", "html"], default="text", help="Output format")
+    p_voc.add_argument("--out", type=str, default=None, help="Write output to file")
+    p_voc.add_argument("-j", "--jobs", type=int, default=1, help="Parallel workers for multi-file analysis")
+    p_voc.add_argument("--unordered", action="store_true", help="With -j, report files as they finish instead of in path order")
+    _add_filter_args(p_voc)
+    _add_cache_args(p_voc)
+    p_voc.set_defaults(func=run_vocab_cmd)
+
+    # categories subcommand
+    p_cat = sub.add_parser("categories", help="Character category counts")
+    p_cat.add_argument("paths", nargs="+", help=_PATHS_HELP)
+    p_cat.add_argument("--ascii-only", action="store_true", help="Drop non-ASCII characters (after normalization)")
+    p_cat.add_argument("--normalize", choices=["none", "NFC", "NFKC", "NFD", "NFKD"], default="none", help="Unicode normalization form")
+    p_cat.add_argument("--format", choices=["text", "json", "csv", "md", "html"], default="text", help="Output format")
+    p_cat.add_argument("--out", type=str, default=None, help="Write output to file")
+    p_cat.add_argument("-j", "--jobs", type=int, default=1, help="Parallel workers for multi-file analysis")
+    p_cat.add_argument("--unordered", action="store_true", help="With -j, report files as they finish instead of in path order")
+    _add_filter_args(p_cat)
+    _add_cache_args(p_cat)
+    p_cat.set_defaults(func=run_categories_cmd)
+
+    # analyze subcommand
+    p_an = sub.add_parser("analyze", help="Run several analyses from a single read of each file")
+    p_an.add_argument("paths", nargs="+", help=_PATHS_HELP)
+    p_an.add_argument(
+        "--metrics",
+        type=_parse_analyze_metrics,
+        default=["chars", "words", "ngrams2", "readability", "vocab", "categories"],
+        help="Comma-separated metrics: chars, words, ngramsN (e.g. ngrams2), readability, vocab, categories",
+    )
+    p_an.add_argument("--letters-only", action="store_true", help="Count only alphabetic characters (chars)")
+    p_an.add_argument("--stopwords", choices=["none", "english"], default="none", help="Stopword list (words/ngrams/vocab)")
+    p_an.add_argument("--ascii-only", action="store_true", help="Drop non-ASCII characters (after normalization)")
+    p_an.add_argument("--normalize", choices=["none", "NFC", "NFKC", "NFD", "NFKD"], default="none", help="Unicode normalization form")
+    p_an.add_argument("--top", type=int, default=None, help="Limit frequency tables to top N items")
+    p_an.add_argument("--format", choices=["text", "json", "md", "html"], default="text", help="Output format")
+    p_an.add_argument("--out-dir", type=str, default=None, help="Write one report bundle per file into this directory")
+    p_an.add_argument("-j", "--jobs", type=int, default=1, help="Parallel workers for multi-file analysis")
+    p_an.add_argument("--unordered", action="store_true", help="With -j, report files as they finish instead of in path order")
+    _add_filter_args(p_an)
+    _add_cache_args(p_an)
+    p_an.set_defaults(func=run_analyze_cmd)
+
+    # watch subcommand
+    p_watch = sub.add_parser("watch", help="Re-analyze files whenever they change")
+    p_watch.add_argument("paths", nargs="+", help="Files, directories (recursive) and archives to watch")
+    p_watch.add_argument(
+        "--on-save",
+        type=_parse_analyze_metrics,
+        default=["chars", "words", "readability"],
+        help="Comma-separated metrics to recompute on change: chars, words, ngramsN, readability, vocab, categories",
+    )
+    p_watch.add_argument("--letters-only", action="store_true", help="Count only alphabetic characters (chars)")
+    p_watch.add_argument("--stopwords", choices=["none", "english"], default="none", help="Stopword list (words/ngrams/vocab)")
+    p_watch.add_argument("--ascii-only", action="store_true", help="Drop non-ASCII characters (after normalization)")
+    p_watch.add_argument("--normalize", choices=["none", "NFC", "NFKC", "NFD", "NFKD"], default="none", help="Unicode normalization form")
+    p_watch.add_argument("--top", type=int, default=None, help="Limit frequency tables to top N items")
+    p_watch.add_argument("--format", choices=["text", "json", "md", "html"], default="text", help="Output format")
+    p_watch.add_argument("--out-dir", type=str, default=None, help="Rewrite one report per file in this directory instead of printing")
+    p_watch.add_argument(
+        "--debounce", type=_positive_int, default=int(DEBOUNCE_SECONDS * 1000), metavar="MS", help="Wait for MS quiet milliseconds after a change"
+    )
+    p_watch.add_argument("--poll", type=float, default=POLL_SECONDS, help="Polling interval in seconds when inotify is unavailable")
+    p_watch.add_argument("--no-inotify", action="store_true", help="Always poll for changes")
+    _add_filter_args(p_watch)
+    p_watch.set_defaults(func=run_watch_cmd)
+
+    # cache subcommand
+    p_cache = sub.add_parser("cache", help="Inspect or clean the on-disk result cache")
+    p_cache.add_argument("action", choices=["stats", "prune", "clear"], help="stats, prune (evict down to the size limit) or clear")
+    p_cache.add_argument("--format", choices=["text", "json"], default="text", help="Output format (stats)")
+    p_cache.add_argument("--cache-dir", type=str, default=None, help="Result cache directory (default: $XDG_CACHE_HOME/bookbot)")
+    p_cache.add_argument("--cache-max-mb", type=int, default=DEFAULT_MAX_BYTES // 2**20, help="Size limit used by prune")
+    p_cache.set_defaults(func=run_cache_cmd)
+
+    # serve subcommand
+    p_serve = sub.add_parser("serve", help="Run a daemon that answers bookbot commands from a warm worker pool")
+    p_serve.add_argument("--socket", type=str, default=None, help="Unix socket to listen on (default: $BOOKBOT_SOCKET or $XDG_RUNTIME_DIR/bookbot.sock)")
+    p_serve.add_argument("--port", type=int, default=None, help="Listen on 127.0.0.1:PORT (HTTP) instead of a Unix socket")
+    p_serve.add_argument("-j", "--jobs", type=_positive_int, default=os.cpu_count() or 1, help="Worker processes kept running")
+    p_serve.add_argument("--memory-entries", type=int, default=1024, help="Cached results kept in memory (in each process)")
+    p_serve.set_defaults(func=run_serve_cmd)
+    return parser
+
 
+def run_with_subcommands(argv: List[str]):
+    parser = build_parser()
+    run_args(parser.parse_args(argv), parser)
+
+
+def run_args(args, parser: argparse.ArgumentParser | None = None):
     # logging config
     level = logging.INFO if args.verbose else logging.WARNING
     logging.basicConfig(level=level, format="%(levelname)s: %(message)s")
@@ -685,16 +1274,19 @@ def run_with_subcommands(argv: List[str]):
         setattr(args, "asc", False)
 
     if not hasattr(args, "func"):
-        parser.print_help()
+        (parser or build_parser()).print_help()
         sys.exit(1)
     args.func(args)
+    cache = _cache_from_args(args)
+    if cache is not None:
+        cache.prune()
 
 
 def main(argv: List[str] | None = None) -> None:
     if argv is None:
         argv = sys.argv[1:]
     first = next((a for a in argv if not a.startswith("-")), None)
-    if first in {"chars", "words", "compare", "ngrams", "readability", "vocab", "categories"}:
+    if first in {"chars", "words", "compare", "ngrams", "readability", "vocab", "categories", "analyze", "watch", "cache", "serve"}:
         run_with_subcommands(argv)
         return
 
@@ -721,9 +1313,16 @@ def main(argv: List[str] | None = None) -> None:
         print(f"Error: '{book_path}' is not a valid file.", file=sys.stderr)
         sys.exit(1)
 
+    want_words = args.words or args.histogram == "words" or args.format in ("json", "csv", "md", "html")
     try:
-        num_words = get_num_words_whitespace_stream(book_path, normalize_form=args.normalize, ascii_only=args.ascii_only)
-        counts = count_chars_stream(book_path, letters_only=args.letters_only, normalize_form=args.normalize, ascii_only=args.ascii_only)
+        res = analyze_stream(
+            book_path,
+            ["num_words", "chars", "words"] if want_words else ["num_words", "chars"],
+            letters_only=args.letters_only,
+            stopwords=STOPWORDS_EN if args.stopwords == "english" else None,
+            normalize_form=args.normalize,
+            ascii_only=args.ascii_only,
+        )
     except FileNotFoundError:
         print(f"Error: File not found: '{book_path}'.", file=sys.stderr)
         sys.exit(1)
@@ -734,18 +1333,13 @@ def main(argv: List[str] | None = None) -> None:
         print(f"Error: Expected a file but got a directory: '{book_path}'.", file=sys.stderr)
         sys.exit(1)
 
-    sorted_counts = sort_counts(counts)
-    display_chars = [i for i in sorted_counts if str(i["char"]).isalpha()]
-    if args.top is not None:
-        display_chars = display_chars[: args.top]
+    num_words = res["num_words"]
+    sorted_counts = sort_counts(res["chars"], args.top)
+    display_chars = sort_counts({k: v for k, v in res["chars"].items() if str(k).isalpha()}, args.top)
 
     word_items = None
-    if args.words or args.histogram == "words" or args.format in ("json", "csv", "md", "html"):
-        stopwords = STOPWORDS_EN if args.stopwords == "english" else None
-        word_counts = get_word_counts_stream(book_path, stopwords=stopwords, normalize_form=args.normalize, ascii_only=args.ascii_only)
-        word_items = sort_words(word_counts)
-        if args.top is not None and args.format == "text":
-            word_items = word_items[: args.top]
+    if want_words:
+        word_items = sort_words(res["words"], args.top)
 
     if args.format == "json":
         payload = {
@@ -0,0 +1,132 @@
+import http.client
+import json
+import os
+import socket
+import sys
+import tempfile
+from typing import Dict, List, Optional, Tuple
+
+# Kept free of bookbot's analysis modules: a command answered by a running
+# `bookbot serve` only pays for this module's imports.
+
+# Subcommands a running daemon answers for the CLI.
+DAEMON_COMMANDS = {"chars", "words", "compare", "ngrams", "readability", "vocab", "categories", "analyze"}
+# Every request carries the daemon's token, which only the user who
+# started it can read (see token_path).
+TOKEN_HEADER = "X-Bookbot-Token"
+
+
+def default_socket_path() -> str:
+    if os.environ.get("BOOKBOT_SOCKET"):
+        return os.environ["BOOKBOT_SOCKET"]
+    if os.environ.get("XDG_RUNTIME_DIR"):
+        return os.path.join(os.environ["XDG_RUNTIME_DIR"], "bookbot.sock")
+    return os.path.join(tempfile.gettempdir(), f"bookbot-{os.getuid()}.sock")
+
+
+def token_path(socket_path: Optional[str] = None, port: Optional[int] = None) -> str:
+    # A 0600 file next to the socket (or where it would be, with --port).
+    base = socket_path or default_socket_path()
+    return base + (f".{port}" if port is not None else "") + ".token"
+
+
+def read_token(path: str) -> Optional[str]:
+    try:
+        with open(path, encoding="ascii") as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path: str, timeout: Optional[float] = None):
+        super().__init__("localhost", timeout=timeout)
+        self._path = path
+
+    def connect(self) -> None:
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        if self.timeout is not None:
+            self.sock.settimeout(self.timeout)
+        self.sock.connect(self._path)
+
+
+class Client:
+    # A thin client for `bookbot serve`, over its Unix socket or, with
+    # `port`, localhost HTTP. Connection failures raise OSError.
+
+    def __init__(self, socket_path: Optional[str] = None, port: Optional[int] = None, timeout: Optional[float] = None):
+        self.socket_path = socket_path or default_socket_path()
+        self.port = port
+        self.timeout = timeout
+        self.token = read_token(token_path(socket_path, port))
+
+    def _request(self, method: str, endpoint: str, payload: Optional[Dict[str, object]] = None) -> Tuple[int, Dict[str, object]]:
+        if self.port is not None:
+            conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=self.timeout)
+        else:
+            conn = _UnixHTTPConnection(self.socket_path, timeout=self.timeout)
+        try:
+            body = None if payload is None else json.dumps(payload).encode("utf-8")
+            headers = {"Content-Type": "application/json"}
+            if self.token is not None:
+                headers[TOKEN_HEADER] = self.token
+            conn.request(method, f"/v1/{endpoint}", body=body, headers=headers)
+            resp = conn.getresponse()
+            return resp.status, json.loads(resp.read())
+        finally:
+            conn.close()
+
+    def status(self) -> Dict[str, object]:
+        return self._request("GET", "status")[1]
+
+    def run(self, argv: List[str], cwd: Optional[str] = None) -> Dict[str, object]:
+        # {"exit": code, "stdout": ..., "stderr": ...} of the command line,
+        # or {"error": ...} for one the daemon refuses (see server._refusal).
+        return self._request("POST", "run", {"argv": list(argv), "cwd": cwd or os.getcwd()})[1]
+
+    def call(self, command: str, **fields) -> object:
+        # The JSON report of one analysis; raises ValueError on bad requests.
+        fields.setdefault("cwd", os.getcwd())
+        status, payload = self._request("POST", command, fields)
+        if status != 200:
+            raise ValueError(payload.get("error") or f"HTTP {status}")
+        return payload["result"]
+
+    def batch(self, requests: List[Dict[str, object]]) -> List[Dict[str, object]]:
+        return self._request("POST", "batch", {"requests": requests})[1]["responses"]
+
+
+def run_via_daemon(argv: List[str]) -> Optional[int]:
+    # Runs a command line on a running daemon, printing its output; None
+    # when there is no daemon, standard input would have to be read, or
+    # the daemon refuses the command line (it writes files, or no token).
+    if os.environ.get("BOOKBOT_NO_DAEMON") or "-" in argv:
+        return None
+    path = default_socket_path()
+    if not os.path.exists(path):
+        return None
+    try:
+        res = Client(path).run(argv)
+    except OSError:
+        return None
+    if "exit" not in res:
+        return None
+    sys.stdout.write(res["stdout"])
+    sys.stdout.flush()
+    sys.stderr.write(res["stderr"])
+    return res["exit"]
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    # The `bookbot` entry point: hands the command line to a running daemon
+    # if there is one, and otherwise runs it here.
+    if argv is None:
+        argv = sys.argv[1:]
+    first = next((a for a in argv if not a.startswith("-")), None)
+    if first in DAEMON_COMMANDS:
+        code = run_via_daemon(argv)
+        if code is not None:
+            sys.exit(code)
+    from .cli import main as run_locally
+
+    run_locally(argv)
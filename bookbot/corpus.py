@@ -1,31 +1,384 @@
+import bz2
+import gzip
+import io
+import lzma
+import os
+import sys
+import tarfile
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from fnmatch import fnmatch
+from functools import lru_cache
+from itertools import islice
 from pathlib import Path
-from typing import Iterable, List, Optional
+from typing import BinaryIO, Iterable, Iterator, List, NamedTuple, Optional, Sequence, TextIO, Tuple
 
 from .utils.tokenization import prepare_text_chunk
 
+# Files smaller than this are never split into byte ranges.
+MIN_CHUNK_BYTES = 1 << 20
+LINE_BATCH = 1024
+# A path of "-" reads standard input; "archive::member" names a file inside
+# a zip or tar archive.
+STDIN = "-"
+MEMBER_SEP = "::"
+
+# Single-file compression, by suffix or else by magic bytes.
+_COMPRESSED_SUFFIXES = {".gz": gzip.open, ".bz2": bz2.open, ".xz": lzma.open}
+_MAGIC = ((b"\x1f\x8b", gzip.open), (b"BZh", bz2.open), (b"\xfd7zXZ\x00", lzma.open))
+_ARCHIVE_SUFFIXES = (".zip", ".tar", ".tgz", ".tbz2", ".txz", ".tar.gz", ".tar.bz2", ".tar.xz")
+
+
+class _ByteRangeReader(io.RawIOBase):
+    def __init__(self, raw: io.RawIOBase, end: int):
+        self._raw = raw
+        self._end = end
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        remaining = self._end - self._raw.tell()
+        if remaining <= 0:
+            return 0
+        data = self._raw.read(min(len(b), remaining))
+        b[: len(data)] = data
+        return len(data)
+
+
+def split_member(path: str | Path) -> Tuple[str, Optional[str]]:
+    # ("archive", "member") for a virtual member path, else (path, None).
+    s = str(path)
+    if MEMBER_SEP in s and not os.path.isfile(s):
+        archive, member = s.split(MEMBER_SEP, 1)
+        return archive, member
+    return s, None
+
+
+def _decompressor(name: str, head: bytes):
+    for suffix, opener in _COMPRESSED_SUFFIXES.items():
+        if name.lower().endswith(suffix):
+            return opener
+    for magic, opener in _MAGIC:
+        if head.startswith(magic):
+            return opener
+    return None
+
+
+def is_plain_file(path: str | Path) -> bool:
+    # Byte offsets into the path are offsets into its text: not stdin, an
+    # archive member or a compressed file. Only these are split or mmapped.
+    s = str(path)
+    if s == STDIN or split_member(s)[1] is not None:
+        return False
+    try:
+        with open(s, "rb") as f:
+            return _decompressor(s, f.read(8)) is None
+    except OSError:
+        return False
+
+
+@lru_cache(maxsize=8)
+def _open_archive(path: str, mtime_ns: int):
+    # Kept open per process, so members of one archive analyzed in a row
+    # do not re-read its index (or, for compressed tars, re-decompress it).
+    if zipfile.is_zipfile(path):
+        return zipfile.ZipFile(path)
+    return tarfile.open(path)
+
+
+def _open_member(archive: str, member: str) -> BinaryIO:
+    handle = _open_archive(archive, os.stat(archive).st_mtime_ns)
+    try:
+        f = handle.open(member) if isinstance(handle, zipfile.ZipFile) else handle.extractfile(member)
+    except KeyError:
+        f = None
+    if f is None:
+        raise FileNotFoundError(f"no file '{member}' in archive '{archive}'")
+    return f
+
+
+@contextmanager
+def open_binary(path: str | Path) -> Iterator[BinaryIO]:
+    # Reads stdin, archive members and plain files, transparently
+    # decompressing gzip, bzip2 and xz streams. Standard input is never
+    # closed.
+    s = str(path)
+    archive, member = split_member(s)
+    if s == STDIN:
+        raw = sys.stdin.buffer
+        opener = _decompressor("", raw.peek(8)) if hasattr(raw, "peek") else None
+        if opener is None:
+            yield raw
+        else:
+            with opener(raw) as f:
+                yield f
+        return
+    with (open(s, "rb") if member is None else _open_member(archive, member)) as raw:
+        opener = _decompressor(member or s, raw.peek(8))
+        if opener is None:
+            yield raw
+        else:
+            with opener(raw) as f:
+                yield f
+
+
+@contextmanager
+def open_text(path: str | Path, errors: str = "ignore") -> Iterator[TextIO]:
+    with open_binary(path) as raw:
+        f = io.TextIOWrapper(raw, encoding="utf-8", errors=errors)
+        try:
+            yield f
+        finally:
+            f.detach()
+
 
 def get_book_text(file_path: str | Path) -> str:
-    with open(file_path, "r", encoding="utf-8") as f:
+    with open_text(file_path, errors="strict") as f:
         return f.read()
 
 
 def stream_normalized_lines(
-    file_path: str | Path, normalize_form: Optional[str] = None, ascii_only: bool = False
+    file_path: str | Path,
+    normalize_form: Optional[str] = None,
+    ascii_only: bool = False,
+    start: int = 0,
+    end: Optional[int] = None,
 ) -> Iterable[str]:
-    with open(file_path, "r", encoding="utf-8", errors="ignore") as f:
-        for line in f:
-            yield prepare_text_chunk(line, normalize_form, ascii_only)
+    if start == 0 and end is None:
+        with open_text(file_path) as f:
+            for line in f:
+                yield prepare_text_chunk(line, normalize_form, ascii_only)
+        return
+    with open(file_path, "rb", buffering=0) as raw:
+        raw.seek(start)
+        limited = _ByteRangeReader(raw, os.fstat(raw.fileno()).st_size if end is None else end)
+        with io.TextIOWrapper(io.BufferedReader(limited), encoding="utf-8", errors="ignore") as f:
+            for line in f:
+                yield prepare_text_chunk(line, normalize_form, ascii_only)
+
+
+def iter_line_batches(lines: Iterable[str], size: int = LINE_BATCH) -> Iterable[List[str]]:
+    it = iter(lines)
+    while batch := list(islice(it, size)):
+        yield batch
+
+
+def split_byte_ranges(
+    file_path: str | Path, parts: int, min_chunk: int = MIN_CHUNK_BYTES, start: int = 0, end: Optional[int] = None
+) -> List[Tuple[int, int]]:
+    # Newline-aligned ranges covering [start, end) of the file.
+    if end is None:
+        end = os.path.getsize(file_path)
+    span = end - start
+    parts = max(1, min(parts, span // max(1, min_chunk)))
+    bounds = [start]
+    if parts > 1:
+        with open(file_path, "rb") as f:
+            for i in range(1, parts):
+                f.seek(max(start + span * i // parts, bounds[-1]))
+                f.readline()
+                pos = f.tell()
+                if pos >= end:
+                    break
+                if pos > bounds[-1]:
+                    bounds.append(pos)
+    bounds.append(end)
+    return list(zip(bounds, bounds[1:]))
+
 
+def last_line_end(file_path: str | Path, size: Optional[int] = None, block: int = 1 << 16) -> int:
+    # Offset just past the file's last newline (0 if it has none): the part
+    # of a growing file that will not change when more text is appended.
+    pos = os.path.getsize(file_path) if size is None else size
+    with open(file_path, "rb") as f:
+        while pos > 0:
+            start = max(0, pos - block)
+            f.seek(start)
+            i = f.read(pos - start).rfind(b"\n")
+            if i >= 0:
+                return start + i + 1
+            pos = start
+    return 0
+
+
+class FileInfo(NamedTuple):
+    path: Path
+    size: int
+
+
+def _matches(rel: str, name: str, patterns: Sequence[str]) -> bool:
+    return any(fnmatch(name, pat) or fnmatch(rel, pat) for pat in patterns)
+
+
+def _logical_name(name: str) -> str:
+    # "notes.txt.gz" is filtered as "notes.txt".
+    lower = name.lower()
+    for suffix in _COMPRESSED_SUFFIXES:
+        if lower.endswith(suffix) and not lower.endswith(_ARCHIVE_SUFFIXES):
+            return name[: -len(suffix)]
+    return name
+
+
+def _wanted(rel: str, name: str, include, exclude, extensions) -> bool:
+    if extensions and not _logical_name(name).lower().endswith(tuple(extensions)):
+        return False
+    if include and not _matches(rel, name, include):
+        return False
+    return not (exclude and _matches(rel, name, exclude))
+
+
+def _is_archive(path: str, sniff: bool = False) -> bool:
+    # Archives are recognized by name while walking directories; a file
+    # named explicitly is also sniffed for zip or tar contents.
+    if path.lower().endswith(_ARCHIVE_SUFFIXES):
+        return True
+    if not sniff:
+        return False
+    try:
+        return zipfile.is_zipfile(path) or tarfile.is_tarfile(path)
+    except OSError:
+        return False
+
+
+def _archive_members(path: str) -> List[Tuple[str, int]]:
+    # Regular file members with their uncompressed sizes.
+    try:
+        if zipfile.is_zipfile(path):
+            with zipfile.ZipFile(path) as z:
+                return [(i.filename, i.file_size) for i in z.infolist() if not i.is_dir()]
+        with tarfile.open(path) as t:
+            return [(m.name, m.size) for m in t.getmembers() if m.isfile()]
+    except (OSError, zipfile.BadZipFile, tarfile.TarError, EOFError):
+        return []
+
+
+def _scan_archive(path: str, include, exclude, extensions) -> List[FileInfo]:
+    # An archive is walked like a directory: the filters apply to the
+    # member names.
+    return [
+        FileInfo(Path(f"{path}{MEMBER_SEP}{name}"), size)
+        for name, size in _archive_members(path)
+        if _wanted(name, os.path.basename(name), include, exclude, extensions)
+    ]
+
+
+def _member_info(path: str) -> Optional[FileInfo]:
+    archive, member = split_member(path)
+    if member is None or not os.path.isfile(archive):
+        return None
+    for name, size in _archive_members(archive):
+        if name == member:
+            return FileInfo(Path(path), size)
+    return None
+
+
+def _scan_dir(
+    path: str,
+    root: str,
+    include: Sequence[str],
+    exclude: Sequence[str],
+    extensions: Sequence[str],
+) -> Tuple[List[FileInfo], List[str]]:
+    # One directory level: matching files (with the size from the DirEntry's
+    # cached stat) and the subdirectories left to walk. Symlinked directories
+    # are not followed, as with Path.rglob().
+    files: List[FileInfo] = []
+    dirs: List[str] = []
+    try:
+        with os.scandir(path) as it:
+            for entry in it:
+                rel = os.path.relpath(entry.path, root)
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if not (exclude and _matches(rel, entry.name, exclude)):
+                            dirs.append(entry.path)
+                        continue
+                    if not entry.is_file():
+                        continue
+                    if _is_archive(entry.name):
+                        if not (exclude and _matches(rel, entry.name, exclude)):
+                            files.extend(_scan_archive(entry.path, include, exclude, extensions))
+                        continue
+                    if not _wanted(rel, entry.name, include, exclude, extensions):
+                        continue
+                    files.append(FileInfo(Path(entry.path), entry.stat().st_size))
+                except OSError:
+                    continue
+    except OSError:
+        pass
+    return files, dirs
+
+
+def walk_files(
+    paths: Iterable[str | Path],
+    include: Optional[Sequence[str]] = None,
+    exclude: Optional[Sequence[str]] = None,
+    extensions: Optional[Sequence[str]] = None,
+    workers: int = 1,
+) -> Iterator[FileInfo]:
+    # Lazily yields each file once, in discovery order. Files named
+    # explicitly are always yielded; the filters apply to files found in
+    # directories (globs match the file name or the path relative to the
+    # directory argument; excluded directory names are not descended into)
+    # and in archives, which are expanded into "archive::member" paths.
+    # "-" stands for standard input. With workers > 1 directories are
+    # scanned concurrently on threads.
+    include = list(include or [])
+    exclude = list(exclude or [])
+    extensions = [e.lower() for e in extensions or []]
+    seen = set()
+
+    def fresh(infos):
+        for info in infos:
+            if info.path not in seen:
+                seen.add(info.path)
+                yield info
 
-def collect_files(paths: List[str | Path]) -> List[Path]:
-    files: List[Path] = []
     for p in paths:
         path = Path(p)
-        if path.is_file():
-            files.append(path)
+        if str(p) == STDIN:
+            yield from fresh([FileInfo(path, 0)])
+        elif path.is_file() and _is_archive(str(path), sniff=True):
+            yield from fresh(_scan_archive(str(path), include, exclude, extensions))
+        elif path.is_file():
+            yield from fresh([FileInfo(path, path.stat().st_size)])
+        elif (member := _member_info(str(p))) is not None:
+            yield from fresh([member])
         elif path.is_dir():
-            for fp in path.rglob("*"):
-                if fp.is_file():
-                    files.append(fp)
-    return sorted(set(files))
+            root = str(path)
+            if workers <= 1:
+                stack = [root]
+                while stack:
+                    files, dirs = _scan_dir(stack.pop(), root, include, exclude, extensions)
+                    yield from fresh(files)
+                    stack.extend(reversed(dirs))
+                continue
+            with ThreadPoolExecutor(max_workers=workers) as ex:
+                pending = {ex.submit(_scan_dir, root, root, include, exclude, extensions)}
+                while pending:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for fut in done:
+                        files, dirs = fut.result()
+                        yield from fresh(files)
+                        pending.update(ex.submit(_scan_dir, d, root, include, exclude, extensions) for d in dirs)
+
+
+def collect_file_infos(
+    paths: Iterable[str | Path],
+    include: Optional[Sequence[str]] = None,
+    exclude: Optional[Sequence[str]] = None,
+    extensions: Optional[Sequence[str]] = None,
+    workers: int = 1,
+) -> List[FileInfo]:
+    return sorted(walk_files(paths, include, exclude, extensions, workers))
+
 
+def collect_files(
+    paths: List[str | Path],
+    include: Optional[Sequence[str]] = None,
+    exclude: Optional[Sequence[str]] = None,
+    extensions: Optional[Sequence[str]] = None,
+) -> List[Path]:
+    return [info.path for info in collect_file_infos(paths, include, exclude, extensions)]
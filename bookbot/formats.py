@@ -107,6 +107,23 @@ class CategoriesReport(TypedDict):
     files: List[CategoriesFile]
 
 
+class AnalyzeFile(TypedDict, total=False):
+    path: str
+    num_words: int
+    chars: List[CharsItem]
+    words: List[WordsItem]
+    ngrams2: List[NgramItem]
+    readability: dict
+    vocab: dict
+    categories: dict
+
+
+class AnalyzeReport(TypedDict):
+    command: Literal["analyze"]
+    metrics: List[str]
+    files: List[AnalyzeFile]
+
+
 class LegacySingleReport(TypedDict):
     book_path: str
     num_words: int
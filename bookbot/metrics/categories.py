@@ -1,29 +1,62 @@
 import string
 import unicodedata
-from typing import Dict
+from collections import Counter
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Optional
+
+from ..corpus import iter_line_batches, stream_normalized_lines
+
+_CATEGORIES = ("uppercase", "lowercase", "digits", "punctuation", "whitespace", "other")
+
+
+@lru_cache(maxsize=None)
+def _category(ch: str) -> str:
+    # Bounded by the number of distinct code points ever seen.
+    if ch.isupper():
+        return "uppercase"
+    if ch.islower():
+        return "lowercase"
+    if ch.isdigit():
+        return "digits"
+    if ch.isspace():
+        return "whitespace"
+    if unicodedata.category(ch).startswith('P') or ch in string.punctuation:
+        return "punctuation"
+    return "other"
+
+
+class CategoryCounter:
+    # Characters are tallied in bulk; each distinct character is classified
+    # once, in result().
+
+    def __init__(self):
+        self._raw: Counter[str] = Counter()
+
+    def update(self, line: str) -> None:
+        self._raw.update(line)
+
+    def merge(self, other: "CategoryCounter") -> "CategoryCounter":
+        self._raw.update(other._raw)
+        return self
+
+    def result(self) -> Dict[str, int]:
+        counts = dict.fromkeys(_CATEGORIES, 0)
+        for ch, num in self._raw.items():
+            counts[_category(ch)] += num
+        return counts
 
 
 def category_counts(text: str) -> Dict[str, int]:
-    upper = lower = digit = punct = space = other = 0
-    for ch in text:
-        if ch.isupper():
-            upper += 1
-        elif ch.islower():
-            lower += 1
-        elif ch.isdigit():
-            digit += 1
-        elif ch.isspace():
-            space += 1
-        elif unicodedata.category(ch).startswith('P') or ch in string.punctuation:
-            punct += 1
-        else:
-            other += 1
-    return {
-        "uppercase": upper,
-        "lowercase": lower,
-        "digits": digit,
-        "punctuation": punct,
-        "whitespace": space,
-        "other": other,
-    }
+    counter = CategoryCounter()
+    counter.update(text)
+    return counter.result()
+
 
+def category_counts_stream(
+    file_path: str | Path, normalize_form: Optional[str] = None, ascii_only: bool = False
+) -> Dict[str, int]:
+    counter = CategoryCounter()
+    for batch in iter_line_batches(stream_normalized_lines(file_path, normalize_form, ascii_only)):
+        counter.update("".join(batch))
+    return counter.result()
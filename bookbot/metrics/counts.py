@@ -1,8 +1,622 @@
+import heapq
+import math
+import mmap
+import os
 from collections import Counter, deque
-from typing import Dict, List, Optional, Set, Tuple
+from collections.abc import Mapping
+from itertools import chain, islice, product, repeat
+from operator import add, itemgetter, lshift
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
 
-from ..corpus import stream_normalized_lines
-from ..utils.tokenization import iter_words
+try:
+    import numpy as np
+except ImportError:  # optional: speeds up the ASCII byte histogram
+    np = None
+
+from ..corpus import is_plain_file, iter_line_batches, stream_normalized_lines
+from ..parallel import map_byte_ranges
+from ..utils.tokenization import Tokenizer
+
+
+class CharCounter:
+    # Raw characters are tallied in bulk; lowercasing and the letters-only
+    # filter run once per distinct character in result().
+
+    def __init__(self, letters_only: bool = False):
+        self.letters_only = letters_only
+        self._raw: Counter[str] = Counter()
+
+    def update(self, line: str) -> None:
+        self._raw.update(line)
+
+    def merge(self, other: "CharCounter") -> "CharCounter":
+        self._raw.update(other._raw)
+        return self
+
+    def result(self) -> Dict[str, int]:
+        counts: Dict[str, int] = {}
+        for ch, num in self._raw.items():
+            ch = ch.lower()
+            if self.letters_only and not ch.isalpha():
+                continue
+            counts[ch] = counts.get(ch, 0) + num
+        return counts
+
+
+# str.split() treats the ASCII file/group/record/unit separators as
+# whitespace, bytes.split() does not.
+_ASCII_SEPARATORS = bytes.maketrans(b"\x1c\x1d\x1e\x1f", b"    ")
+_SCAN_BLOCK_BYTES = 1 << 24
+
+
+def _byte_histogram(block: bytes) -> Dict[int, int]:
+    if np is not None:
+        hist = np.bincount(np.frombuffer(block, dtype=np.uint8), minlength=256)
+        return {int(b): int(hist[b]) for b in np.flatnonzero(hist)}
+    return Counter(block)
+
+
+def scan_ascii_prefix(file_path: str, counter: CharCounter, start: int = 0, end: Optional[int] = None) -> Tuple[int, int]:
+    # Counts characters and whitespace-separated words of the pure-ASCII,
+    # newline-aligned blocks of a file from a memory map, without decoding.
+    # Every normalization form and --ascii-only leave ASCII unchanged, so the
+    # result equals the decoding path. Stops at the first block containing a
+    # non-ASCII byte and returns (num_words, offset reached) so the caller
+    # can decode the rest.
+    raw: Dict[int, int] = {}
+    first: Dict[int, int] = {}
+    num_words = crlf = 0
+    with open(file_path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        end = size if end is None else min(end, size)
+        if start >= end:
+            return 0, start
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            while start < end:
+                stop = mm.find(b"\n", min(start + _SCAN_BLOCK_BYTES, end) - 1, end)
+                stop = end if stop < 0 else stop + 1
+                block = mm[start:stop]
+                hist = _byte_histogram(block)
+                if max(hist) >= 0x80:
+                    break
+                for b, num in hist.items():
+                    if b not in first:
+                        first[b] = start + block.find(bytes((b,)))
+                    raw[b] = raw.get(b, 0) + num
+                crlf += block.count(b"\r\n")
+                num_words += len(block.translate(_ASCII_SEPARATORS).split())
+                start = stop
+    # Text mode reads "\r\n" and a lone "\r" as "\n".
+    num_cr = raw.pop(0x0D, 0)
+    if num_cr:
+        raw[0x0A] = raw.get(0x0A, 0) + num_cr - crlf
+        first[0x0A] = min(first.get(0x0A, end), first.pop(0x0D))
+    counter._raw.update({chr(b): raw[b] for b in sorted(raw, key=first.__getitem__)})
+    return num_words, start
+
+
+class ApproxCounts(dict):
+    # Word -> count from a bounded counter. Each count is a lower bound and
+    # the true count is at most error(key) higher; words that are missing
+    # occurred at most `floor` times. Merges like NgramCounts.
+
+    def __init__(self, counts: Dict[str, int], errors: Dict[str, int], floor: int, total: int, capacity: int = 0):
+        super().__init__(counts)
+        self.errors = errors
+        self.floor = floor
+        self.total = total
+        self.capacity = capacity
+
+    def error(self, key: str) -> int:
+        return self.errors.get(key, 0)
+
+    def merge(self, other: "ApproxCounts") -> "ApproxCounts":
+        _merge_lossy(self, self.errors, self.floor, other, other.errors, other.floor)
+        self.floor += other.floor
+        self.total += other.total
+        if self.capacity:
+            self.floor = max(self.floor, _shrink(self, self.errors, self.capacity))
+        return self
+
+
+class WordCounter:
+    # With `capacity`, only about that many words are kept (Space-Saving, see
+    # _ErrorBounds) and result() returns ApproxCounts.
+
+    def __init__(self, stopwords: Optional[Set[str]] = None, capacity: Optional[int] = None):
+        self.stopwords = stopwords
+        self._counts: Counter[str] = Counter()
+        self._bounds = _ErrorBounds(capacity=capacity) if capacity else None
+        self._total = 0
+
+    def update(self, tokens: Iterable[str]) -> None:
+        if self.stopwords:
+            tokens = [t for t in tokens if t not in self.stopwords]
+        if self._bounds is None:
+            self._counts.update(tokens)
+            return
+        tokens = list(tokens)
+        self._counts.update(tokens)
+        self._total += len(tokens)
+        self._bounds.check(self._counts, self._total)
+
+    def merge(self, other: "WordCounter") -> "WordCounter":
+        if self._bounds is None:
+            self._counts.update(other._counts)
+            return self
+        other._bounds.settle(other._counts)
+        self._total += other._total
+        self._bounds.absorb(self._counts, other._counts, other._bounds, self._total)
+        return self
+
+    def result(self) -> Dict[str, int]:
+        bounds = self._bounds
+        if bounds is None:
+            return dict(self._counts)
+        bounds.finish(self._counts)
+        return ApproxCounts(self._counts, dict(bounds.errors), bounds.floor, self._total, bounds.capacity)
+
+
+# Each gram is packed into one int: token IDs of _ID_BITS bits each, first
+# token in the highest bits. IDs index the counter's interned vocabulary.
+_ID_BITS = 32
+_ID_MASK = (1 << _ID_BITS) - 1
+
+
+def _skip_patterns(n: int, skip: int) -> List[Tuple[int, ...]]:
+    # Token offsets of every k-skip-n-gram shape, relative to its first token:
+    # each way of leaving out at most `skip` tokens in total between the n.
+    patterns = []
+    for gaps in product(range(skip + 1), repeat=n - 1):
+        if sum(gaps) <= skip:
+            offsets = [0]
+            for gap in gaps:
+                offsets.append(offsets[-1] + 1 + gap)
+            patterns.append(tuple(offsets))
+    return patterns
+
+
+def _pack_offsets(ids: List[int], offsets: Tuple[int, ...], lo: int, hi: int) -> Iterable[int]:
+    # Keys of the grams with the given shape starting at ids[lo:hi].
+    keys: Iterable[int] = ids[lo:hi]
+    for o in offsets[1:]:
+        keys = map(add, map(lshift, keys, repeat(_ID_BITS)), ids[lo + o : hi + o])
+    return keys
+
+
+def _remap_key(key: int, table: List[int], n: int) -> int:
+    out = 0
+    shift = 0
+    for _ in range(n):
+        out |= table[key & _ID_MASK] << shift
+        key >>= _ID_BITS
+        shift += _ID_BITS
+    return out
+
+
+def _merge_lossy(
+    counts: Dict[int, int], errors: Dict[int, int], floor: int, other: Dict[int, int], other_errors: Dict[int, int], other_floor: int
+) -> None:
+    # Adds another lossy summary into counts/errors. A gram missing from one
+    # side may have been pruned there, so it takes that side's floor as extra
+    # possible undercount.
+    if other_floor:
+        for k in counts:
+            if k not in other:
+                errors[k] = errors.get(k, 0) + other_floor
+    for k, v in other.items():
+        err = other_errors.get(k, 0)
+        if k in counts:
+            counts[k] += v
+        else:
+            counts[k] = v
+            err += floor
+        if err:
+            errors[k] = errors.get(k, 0) + err
+
+
+def _shrink(counts: Dict, errors: Dict, capacity: int) -> int:
+    # Keeps the `capacity` keys with the largest count plus error (ties by
+    # first appearance) and returns the largest count plus error dropped.
+    if len(counts) <= capacity:
+        return 0
+    if errors:
+        upper = zip(counts, map(add, counts.values(), map(errors.get, counts, repeat(0))))
+    else:
+        upper = counts.items()
+    ranked = heapq.nlargest(capacity + 1, upper, key=itemgetter(1))
+    dropped = ranked.pop()[1]
+    kept = {k for k, _ in ranked}
+    # Most keys are usually dropped, so the survivors are copied out rather
+    # than the rest deleted.
+    survivors = [(k, v) for k, v in counts.items() if k in kept]
+    counts.clear()
+    dict.update(counts, survivors)
+    survivors = [(k, e) for k, e in errors.items() if k in kept]
+    errors.clear()
+    errors.update(survivors)
+    return dropped
+
+
+# Space-Saving counters hold up to max(capacity, _MIN_SHRINK_SLACK) keys
+# beyond their capacity between shrinks, so memory stays proportional to
+# the capacity and a shrink is not paid for every few new keys.
+_MIN_SHRINK_SLACK = 1024
+
+
+class _ErrorBounds:
+    # Bookkeeping for a Counter that drops keys to bound its memory. Kept
+    # counts are lower bounds, at most errors.get(key, 0) below the true
+    # count; a key that is not kept occurred at most `floor` times.
+    #
+    # `epsilon` is lossy counting (Manku & Motwani): every 1/epsilon items,
+    # keys whose count plus error is at most the number of such buckets so
+    # far are dropped, so floor <= epsilon * total. `capacity` is Space-Saving
+    # (Metwally et al.) applied to batches: once twice `capacity` (at least
+    # `capacity` + _MIN_SHRINK_SLACK) keys are held, only the `capacity`
+    # largest by count plus error are kept and the floor rises to the largest
+    # one dropped.
+    #
+    # Which keys survive can depend on how the input was split across jobs;
+    # the bounds hold either way.
+
+    def __init__(self, epsilon: Optional[float] = None, capacity: Optional[int] = None):
+        self.width = math.ceil(1 / epsilon) if epsilon else 0
+        self.capacity = capacity or 0
+        self.errors: Dict = {}
+        self.floor = 0
+        self._mark = 0
+
+    def settle(self, counts: Dict) -> None:
+        # Keys first seen since the last prune may have been dropped before
+        # that, so they start with the current floor as possible undercount.
+        if self.floor and self._mark < len(counts):
+            self.errors.update(zip(islice(counts, self._mark, None), repeat(self.floor)))
+        self._mark = len(counts)
+
+    def prune(self, counts: Dict, bucket: int) -> None:
+        self.settle(counts)
+        errors = self.errors
+        for k in [k for k, v in counts.items() if v + errors.get(k, 0) <= bucket]:
+            del counts[k]
+            errors.pop(k, None)
+        self.floor = bucket
+        self._mark = len(counts)
+
+    def shrink(self, counts: Dict, capacity: int) -> None:
+        self.settle(counts)
+        self.floor = max(self.floor, _shrink(counts, self.errors, capacity))
+        self._mark = len(counts)
+
+    def check(self, counts: Dict, total: int) -> None:
+        if self.width:
+            if total // self.width > self.floor:
+                self.prune(counts, total // self.width)
+        elif len(counts) >= self.capacity + max(self.capacity, _MIN_SHRINK_SLACK):
+            self.shrink(counts, self.capacity)
+
+    def absorb(self, counts: Dict, other: Dict, other_bounds: "_ErrorBounds", total: int, other_errors: Optional[Dict] = None) -> None:
+        # `other` must be settled; `total` already includes its items.
+        self.settle(counts)
+        errors = other_bounds.errors if other_errors is None else other_errors
+        _merge_lossy(counts, self.errors, self.floor, other, errors, other_bounds.floor)
+        self.floor += other_bounds.floor
+        self._mark = len(counts)
+        if self.width:
+            self.prune(counts, total // self.width)
+        else:
+            self.check(counts, total)
+
+    def finish(self, counts: Dict) -> None:
+        if self.capacity:
+            self.shrink(counts, self.capacity)
+        self.settle(counts)
+
+
+class NgramCounts(Mapping):
+    # Read-only gram -> count mapping over packed keys. Grams are decoded to
+    # tuples of strings only when they are looked at; rank_pairs() ranks
+    # `packed` directly so only the rendered rows are ever decoded.
+    #
+    # Counts from lossy counting carry `errors`: each count is a lower bound
+    # and the true count is at most errors.get(key, 0) higher. Grams that are
+    # missing occurred at most `floor` times, and floor <= epsilon * total.
+    __slots__ = ("n", "words", "packed", "errors", "floor", "total", "capacity", "_index")
+
+    def __init__(
+        self,
+        n: int,
+        words: List[str],
+        packed: Dict[int, int],
+        errors: Optional[Dict[int, int]] = None,
+        floor: int = 0,
+        total: int = 0,
+        capacity: int = 0,
+    ):
+        self.n = n
+        self.words = words
+        self.packed = packed
+        self.errors = errors
+        self.floor = floor
+        self.total = total
+        self.capacity = capacity
+        self._index: Optional[Dict[str, int]] = None
+
+    def __getstate__(self):
+        return self.n, self.words, self.packed, self.errors, self.floor, self.total, self.capacity
+
+    def __setstate__(self, state):
+        self.n, self.words, self.packed, self.errors, self.floor, self.total, self.capacity = state
+        self._index = None
+
+    def decode(self, key: int) -> Tuple[str, ...]:
+        words = self.words
+        gram = []
+        for _ in range(self.n):
+            gram.append(words[key & _ID_MASK])
+            key >>= _ID_BITS
+        gram.reverse()
+        return tuple(gram)
+
+    def error(self, key: int) -> Optional[int]:
+        # Largest possible undercount of a packed key, or None when exact.
+        if self.errors is None:
+            return None
+        return self.errors.get(key, 0)
+
+    def _encode(self, gram) -> Optional[int]:
+        if self._index is None:
+            self._index = {w: i for i, w in enumerate(self.words)}
+        if not isinstance(gram, tuple) or len(gram) != self.n:
+            return None
+        key = 0
+        for w in gram:
+            i = self._index.get(w)
+            if i is None:
+                return None
+            key = (key << _ID_BITS) | i
+        return key
+
+    def __getitem__(self, gram: Tuple[str, ...]) -> int:
+        key = self._encode(gram)
+        if key is None or key not in self.packed:
+            raise KeyError(gram)
+        return self.packed[key]
+
+    def __iter__(self):
+        return map(self.decode, self.packed)
+
+    def __len__(self) -> int:
+        return len(self.packed)
+
+    def items(self):
+        decode = self.decode
+        return [(decode(k), v) for k, v in self.packed.items()]
+
+    def merge(self, other: "NgramCounts") -> "NgramCounts":
+        index = {w: i for i, w in enumerate(self.words)}
+        table = [index.setdefault(w, len(index)) for w in other.words]
+        self.words = list(index)
+        self._index = None
+        packed = self.packed
+        n = self.n
+        if self.errors is None and other.errors is None:
+            for k, v in other.packed.items():
+                k = _remap_key(k, table, n)
+                packed[k] = packed.get(k, 0) + v
+            self.total += other.total
+            return self
+        incoming = {_remap_key(k, table, n): v for k, v in other.packed.items()}
+        incoming_errors = {_remap_key(k, table, n): e for k, e in (other.errors or {}).items()}
+        if self.errors is None:
+            self.errors = {}
+        _merge_lossy(packed, self.errors, self.floor, incoming, incoming_errors, other.floor)
+        self.floor += other.floor
+        self.total += other.total
+        if self.capacity:
+            self.floor = max(self.floor, _shrink(packed, self.errors, self.capacity))
+        return self
+
+
+class NgramCounter:
+    # Grams continue across line boundaries through the `_prev` window.
+    # Tokens are interned to integer IDs and each gram is counted under one
+    # packed int key, so no per-position tuples are built. With `skip`, every
+    # k-skip-n-gram is counted (grams with up to `skip` tokens left out in
+    # total between their n tokens), in order of their last token.
+    #
+    # A counter for a chunk that does not start at the beginning of the file
+    # is created `detached`: it does not know the window carried in from the
+    # previous chunk, so it only records the token lines up to and including
+    # the one that completes a full window of its own (`_head`).
+    # merge() replays that head against the real window, which makes chunked
+    # counting identical to a single serial pass.
+    #
+    # With `epsilon` (lossy counting) or `capacity` (Space-Saving) memory is
+    # bounded and result() carries error bounds; see _ErrorBounds.
+
+    def __init__(
+        self,
+        n: int = 2,
+        stopwords: Optional[Set[str]] = None,
+        detached: bool = False,
+        skip: int = 0,
+        epsilon: Optional[float] = None,
+        capacity: Optional[int] = None,
+    ):
+        self.n = n
+        self.stopwords = stopwords
+        self.skip = skip
+        self._patterns = _skip_patterns(n, skip)
+        self._window = max(p[-1] for p in self._patterns)
+        self._vocab: Dict[str, int] = {}
+        self._counts: Counter[int] = Counter()
+        self._prev: deque = deque(maxlen=self._window)
+        self._head: Optional[List[List[str]]] = [] if detached else None
+        self._synced = False
+        self._total = 0
+        self._bounds = _ErrorBounds(epsilon, capacity) if epsilon or capacity else None
+
+    def _ids(self, tokens: List[str]) -> List[int]:
+        # IDs only need to be stable, not in first-appearance order, so new
+        # tokens are added in bulk (sorted, to stay deterministic).
+        vocab = self._vocab
+        missing = set(tokens).difference(vocab)
+        if missing:
+            start = len(vocab)
+            vocab.update(zip(sorted(missing), range(start, start + len(missing))))
+        return list(map(vocab.__getitem__, tokens))
+
+    def _gram_keys(self, buf: List[int], start: int) -> Tuple[Iterable[int], int]:
+        # Keys of the grams whose last token is in buf[start:], and how many.
+        patterns = self._patterns
+        size = len(buf)
+        if len(patterns) == 1:
+            offsets = patterns[0]
+            lo = max(0, start - offsets[-1])
+            hi = size - offsets[-1]
+            if hi <= lo:
+                return (), 0
+            return _pack_offsets(buf, offsets, lo, hi), hi - lo
+        # Near the start of the stream the longer shapes do not fit yet, so
+        # those end positions are packed one by one.
+        first = max(start, self._window)
+        keys = []
+        for end in range(start, min(first, size)):
+            for offsets in patterns:
+                if offsets[-1] <= end:
+                    key = 0
+                    for o in offsets:
+                        key = (key << _ID_BITS) | buf[end - offsets[-1] + o]
+                    keys.append(key)
+        if first >= size:
+            return keys, len(keys)
+        rest = zip(*[_pack_offsets(buf, p, first - p[-1], size - p[-1]) for p in patterns])
+        return chain(keys, chain.from_iterable(rest)), len(keys) + (size - first) * len(patterns)
+
+    def update(self, tokens: List[str]) -> None:
+        window = self._window
+        prev = self._prev
+        if self.stopwords:
+            tokens = [t for t in tokens if t not in self.stopwords]
+        if self._head is not None and not self._synced:
+            # Several short lines can fill the window between them.
+            if tokens:
+                self._head.append(tokens)
+                prev.extend(self._ids(tokens[max(0, len(tokens) - window) :]))
+            self._synced = len(prev) >= window
+            return
+        if not tokens and not prev:
+            return
+        buf = list(prev) + self._ids(tokens)
+        keys, grams = self._gram_keys(buf, len(prev))
+        if grams:
+            self._counts.update(keys)
+            self._total += grams
+            if self._bounds is not None:
+                self._bounds.check(self._counts, self._total)
+        # `prev` keeps the last `window` tokens, however short the line.
+        prev.extend(buf[max(len(prev), len(buf) - window) :])
+
+    def update_lines(self, token_lines: List[List[str]]) -> None:
+        # Once the window is full, grams run on across lines exactly as if
+        # the lines were one token list, so the rest of the batch is counted
+        # in a single pass.
+        window = self._window
+        i = 0
+        for tokens in token_lines:
+            if (self._head is None or self._synced) and len(self._prev) == window:
+                break
+            self.update(tokens)
+            i += 1
+        if i < len(token_lines):
+            self.update([t for tokens in token_lines[i:] for t in tokens])
+
+    def _absorb(self, other: "NgramCounter") -> None:
+        # Takes over other's counts and trailing window, translating its
+        # token IDs into ours.
+        vocab = self._vocab
+        table = [vocab.setdefault(w, len(vocab)) for w in other._vocab]
+        identity = all(i == t for i, t in enumerate(table))
+        counts = self._counts
+        n = self.n
+        self._total += other._total
+        if self._bounds is not None:
+            other._bounds.settle(other._counts)
+            incoming = other._counts
+            incoming_errors = other._bounds.errors
+            if not identity:
+                incoming = {_remap_key(k, table, n): v for k, v in incoming.items()}
+                incoming_errors = {_remap_key(k, table, n): e for k, e in incoming_errors.items()}
+            self._bounds.absorb(counts, incoming, other._bounds, self._total, incoming_errors)
+        elif identity:
+            counts.update(other._counts)
+        else:
+            for k, v in other._counts.items():
+                counts[_remap_key(k, table, n)] += v
+        self._prev = deque((table[i] for i in other._prev), maxlen=self._window)
+
+    def merge(self, other: "NgramCounter") -> "NgramCounter":
+        if self._head is not None and not self._synced:
+            # Still waiting for our own window: other's head extends ours.
+            self._head.extend(other._head or [])
+            if other._head is None or other._synced:
+                self._synced = True
+                self._absorb(other)
+            return self
+        for tokens in other._head or []:
+            self.update(tokens)
+        if other._head is None or other._synced:
+            self._absorb(other)
+        return self
+
+    def result(self) -> NgramCounts:
+        bounds = self._bounds
+        if bounds is None:
+            return NgramCounts(self.n, list(self._vocab), dict(self._counts), total=self._total)
+        bounds.finish(self._counts)
+        return NgramCounts(
+            self.n, list(self._vocab), dict(self._counts), dict(bounds.errors), bounds.floor, self._total, bounds.capacity
+        )
+
+
+def merge_counts(into: Dict, other: Dict) -> Dict:
+    for k, v in other.items():
+        into[k] = into.get(k, 0) + v
+    return into
+
+
+# Counts crossing a process boundary are sent as parallel key/count lists,
+# which unpickle several times faster than a dict or a list of row dicts.
+# NgramCounts and ApproxCounts already pickle compactly (and carry error
+# bounds), so they are passed through as they are.
+_SUMMARIES = (NgramCounts, ApproxCounts)
+
+
+def pack_counts(counts: Dict) -> Tuple[List, List[int]]:
+    if isinstance(counts, _SUMMARIES):
+        return counts
+    return list(counts), list(counts.values())
+
+
+def unpack_counts(packed: Tuple[List, List[int]]) -> Dict:
+    if isinstance(packed, _SUMMARIES):
+        return packed
+    keys, nums = packed
+    return dict(zip(keys, nums))
+
+
+def merge_packed_counts(into: Dict, packed: Tuple[List, List[int]]) -> Dict:
+    # Failed files contribute an empty plain pair.
+    if isinstance(packed, _SUMMARIES):
+        if isinstance(into, _SUMMARIES):
+            return into.merge(packed)
+        if not into:
+            return packed
+        packed = pack_counts(dict(packed.items()))
+    for k, v in zip(*packed):
+        into[k] = into.get(k, 0) + v
+    return into
 
 
 def get_num_words(text: str) -> int:
@@ -19,42 +633,103 @@ def get_num_chars_dict(text: str, letters_only: bool = False) -> Dict[str, int]:
     return char_count
 
 
-def sort_counts(counts: Dict[str, int]) -> List[Dict[str, int]]:
-    items = [{"char": k, "num": v} for k, v in counts.items()]
-    items.sort(key=lambda x: x["num"], reverse=True)
-    return items
+def _rank_items(
+    counts: Dict,
+    sort_by: str,
+    desc: bool,
+    top: Optional[int],
+    label: Optional[Callable],
+) -> List[Tuple[object, int]]:
+    # Same order as a stable sort of the items in insertion order: ties keep
+    # first appearance. heapq.nlargest/nsmallest are equivalent to
+    # sorted(...)[:top], so with `top` only the K survivors are labelled.
+    # NgramCounts are ranked by their packed keys, which are returned as is.
+    if isinstance(counts, NgramCounts):
+        decode, counts = counts.decode, counts.packed
+        label = decode if label is None else (lambda k, label=label: label(decode(k)))
+    if sort_by == "count":
+        key = itemgetter(1)
+    else:
+        def key(kv):
+            return str(kv[0] if label is None else label(kv[0]))
+    items = counts.items()
+    if top is None or top < 0:
+        ranked = sorted(items, key=key, reverse=desc)
+        if top is not None:
+            ranked = ranked[:top]
+    elif desc:
+        ranked = heapq.nlargest(top, items, key=key)
+    else:
+        ranked = heapq.nsmallest(top, items, key=key)
+    return ranked
+
+
+def rank_pairs(
+    counts: Dict,
+    sort_by: str = "count",
+    desc: bool = True,
+    top: Optional[int] = None,
+    label: Optional[Callable] = None,
+) -> List[Tuple[object, int]]:
+    return rank_rows(counts, sort_by, desc, top, label)[0]
+
+
+def rank_rows(
+    counts: Dict,
+    sort_by: str = "count",
+    desc: bool = True,
+    top: Optional[int] = None,
+    label: Optional[Callable] = None,
+) -> Tuple[List[Tuple[object, int]], Optional[List[int]]]:
+    # rank_pairs() plus the largest possible undercount of each row when the
+    # counts are approximate (None when they are exact).
+    ranked = _rank_items(counts, sort_by, desc, top, label)
+    errors = None
+    if getattr(counts, "errors", None) is not None:
+        errors = [counts.error(k) for k, _ in ranked]
+    if isinstance(counts, NgramCounts):
+        decode = counts.decode
+        return [(decode(k) if label is None else label(decode(k)), v) for k, v in ranked], errors
+    if label is not None:
+        ranked = [(label(k), v) for k, v in ranked]
+    return ranked, errors
+
+
+def rank_counts(
+    counts: Dict,
+    key_field: str,
+    sort_by: str = "count",
+    desc: bool = True,
+    top: Optional[int] = None,
+    label: Optional[Callable] = None,
+) -> List[Dict[str, int]]:
+    return [{key_field: k, "num": v} for k, v in rank_pairs(counts, sort_by, desc, top, label)]
+
+
+def ngram_label(gram: Tuple[str, ...]) -> str:
+    return " ".join(gram)
+
+
+def sort_counts(counts: Dict[str, int], top: Optional[int] = None) -> List[Dict[str, int]]:
+    return rank_counts(counts, "char", top=top)
 
 
 def get_word_counts(text: str, stopwords: Optional[Set[str]] = None) -> Dict[str, int]:
-    counts: Dict[str, int] = {}
-    for token in iter_words(text):
-        if stopwords and token in stopwords:
-            continue
-        counts[token] = counts.get(token, 0) + 1
-    return counts
+    return dict(Counter(Tokenizer(stopwords).tokenize(text)))
 
 
-def sort_words(counts: Dict[str, int]) -> List[Dict[str, int]]:
-    items = [{"word": k, "num": v} for k, v in counts.items()]
-    items.sort(key=lambda x: x["num"], reverse=True)
-    return items
+def sort_words(counts: Dict[str, int], top: Optional[int] = None) -> List[Dict[str, int]]:
+    return rank_counts(counts, "word", top=top)
 
 
-def count_ngrams(text: str, n: int = 2, stopwords: Optional[Set[str]] = None) -> Dict[Tuple[str, ...], int]:
-    tokens = [t for t in iter_words(text) if not (stopwords and t in stopwords)]
-    counts: Dict[Tuple[str, ...], int] = {}
-    if n <= 1:
-        return counts
-    for i in range(len(tokens) - n + 1):
-        gram = tuple(tokens[i : i + n])
-        counts[gram] = counts.get(gram, 0) + 1
-    return counts
+def count_ngrams(text: str, n: int = 2, stopwords: Optional[Set[str]] = None, skip: int = 0) -> Mapping:
+    counter = NgramCounter(n, skip=skip)
+    counter.update(Tokenizer(stopwords).tokenize(text))
+    return counter.result()
 
 
-def sort_ngrams(counts: Dict[Tuple[str, ...], int]) -> List[Dict[str, int]]:
-    items = [{"ngram": " ".join(k), "num": v} for k, v in counts.items()]
-    items.sort(key=lambda x: x["num"], reverse=True)
-    return items
+def sort_ngrams(counts: Dict[Tuple[str, ...], int], top: Optional[int] = None) -> List[Dict[str, int]]:
+    return rank_counts(counts, "ngram", top=top, label=ngram_label)
 
 
 def get_num_words_whitespace_stream(
@@ -66,46 +741,71 @@ def get_num_words_whitespace_stream(
     return total
 
 
+def _count_range(file_path: str, start: int, end: Optional[int], kind: str, option, normalize_form: Optional[str], ascii_only: bool):
+    if kind == "chars":
+        counter = CharCounter(option)
+        if is_plain_file(file_path):
+            start = scan_ascii_prefix(file_path, counter, start, end)[1]
+            if start >= (os.path.getsize(file_path) if end is None else end):
+                return counter
+    lines = stream_normalized_lines(file_path, normalize_form, ascii_only, start=start, end=end)
+    if kind == "chars":
+        for batch in iter_line_batches(lines):
+            counter.update("".join(batch))
+    elif kind == "words":
+        # Word counts ignore line boundaries, so a whole batch is tokenized at once.
+        stopwords, capacity = option
+        counter = WordCounter(capacity=capacity)
+        tokenizer = Tokenizer(stopwords)
+        for batch in iter_line_batches(lines):
+            counter.update(tokenizer.tokenize("\n".join(batch)))
+    else:
+        n, stopwords, skip, epsilon, capacity = option
+        counter = NgramCounter(n, detached=start > 0, skip=skip, epsilon=epsilon, capacity=capacity)
+        tokenizer = Tokenizer(stopwords)
+        for batch in iter_line_batches(lines):
+            counter.update_lines(tokenizer.tokenize_lines(batch))
+    return counter
+
+
+def _count_stream(file_path: str, kind: str, option, normalize_form: Optional[str], ascii_only: bool, jobs: int):
+    if jobs > 1:
+        merged = map_byte_ranges(file_path, jobs, _count_range, kind, option, normalize_form, ascii_only)
+        if merged is not None:
+            return merged.result()
+    return _count_range(file_path, 0, None, kind, option, normalize_form, ascii_only).result()
+
+
 def count_chars_stream(
-    file_path: str, letters_only: bool = False, normalize_form: Optional[str] = None, ascii_only: bool = False
+    file_path: str,
+    letters_only: bool = False,
+    normalize_form: Optional[str] = None,
+    ascii_only: bool = False,
+    jobs: int = 1,
 ) -> Dict[str, int]:
-    counter: Counter[str] = Counter()
-    for line in stream_normalized_lines(file_path, normalize_form, ascii_only):
-        for ch in line:
-            ch = ch.lower()
-            if letters_only and not ch.isalpha():
-                continue
-            counter[ch] += 1
-    return dict(counter)
+    return _count_stream(file_path, "chars", letters_only, normalize_form, ascii_only, jobs)
 
 
 def get_word_counts_stream(
-    file_path: str, stopwords: Optional[Set[str]] = None, normalize_form: Optional[str] = None, ascii_only: bool = False
+    file_path: str,
+    stopwords: Optional[Set[str]] = None,
+    normalize_form: Optional[str] = None,
+    ascii_only: bool = False,
+    jobs: int = 1,
+    approx: Optional[int] = None,
 ) -> Dict[str, int]:
-    counter: Counter[str] = Counter()
-    for line in stream_normalized_lines(file_path, normalize_form, ascii_only):
-        for token in iter_words(line):
-            if stopwords and token in stopwords:
-                continue
-            counter[token] += 1
-    return dict(counter)
+    return _count_stream(file_path, "words", (stopwords, approx), normalize_form, ascii_only, jobs)
 
 
 def count_ngrams_stream(
-    file_path: str, n: int = 2, stopwords: Optional[Set[str]] = None, normalize_form: Optional[str] = None, ascii_only: bool = False
-) -> Dict[Tuple[str, ...], int]:
-    counter: Counter[Tuple[str, ...]] = Counter()
-    prev = deque(maxlen=n - 1)
-    for line in stream_normalized_lines(file_path, normalize_form, ascii_only):
-        tokens = [t for t in iter_words(line) if not (stopwords and t in stopwords)]
-        if not tokens and not prev:
-            continue
-        buf = list(prev) + tokens
-        for i in range(len(buf) - n + 1):
-            gram = tuple(buf[i : i + n])
-            counter[gram] += 1
-        if len(buf) >= n - 1:
-            prev.clear()
-            prev.extend(buf[-(n - 1) :])
-    return dict(counter)
-
+    file_path: str,
+    n: int = 2,
+    stopwords: Optional[Set[str]] = None,
+    normalize_form: Optional[str] = None,
+    ascii_only: bool = False,
+    jobs: int = 1,
+    skip: int = 0,
+    epsilon: Optional[float] = None,
+    approx: Optional[int] = None,
+) -> Mapping:
+    return _count_stream(file_path, "ngrams", (n, stopwords, skip, epsilon, approx), normalize_form, ascii_only, jobs)
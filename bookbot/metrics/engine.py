@@ -0,0 +1,290 @@
+import os
+import re
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Sequence, Set
+
+from ..cache import ResultCache
+from ..corpus import STDIN, is_plain_file, iter_line_batches, last_line_end, stream_normalized_lines
+from ..parallel import map_byte_ranges
+from ..utils.tokenization import Tokenizer
+from .categories import CategoryCounter
+from .counts import CharCounter, NgramCounter, WordCounter, scan_ascii_prefix
+from .readability import ReadabilityCounter
+from .vocabulary import vocabulary_from_counts
+
+METRICS = ("num_words", "chars", "words", "ngrams", "categories", "readability", "vocab")
+
+# "ngrams" uses the `n` argument; "ngrams<N>" (e.g. "ngrams3") requests a
+# specific size so several sizes can be computed in the same pass.
+_SIZED_NGRAMS = re.compile(r"ngrams([1-9][0-9]*)")
+
+
+def _ngram_size(metric: str, n: int) -> Optional[int]:
+    if metric == "ngrams":
+        return n
+    m = _SIZED_NGRAMS.fullmatch(metric)
+    return int(m.group(1)) if m else None
+
+
+class Analyzer:
+    # Accumulates every requested metric from one pass over a line stream.
+    # Analyzers are picklable and merge() in file order, so byte ranges of one
+    # file can be analyzed in separate processes (`detached` for every range
+    # but the first) and combined into exactly the serial result.
+
+    def __init__(
+        self,
+        metrics: Sequence[str],
+        letters_only: bool = False,
+        stopwords: Optional[Set[str]] = None,
+        n: int = 2,
+        detached: bool = False,
+        skip: int = 0,
+        epsilon: Optional[float] = None,
+        approx: Optional[int] = None,
+    ):
+        wanted = set(metrics)
+        ngram_sizes = {m: size for m in wanted if (size := _ngram_size(m, n)) is not None}
+        unknown = wanted.difference(METRICS).difference(ngram_sizes)
+        if unknown:
+            raise ValueError(f"unknown metrics: {', '.join(sorted(unknown))}")
+        if approx and "vocab" in wanted:
+            raise ValueError("vocab needs exact word counts")
+        self.wanted = wanted
+        self.stopwords = stopwords
+        self.tokenizer = Tokenizer(stopwords)
+        self.num_words = 0
+        self.count_ws = "num_words" in wanted
+        self.chars = CharCounter(letters_only) if "chars" in wanted else None
+        self.categories = CategoryCounter() if "categories" in wanted else None
+        self.words = WordCounter(capacity=approx) if wanted & {"words", "vocab"} else None
+        # Readability scores syllables from word frequencies; reuse the word
+        # counts when they are exact and see the same (unfiltered) tokens.
+        self.shared_words = self.words is not None and not stopwords and not approx
+        self.ngrams = {
+            m: NgramCounter(size, detached=detached, skip=skip, epsilon=epsilon, capacity=approx) for m, size in ngram_sizes.items()
+        }
+        self.readability = ReadabilityCounter(track_words=not self.shared_words) if "readability" in wanted else None
+
+    def feed(self, lines: Iterable[str]) -> None:
+        count_ws = self.count_ws
+        chars = self.chars
+        categories = self.categories
+        words = self.words
+        ngrams = list(self.ngrams.values())
+        readability = self.readability
+        # Grams and sentences need per-line tokens; everything else is counted
+        # over a whole batch of lines at once.
+        per_line = bool(ngrams) or readability is not None
+        if per_line:
+            tokenize_lines = Tokenizer().tokenize_lines
+            stopwords = self.tokenizer.stopwords
+        num_words = 0
+        for batch in iter_line_batches(lines):
+            if chars is not None or categories is not None:
+                text = "".join(batch)
+                if chars is not None:
+                    chars.update(text)
+                if categories is not None:
+                    categories.update(text)
+            if count_ws or (words is not None and not per_line):
+                joined = "\n".join(batch)
+                if count_ws:
+                    num_words += len(joined.split())
+                if words is not None and not per_line:
+                    words.update(self.tokenizer.tokenize(joined))
+            if per_line:
+                token_lines = tokenize_lines(batch)
+                if readability is not None:
+                    for line, tokens in zip(batch, token_lines):
+                        readability.update(line, tokens)
+                if stopwords:
+                    token_lines = [[t for t in tokens if t not in stopwords] for tokens in token_lines]
+                if words is not None:
+                    for tokens in token_lines:
+                        words.update(tokens)
+                for counter in ngrams:
+                    counter.update_lines(token_lines)
+        self.num_words += num_words
+
+    def feed_file(
+        self,
+        file_path: str | Path,
+        normalize_form: Optional[str] = None,
+        ascii_only: bool = False,
+        start: int = 0,
+        end: Optional[int] = None,
+    ) -> None:
+        if self.wanted <= {"num_words", "chars"} and is_plain_file(file_path):
+            chars = self.chars if self.chars is not None else CharCounter()
+            num_words, start = scan_ascii_prefix(str(file_path), chars, start, end)
+            self.num_words += num_words
+            if start >= (os.path.getsize(file_path) if end is None else end):
+                return
+        self.feed(stream_normalized_lines(file_path, normalize_form, ascii_only, start=start, end=end))
+
+    def merge(self, other: "Analyzer") -> "Analyzer":
+        self.num_words += other.num_words
+        for name in ("chars", "categories", "words", "readability"):
+            mine = getattr(self, name)
+            if mine is not None:
+                mine.merge(getattr(other, name))
+        for m, counter in self.ngrams.items():
+            counter.merge(other.ngrams[m])
+        return self
+
+    def result(self) -> Dict[str, object]:
+        wanted = self.wanted
+        results: Dict[str, object] = {}
+        if self.count_ws:
+            results["num_words"] = self.num_words
+        if self.chars is not None:
+            results["chars"] = self.chars.result()
+        word_counts = None
+        if self.words is not None:
+            word_counts = self.words.result()
+            if "words" in wanted:
+                results["words"] = word_counts
+            if "vocab" in wanted:
+                results["vocab"] = vocabulary_from_counts(word_counts)
+        for m, counter in self.ngrams.items():
+            results[m] = counter.result()
+        if self.categories is not None:
+            results["categories"] = self.categories.result()
+        if self.readability is not None:
+            results["readability"] = self.readability.result(word_counts if self.shared_words else None)
+        return results
+
+
+def analyze_lines(
+    lines: Iterable[str],
+    metrics: Sequence[str],
+    letters_only: bool = False,
+    stopwords: Optional[Set[str]] = None,
+    n: int = 2,
+    skip: int = 0,
+    epsilon: Optional[float] = None,
+    approx: Optional[int] = None,
+) -> Dict[str, object]:
+    analyzer = Analyzer(metrics, letters_only=letters_only, stopwords=stopwords, n=n, skip=skip, epsilon=epsilon, approx=approx)
+    analyzer.feed(lines)
+    return analyzer.result()
+
+
+def analyze_range(
+    file_path: str,
+    start: int,
+    end: int,
+    metrics: Sequence[str],
+    letters_only: bool = False,
+    stopwords: Optional[Set[str]] = None,
+    n: int = 2,
+    normalize_form: Optional[str] = None,
+    ascii_only: bool = False,
+    skip: int = 0,
+    epsilon: Optional[float] = None,
+    approx: Optional[int] = None,
+) -> Analyzer:
+    analyzer = Analyzer(
+        metrics, letters_only=letters_only, stopwords=stopwords, n=n, detached=start > 0, skip=skip, epsilon=epsilon, approx=approx
+    )
+    analyzer.feed_file(file_path, normalize_form, ascii_only, start=start, end=end)
+    return analyzer
+
+
+def _cache_options(
+    metrics: Sequence[str],
+    letters_only: bool,
+    stopwords: Optional[Set[str]],
+    n: int,
+    normalize_form: Optional[str],
+    ascii_only: bool,
+    skip: int,
+    epsilon: Optional[float],
+    approx: Optional[int],
+) -> tuple:
+    return (
+        sorted(metrics),
+        letters_only,
+        sorted(stopwords) if stopwords else None,
+        n,
+        normalize_form,
+        ascii_only,
+        skip,
+        epsilon,
+        approx,
+    )
+
+
+def _analyze_span(file_path: str | Path, start: int, end: int, jobs: int, range_args: tuple) -> Analyzer:
+    if jobs > 1:
+        parts = map_byte_ranges(file_path, jobs, analyze_range, *range_args, start=start, end=end)
+        if parts is not None:
+            return parts
+    return analyze_range(str(file_path), start, end, *range_args)
+
+
+def _analyze_appended(file_path: str | Path, cache: ResultCache, options: tuple, jobs: int, range_args: tuple) -> Dict[str, object]:
+    # Resumes the Analyzer checkpointed at the end of the file's complete
+    # lines when that prefix is unchanged, so an appended-to file costs only
+    # its new tail; otherwise (first run, truncation, rewrite) starts over.
+    # The new checkpoint again stops at the last newline: a partial last line
+    # may still grow, so it is analyzed separately and merged into the result
+    # only after the checkpoint has been written.
+    size = os.path.getsize(file_path)
+    complete = last_line_end(file_path, size)
+    resumed = cache.get_checkpoint(file_path, options)
+    if resumed is not None and resumed[0] <= complete:
+        offset, analyzer = resumed
+        if offset < complete:
+            analyzer.merge(_analyze_span(file_path, offset, complete, jobs, range_args))
+    else:
+        analyzer = _analyze_span(file_path, 0, complete, jobs, range_args)
+    cache.put_checkpoint(file_path, options, complete, analyzer)
+    if complete < size:
+        analyzer.merge(analyze_range(str(file_path), complete, size, *range_args))
+    return analyzer.result()
+
+
+def analyze_stream(
+    file_path: str | Path,
+    metrics: Sequence[str],
+    letters_only: bool = False,
+    stopwords: Optional[Set[str]] = None,
+    n: int = 2,
+    normalize_form: Optional[str] = None,
+    ascii_only: bool = False,
+    jobs: int = 1,
+    cache: Optional[ResultCache] = None,
+    skip: int = 0,
+    epsilon: Optional[float] = None,
+    approx: Optional[int] = None,
+) -> Dict[str, object]:
+    key = None
+    if str(file_path) == STDIN:
+        # Standard input can be neither cached nor split into byte ranges.
+        cache = None
+        jobs = 1
+    if cache is not None:
+        options = _cache_options(metrics, letters_only, stopwords, n, normalize_form, ascii_only, skip, epsilon, approx)
+        key = cache.key(file_path, options)
+        hit = cache.get(key)
+        if hit is not None:
+            return hit
+    results = None
+    range_args = (metrics, letters_only, stopwords, n, normalize_form, ascii_only, skip, epsilon, approx)
+    if cache is not None and cache.checkpoints and is_plain_file(file_path):
+        results = _analyze_appended(file_path, cache, options, jobs, range_args)
+    elif jobs > 1:
+        parts = map_byte_ranges(file_path, jobs, analyze_range, *range_args)
+        if parts is not None:
+            results = parts.result()
+    if results is None:
+        analyzer = Analyzer(
+            metrics, letters_only=letters_only, stopwords=stopwords, n=n, skip=skip, epsilon=epsilon, approx=approx
+        )
+        analyzer.feed_file(file_path, normalize_form, ascii_only)
+        results = analyzer.result()
+    if cache is not None:
+        cache.put(key, results)
+    return results
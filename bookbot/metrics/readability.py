@@ -1,9 +1,21 @@
+import io
 import re
-from typing import Dict
+from collections import Counter
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, List, Mapping, Optional
 
-from ..utils.tokenization import iter_words
+from ..corpus import iter_line_batches, stream_normalized_lines
+from ..utils.tokenization import Tokenizer
 
+_SENTENCE_BREAK = re.compile(r"[.!?]\s+(?=\S)")
+SYLLABLE_CACHE_SIZE = 1 << 16
+# Distinct words held before their syllables are added up, so memory stays
+# bounded however large the input is.
+WORD_TABLE_LIMIT = 1 << 16
 
+
+@lru_cache(maxsize=SYLLABLE_CACHE_SIZE)
 def _count_syllables(word: str) -> int:
     vowels = "aeiouy"
     w = word.lower()
@@ -24,12 +36,83 @@ def _count_syllables(word: str) -> int:
     return max(1, count)
 
 
-def readability_metrics(text: str) -> Dict[str, float]:
-    sentences = [s for s in re.split(r"(?<=[.!?])[\s\n]+", text.strip()) if s]
-    num_sentences = max(1, len(sentences))
-    tokens = list(iter_words(text))
-    num_words = max(1, len(tokens))
-    num_syllables = sum(_count_syllables(t) for t in tokens)
+def syllables_from_counts(word_counts: Mapping[str, int]) -> int:
+    # Word frequencies are Zipfian: scoring each distinct word once and
+    # weighting by its count is far cheaper than scoring every token.
+    return sum(_count_syllables(w) * num for w, num in word_counts.items())
+
+
+class ReadabilityCounter:
+    # A sentence ends at [.!?] followed by whitespace and more text; the last
+    # non-space character and any trailing whitespace are carried between
+    # lines so sentences spanning line breaks are counted like the whole text.
+    # `lead_space` records whitespace before the first text so that counters
+    # for consecutive chunks can be merged.
+    #
+    # Syllables are counted from a word-frequency table, flushed into
+    # `num_syllables` whenever it grows past WORD_TABLE_LIMIT words. With
+    # `track_words=False` the caller supplies the table to result() (the
+    # unfiltered word counts it already keeps) instead.
+
+    def __init__(self, track_words: bool = True):
+        self.num_breaks = 0
+        self.has_text = False
+        self.lead_space = False
+        self.last_char = ""
+        self.pending_space = False
+        self.num_words = 0
+        self.num_syllables = 0
+        self.words: Optional[Counter[str]] = Counter() if track_words else None
+
+    def update(self, line: str, tokens: List[str]) -> None:
+        stripped = line.strip()
+        if not self.has_text and line and line[0].isspace():
+            self.lead_space = True
+        if stripped:
+            if self.has_text and self.last_char in ".!?" and (self.pending_space or line[0].isspace()):
+                self.num_breaks += 1
+            self.num_breaks += len(_SENTENCE_BREAK.findall(stripped))
+            self.has_text = True
+            self.last_char = stripped[-1]
+            self.pending_space = line[-1].isspace()
+        elif line:
+            self.pending_space = True
+        self.num_words += len(tokens)
+        if self.words is not None:
+            self.words.update(tokens)
+            if len(self.words) > WORD_TABLE_LIMIT:
+                self.num_syllables += syllables_from_counts(self.words)
+                self.words.clear()
+
+    def merge(self, other: "ReadabilityCounter") -> "ReadabilityCounter":
+        if other.has_text:
+            if self.has_text and self.last_char in ".!?" and (self.pending_space or other.lead_space):
+                self.num_breaks += 1
+            if not self.has_text:
+                self.lead_space = self.lead_space or other.lead_space
+            self.num_breaks += other.num_breaks
+            self.has_text = True
+            self.last_char = other.last_char
+            self.pending_space = other.pending_space
+        elif other.lead_space:
+            if not self.has_text:
+                self.lead_space = True
+            self.pending_space = True
+        self.num_words += other.num_words
+        self.num_syllables += other.num_syllables
+        if self.words is not None:
+            self.words.update(other.words)
+        return self
+
+    def result(self, word_counts: Optional[Mapping[str, int]] = None) -> Dict[str, float]:
+        num_sentences = self.num_breaks + 1 if self.has_text else 0
+        num_syllables = self.num_syllables + syllables_from_counts(self.words if word_counts is None else word_counts)
+        return readability_from_counts(num_sentences, self.num_words, num_syllables)
+
+
+def readability_from_counts(num_sentences: int, num_words: int, num_syllables: int) -> Dict[str, float]:
+    num_sentences = max(1, num_sentences)
+    num_words = max(1, num_words)
     asl = num_words / num_sentences
     asw = num_syllables / num_words
     flesch = 206.835 - 1.015 * asl - 84.6 * asw
@@ -44,3 +127,21 @@ def readability_metrics(text: str) -> Dict[str, float]:
         "flesch_kincaid_grade": float(fk_grade),
     }
 
+
+def _feed_lines(counter: ReadabilityCounter, lines: Iterable[str]) -> ReadabilityCounter:
+    tokenize_lines = Tokenizer().tokenize_lines
+    for batch in iter_line_batches(lines):
+        for line, tokens in zip(batch, tokenize_lines(batch)):
+            counter.update(line, tokens)
+    return counter
+
+
+def readability_metrics(text: str) -> Dict[str, float]:
+    return _feed_lines(ReadabilityCounter(), io.StringIO(text)).result()
+
+
+def readability_metrics_stream(
+    file_path: str | Path, normalize_form: Optional[str] = None, ascii_only: bool = False
+) -> Dict[str, float]:
+    # `file_path` may be "-" for standard input.
+    return _feed_lines(ReadabilityCounter(), stream_normalized_lines(file_path, normalize_form, ascii_only)).result()
@@ -1,6 +1,7 @@
+from pathlib import Path
 from typing import Dict, Optional, Set
 
-from .counts import get_word_counts
+from .counts import get_word_counts, get_word_counts_stream
 
 STOPWORDS_EN: Set[str] = {
     'a','about','above','after','again','against','all','am','an','and','any','are','as','at',
@@ -16,7 +17,20 @@ STOPWORDS_EN: Set[str] = {
 }
 
 def vocabulary_metrics(text: str, stopwords: Optional[Set[str]] = None) -> Dict[str, float]:
-    counts = get_word_counts(text, stopwords=stopwords)
+    return vocabulary_from_counts(get_word_counts(text, stopwords=stopwords))
+
+
+def vocabulary_metrics_stream(
+    file_path: str | Path,
+    stopwords: Optional[Set[str]] = None,
+    normalize_form: Optional[str] = None,
+    ascii_only: bool = False,
+) -> Dict[str, float]:
+    counts = get_word_counts_stream(file_path, stopwords=stopwords, normalize_form=normalize_form, ascii_only=ascii_only)
+    return vocabulary_from_counts(counts)
+
+
+def vocabulary_from_counts(counts: Dict[str, int]) -> Dict[str, float]:
     tokens = sum(counts.values())
     types = len(counts)
     hapax = sum(1 for v in counts.values() if v == 1)
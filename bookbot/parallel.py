@@ -0,0 +1,306 @@
+import os
+from concurrent.futures import FIRST_COMPLETED, Executor, Future, ProcessPoolExecutor, wait
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, TypeVar
+
+from .corpus import MIN_CHUNK_BYTES, is_plain_file, split_byte_ranges
+
+T = TypeVar("T")
+
+# Files below SMALL_FILE_BYTES are grouped into one task of up to
+# BATCH_BYTES / BATCH_FILES so pickling and IPC are paid once per batch.
+SMALL_FILE_BYTES = 256 * 1024
+BATCH_BYTES = 4 * 1024 * 1024
+BATCH_FILES = 64
+
+
+# `bookbot serve` installs one long-lived pool, which process_pool() hands
+# out instead of starting a new pool for every run.
+_shared_pool: Optional[Executor] = None
+
+
+def set_shared_pool(pool: Optional[Executor]) -> None:
+    global _shared_pool
+    _shared_pool = pool
+
+
+def _call_in(cwd: str, fn: Callable[..., T], *args, **kwargs) -> T:
+    os.chdir(cwd)
+    return fn(*args, **kwargs)
+
+
+class _InDirectory(Executor):
+    # Runs calls in the submitter's working directory: the shared pool's
+    # workers serve every client, wherever it was started.
+
+    def __init__(self, pool: Executor, cwd: str):
+        self._pool = pool
+        self._cwd = cwd
+
+    def submit(self, fn, /, *args, **kwargs) -> Future:
+        return self._pool.submit(_call_in, self._cwd, fn, *args, **kwargs)
+
+
+@contextmanager
+def process_pool(jobs: int) -> Iterator[Executor]:
+    if _shared_pool is not None:
+        yield _InDirectory(_shared_pool, os.getcwd())
+        return
+    with ProcessPoolExecutor(max_workers=jobs) as ex:
+        yield ex
+
+
+def merge_accumulators(a, b):
+    return a.merge(b)
+
+
+def bounded_map(
+    executor: Executor,
+    task: Callable[..., T],
+    items: Iterable,
+    *task_args,
+    window: int,
+    ordered: bool = True,
+) -> Iterator[T]:
+    # Yields task(item, *task_args) for every item with at most `window`
+    # results in the parent at any time, submitted or waiting to be emitted.
+    # Unordered results stream in completion order; ordered results go
+    # through a reorder buffer, which counts against the same window so a
+    # slow early item stalls submission instead of growing the buffer.
+    it = iter(items)
+    pending: Dict[Future, int] = {}
+    buffered: Dict[int, T] = {}
+    submitted = 0
+    emitted = 0
+    exhausted = False
+    while True:
+        while not exhausted and len(pending) + len(buffered) < window:
+            try:
+                item = next(it)
+            except StopIteration:
+                exhausted = True
+                break
+            pending[executor.submit(task, item, *task_args)] = submitted
+            submitted += 1
+        if not pending:
+            return
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for fut in done:
+            index = pending.pop(fut)
+            if ordered:
+                buffered[index] = fut.result()
+            else:
+                yield fut.result()
+        while emitted in buffered:
+            yield buffered.pop(emitted)
+            emitted += 1
+
+
+def file_size(path: str | Path) -> int:
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def batch_small_files(
+    entries: Iterable[Tuple[int, str, int]],
+    small_bytes: int = SMALL_FILE_BYTES,
+    batch_bytes: int = BATCH_BYTES,
+    batch_files: int = BATCH_FILES,
+) -> Iterator[List[Tuple[int, str]]]:
+    # Work units of (input index, path) from (index, path, size) entries:
+    # one per large file, small files grouped in arrival order.
+    batch: List[Tuple[int, str]] = []
+    batch_size = 0
+    for i, path, size in entries:
+        if size >= small_bytes:
+            yield [(i, path)]
+            continue
+        batch.append((i, path))
+        batch_size += size
+        if batch_size >= batch_bytes or len(batch) >= batch_files:
+            yield batch
+            batch, batch_size = [], 0
+    if batch:
+        yield batch
+
+
+def plan_largest_first(
+    paths: Sequence[str],
+    sizes: Optional[Sequence[int]] = None,
+    small_bytes: int = SMALL_FILE_BYTES,
+    batch_bytes: int = BATCH_BYTES,
+    batch_files: int = BATCH_FILES,
+) -> List[List[Tuple[int, str]]]:
+    # Biggest files first, so the long tail of small files fills in around
+    # them instead of one worker finishing a huge file alone at the end.
+    if sizes is None:
+        sizes = [file_size(p) for p in paths]
+    order = sorted(range(len(paths)), key=lambda i: sizes[i], reverse=True)
+    return list(batch_small_files(((i, paths[i], sizes[i]) for i in order), small_bytes, batch_bytes, batch_files))
+
+
+def plan_in_segments(
+    paths: Sequence[str],
+    sizes: Optional[Sequence[int]] = None,
+    segment_units: int = 1,
+    small_bytes: int = SMALL_FILE_BYTES,
+    batch_bytes: int = BATCH_BYTES,
+    batch_files: int = BATCH_FILES,
+) -> Iterator[List[Tuple[int, str]]]:
+    # plan_largest_first() over consecutive runs of paths, each planned into
+    # at most `segment_units` units (or one, for a single file), so output
+    # in path order never waits on work more than one segment ahead. A run
+    # of F small files totalling B bytes makes at most B // batch_bytes +
+    # F // batch_files closed batches plus one open batch.
+    if sizes is None:
+        sizes = [file_size(p) for p in paths]
+
+    def plan(start: int, end: int) -> List[List[Tuple[int, str]]]:
+        units = plan_largest_first(paths[start:end], sizes[start:end], small_bytes, batch_bytes, batch_files)
+        return [[(start + i, path) for i, path in unit] for unit in units]
+
+    start = large = small = small_total = 0
+    for i, size in enumerate(sizes):
+        if size >= small_bytes:
+            large += 1
+        else:
+            small += 1
+            small_total += size
+        bound = large + small_total // batch_bytes + small // batch_files + (1 if small else 0)
+        if bound > segment_units and i > start:
+            yield from plan(start, i)
+            start = i
+            large, small, small_total = (1, 0, 0) if size >= small_bytes else (0, 1, size)
+    if start < len(paths):
+        yield from plan(start, len(paths))
+
+
+def run_unit(unit: List[Tuple[int, str]], task: Callable[..., T], *task_args) -> List[Tuple[int, T]]:
+    return [(i, task(path, *task_args)) for i, path in unit]
+
+
+def _flatten_units(done: Iterable[List[Tuple[int, T]]], ordered: bool) -> Iterator[T]:
+    buffered: Dict[int, T] = {}
+    emitted = 0
+    for results in done:
+        for i, res in results:
+            if not ordered:
+                yield res
+                continue
+            buffered[i] = res
+        while emitted in buffered:
+            yield buffered.pop(emitted)
+            emitted += 1
+
+
+def map_largest_first(
+    executor: Executor,
+    task: Callable[..., T],
+    paths: Sequence[str],
+    *task_args,
+    window: int,
+    ordered: bool = True,
+    sizes: Optional[Sequence[int]] = None,
+) -> Iterator[T]:
+    # Runs task(path, *task_args) for every path, scheduled by
+    # plan_largest_first(). Unordered output streams as units complete.
+    # Ordered output is planned in path-order segments of half the window:
+    # units come back in submission order and the reorder buffer keyed by
+    # input index only ever holds one segment, so at most `window` units of
+    # results are in the parent, running or waiting to be emitted.
+    if not ordered:
+        units = plan_largest_first(paths, sizes)
+        done = bounded_map(executor, run_unit, units, task, *task_args, window=window, ordered=False)
+        return _flatten_units(done, ordered=False)
+    segment = max(1, window // 2)
+    units = plan_in_segments(paths, sizes, segment)
+    done = bounded_map(executor, run_unit, units, task, *task_args, window=max(1, window - segment))
+    return _flatten_units(done, ordered=True)
+
+
+def map_discovered(
+    executor: Executor,
+    task: Callable[..., T],
+    files: Iterable[Tuple[str, int]],
+    *task_args,
+    window: int,
+) -> Iterator[T]:
+    # Completion-order results for (path, size) pairs that are still being
+    # discovered: work is submitted as soon as it is found.
+    entries = ((i, path, size) for i, (path, size) in enumerate(files))
+    done = bounded_map(executor, run_unit, batch_small_files(entries), task, *task_args, window=window, ordered=False)
+    return _flatten_units(done, ordered=False)
+
+
+def tree_reduce(executor: Executor, futures: List[Future], merge: Callable[[T, T], T]) -> T:
+    # Neighbours are merged pairwise, level by level, on the executor. Keeping
+    # the left operand first means the result (including dict insertion
+    # order) is identical to a serial left fold over `futures`.
+    level = list(futures)
+    if not level:
+        raise ValueError("tree_reduce() of an empty sequence")
+    while len(level) > 1:
+        nxt = [
+            executor.submit(merge, level[i].result(), level[i + 1].result())
+            for i in range(0, len(level) - 1, 2)
+        ]
+        if len(level) % 2:
+            nxt.append(level[-1])
+        level = nxt
+    return level[0].result()
+
+
+def _completed(value: T) -> Future:
+    fut: Future = Future()
+    fut.set_result(value)
+    return fut
+
+
+def tree_reduce_stream(executor: Executor, values: Iterable[T], merge: Callable[[T, T], T]) -> T:
+    # tree_reduce() for values that arrive one at a time, in order (e.g.
+    # from an ordered bounded_map). Neighbouring runs of equal length are
+    # merged on the executor once both are done, like a binary counter, so
+    # only about log2(n) partials wait here; the rest are merged, right to
+    # left, at the end. The left operand always comes first, as in a serial
+    # left fold.
+    runs: List[Tuple[int, Future]] = []
+    for value in values:
+        runs.append((1, _completed(value)))
+        while len(runs) > 1 and runs[-2][0] == runs[-1][0] and runs[-2][1].done() and runs[-1][1].done():
+            (size, left), (_, right) = runs.pop(-2), runs.pop()
+            runs.append((2 * size, executor.submit(merge, left.result(), right.result())))
+    if not runs:
+        raise ValueError("tree_reduce_stream() of an empty sequence")
+    _, total = runs.pop()
+    while runs:
+        _, left = runs.pop()
+        total = executor.submit(merge, left.result(), total.result())
+    return total.result()
+
+
+def map_byte_ranges(
+    file_path: str | Path,
+    jobs: int,
+    task: Callable[..., T],
+    *task_args,
+    merge: Callable[[T, T], T] = merge_accumulators,
+    min_chunk: int = MIN_CHUNK_BYTES,
+    start: int = 0,
+    end: Optional[int] = None,
+) -> Optional[T]:
+    # Runs task(path, start, end, *task_args) over newline-aligned byte ranges
+    # of one file (or of its [start, end) span) on a process pool and merges
+    # the partial results in file order. Returns None when the span is too
+    # small to be worth splitting, or the file is not a plain file (stdin,
+    # an archive member, compressed).
+    if not is_plain_file(file_path):
+        return None
+    ranges = split_byte_ranges(file_path, jobs, min_chunk, start, end)
+    if len(ranges) < 2:
+        return None
+    with process_pool(min(jobs, len(ranges))) as ex:
+        futs = [ex.submit(task, str(file_path), start, end, *task_args) for start, end in ranges]
+        return tree_reduce(ex, futs, merge)
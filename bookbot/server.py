@@ -0,0 +1,311 @@
+import contextlib
+import hmac
+import io
+import json
+import os
+import secrets
+import signal
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from socketserver import ThreadingMixIn, UnixStreamServer
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .cache import ResultCache
+from .client import TOKEN_HEADER, Client, default_socket_path, token_path
+from .corpus import STDIN
+from .parallel import set_shared_pool
+
+# The analyses served as JSON endpoints (POST /v1/<command>) and their
+# positional arguments; every other field of the request body is passed as
+# the matching --option.
+COMMANDS = {
+    "chars": ("paths",),
+    "words": ("paths",),
+    "ngrams": ("paths",),
+    "readability": ("paths",),
+    "vocab": ("paths",),
+    "categories": ("paths",),
+    "analyze": ("paths",),
+    "compare": ("path1", "path2"),
+}
+# Request fields that only make sense for a local CLI run.
+_IGNORED_FIELDS = {"cwd", "format", "out", "out_dir"}
+# Command lines the daemon refuses: they write or delete paths chosen by
+# the caller, read the daemon's own standard input, or never return. The
+# CLI runs them locally instead.
+_LOCAL_COMMANDS = {"cache", "serve", "watch"}
+_LOCAL_OPTIONS = ("out", "out_dir")
+_PATH_FIELDS = ("paths", "path1", "path2")
+
+
+def _refusal(args) -> Optional[str]:
+    if args.command in _LOCAL_COMMANDS:
+        return f"'{args.command}' is not run by the daemon"
+    for name in _LOCAL_OPTIONS:
+        if getattr(args, name, None):
+            return f"--{name.replace('_', '-')} is not run by the daemon"
+    for name in _PATH_FIELDS:
+        value = getattr(args, name, None)
+        if value == STDIN or (isinstance(value, list) and STDIN in value):
+            return f"standard input ('{STDIN}') is not read by the daemon"
+    return None
+
+
+def write_token(path: str, token: str) -> None:
+    # Created afresh with mode 0600, never through a symlink or a file
+    # someone else left there.
+    with contextlib.suppress(FileNotFoundError):
+        os.unlink(path)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL | os.O_NOFOLLOW, 0o600)
+    with os.fdopen(fd, "w", encoding="ascii") as f:
+        f.write(token + "\n")
+
+
+def command_argv(command: str, fields: Dict[str, object]) -> List[str]:
+    # {"paths": ["books/"], "top": 5, "letters_only": true, "include": ["*.txt"]}
+    # -> ["chars", "books/", "--top", "5", "--letters-only", "--include", "*.txt"]
+    positional = COMMANDS[command]
+    argv = [command]
+    for name in positional:
+        value = fields.get(name)
+        argv.extend(str(v) for v in (value if isinstance(value, list) else [value]))
+    for name, value in fields.items():
+        if name in positional or name in _IGNORED_FIELDS or value is None or value is False:
+            continue
+        flag = "--" + name.replace("_", "-")
+        if value is True:
+            argv.append(flag)
+        elif isinstance(value, list):
+            for v in value:
+                argv.extend([flag, str(v)])
+        else:
+            argv.extend([flag, str(value)])
+    return argv
+
+
+def _init_worker(memory_entries: int) -> None:
+    ResultCache.memory_entries = memory_entries
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+class _Daemon:
+    # Runs command lines exactly as the CLI would, from one warm process
+    # pool and with the parser built once. Commands run one at a time, each
+    # free to use the whole pool: the working directory and sys.stdout they
+    # run with are process-wide.
+
+    def __init__(self, parser, run: Callable, jobs: int, memory_entries: int, token: str):
+        self.parser = parser
+        self.token = token
+        self.run = run
+        self.jobs = jobs
+        self.memory_entries = memory_entries
+        self.cwd = os.getcwd()
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.requests = 0
+        self.pool = None
+        self._start_pool()
+
+    def _start_pool(self) -> None:
+        self.pool = ProcessPoolExecutor(max_workers=self.jobs, initializer=_init_worker, initargs=(self.memory_entries,))
+        # Start every worker now rather than on the first request.
+        for fut in [self.pool.submit(os.getpid) for _ in range(self.jobs)]:
+            fut.result()
+        set_shared_pool(self.pool)
+
+    def close(self) -> None:
+        set_shared_pool(None)
+        self.pool.shutdown(cancel_futures=True)
+
+    def status(self) -> Dict[str, object]:
+        return {
+            "pid": os.getpid(),
+            "jobs": self.jobs,
+            "requests": self.requests,
+            "uptime": round(time.time() - self.started, 1),
+            "memory_entries": len(ResultCache._memory),
+        }
+
+    def run_argv(self, argv: List[str], cwd: Optional[str] = None) -> Dict[str, object]:
+        out, err = io.StringIO(), io.StringIO()
+        code = 0
+        with self.lock, contextlib.redirect_stdout(out), contextlib.redirect_stderr(err):
+            self.requests += 1
+            try:
+                args = self.parser.parse_args(argv)
+                refused = _refusal(args)
+                if refused is not None:
+                    return {"refused": refused}
+                os.chdir(cwd or self.cwd)
+                self.run(args, self.parser)
+            except SystemExit as e:
+                if isinstance(e.code, str):
+                    err.write(e.code + "\n")
+                code = e.code if isinstance(e.code, int) else int(e.code is not None)
+            except BrokenProcessPool as e:
+                err.write(f"Error: {e}; restarting the worker pool\n")
+                code = 1
+                self._start_pool()
+            except Exception as e:
+                err.write(f"Error: {e}\n")
+                code = 1
+            finally:
+                os.chdir(self.cwd)
+        return {"exit": code, "stdout": out.getvalue(), "stderr": err.getvalue()}
+
+    def handle(self, name: str, body: Dict[str, object]) -> Tuple[int, Dict[str, object]]:
+        if name == "run":
+            if not isinstance(body.get("argv"), list):
+                return 400, {"error": "expected {\"argv\": [...]}"}
+            res = self.run_argv([str(a) for a in body["argv"]], body.get("cwd"))
+            if "refused" in res:
+                return 403, {"error": res["refused"]}
+            return 200, res
+        if name == "batch":
+            # Several requests in one round trip, answered in order.
+            responses = []
+            for item in body.get("requests", []):
+                item = dict(item)
+                status, payload = self.handle(str(item.pop("command", "run")), item)
+                responses.append({"status": status, **payload})
+            return 200, {"responses": responses}
+        if name in COMMANDS:
+            res = self.run_argv(command_argv(name, body) + ["--format", "json"], body.get("cwd"))
+            if "refused" in res:
+                return 403, {"error": res["refused"]}
+            if res["exit"] != 0:
+                return 400, {"error": res["stderr"].strip(), "exit": res["exit"]}
+            return 200, {"result": json.loads(res["stdout"])}
+        return 404, {"error": f"unknown endpoint: {name}"}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "bookbot"
+
+    def address_string(self) -> str:
+        return self.client_address[0] if isinstance(self.client_address, tuple) else "unix"
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+    def _reply(self, status: int, payload: Dict[str, object]) -> None:
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _refuse(self, post: bool) -> bool:
+        # Only the daemon's user can read its token. Browsers add Origin to
+        # cross-site requests and cannot send JSON to another origin
+        # without a preflight, so a web page cannot drive the daemon.
+        status, error = 0, ""
+        if self.headers.get("Origin") is not None:
+            status, error = 403, "cross-origin requests are not accepted"
+        elif not hmac.compare_digest(self.headers.get(TOKEN_HEADER, ""), self.server.daemon.token):
+            status, error = 401, f"missing or wrong {TOKEN_HEADER}"
+        elif post and self.headers.get_content_type() != "application/json":
+            status, error = 415, "expected Content-Type: application/json"
+        if status:
+            # Read a small body anyway, so the client sees the reply rather
+            # than a reset connection.
+            length = self.headers.get("Content-Length", "")
+            if length.isdigit() and int(length) <= 1 << 20:
+                self.rfile.read(int(length))
+            self.close_connection = True
+            self._reply(status, {"error": error})
+        return bool(status)
+
+    def do_GET(self) -> None:
+        if self._refuse(post=False):
+            return
+        if self.path == "/v1/status":
+            self._reply(200, self.server.daemon.status())
+        else:
+            self._reply(404, {"error": f"unknown endpoint: {self.path}"})
+
+    def do_POST(self) -> None:
+        if self._refuse(post=True):
+            return
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+        except ValueError:
+            self._reply(400, {"error": "request body is not JSON"})
+            return
+        if not self.path.startswith("/v1/") or not isinstance(body, dict):
+            self._reply(404, {"error": f"unknown endpoint: {self.path}"})
+            return
+        self._reply(*self.server.daemon.handle(self.path[len("/v1/") :], body))
+
+
+class _UnixHTTPServer(ThreadingMixIn, UnixStreamServer):
+    daemon_threads = True
+
+
+def serve(
+    parser,
+    run: Callable,
+    socket_path: Optional[str] = None,
+    port: Optional[int] = None,
+    jobs: int = 1,
+    memory_entries: int = 1024,
+    quiet: bool = False,
+) -> None:
+    path = None
+    if port is None:
+        path = socket_path or default_socket_path()
+        if os.path.exists(path):
+            # A live daemon answers; a socket left by one that died is replaced.
+            try:
+                Client(path).status()
+                print(f"Error: bookbot serve is already running on {path}", file=sys.stderr)
+                sys.exit(1)
+            except OSError:
+                os.unlink(path)
+    ResultCache.memory_entries = memory_entries
+    token = secrets.token_hex(32)
+    daemon = _Daemon(parser, run, jobs, memory_entries, token)
+    if path is None:
+        server = ThreadingHTTPServer(("127.0.0.1", port), _Handler)
+        where = f"http://127.0.0.1:{server.server_port}"
+    else:
+        umask = os.umask(0o077)
+        try:
+            server = _UnixHTTPServer(path, _Handler)
+        finally:
+            os.umask(umask)
+        where = path
+    server.daemon = daemon
+    # Written once the address is ours, so a daemon already serving it
+    # keeps its token.
+    token_file = token_path(socket_path, port)
+    try:
+        write_token(token_file, token)
+    except OSError as e:
+        print(f"Error: cannot write the daemon token {token_file}: {e}", file=sys.stderr)
+        server.server_close()
+        if path is not None:
+            os.unlink(path)
+        daemon.close()
+        sys.exit(1)
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    if not quiet:
+        print(f"bookbot serve: listening on {where} with {jobs} workers", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        for leftover in (path, token_file):
+            if leftover is not None:
+                with contextlib.suppress(OSError):
+                    os.unlink(leftover)
+        daemon.close()
@@ -1,13 +1,38 @@
 import re
 import unicodedata
-from typing import Iterable, Optional
+from typing import Iterable, List, Optional
+
+# Tokens start and end with a letter, so stripping apostrophes is never needed.
+# Lowercasing must happen before matching: some non-ASCII letters (e.g. the
+# Kelvin sign) lowercase to ASCII.
+_WORD_RE = re.compile(r"[A-Za-z]+(?:'[A-Za-z]+)?")
+
+
+class Tokenizer:
+    # Lowercases and splits text into word tokens, dropping stopwords.
+    # Tokens never span a newline, so many lines can be tokenized in a single
+    # call when per-line token lists are not needed.
+
+    def __init__(self, stopwords: Optional[Iterable[str]] = None):
+        self.stopwords = frozenset(stopwords) if stopwords else frozenset()
+
+    def tokenize(self, text: str) -> List[str]:
+        tokens = _WORD_RE.findall(text.lower())
+        stopwords = self.stopwords
+        if stopwords:
+            return [t for t in tokens if t not in stopwords]
+        return tokens
+
+    def tokenize_lines(self, lines: Iterable[str]) -> List[List[str]]:
+        findall = _WORD_RE.findall
+        stopwords = self.stopwords
+        if stopwords:
+            return [[t for t in findall(line.lower()) if t not in stopwords] for line in lines]
+        return [findall(line.lower()) for line in lines]
 
 
 def iter_words(text: str) -> Iterable[str]:
-    for token in re.findall(r"[A-Za-z]+(?:'[A-Za-z]+)?", text.lower()):
-        token = token.strip("'")
-        if token:
-            yield token
+    return iter(_WORD_RE.findall(text.lower()))
 
 
 def prepare_text_chunk(s: str, normalize_form: Optional[str] = None, ascii_only: bool = False) -> str:
@@ -16,4 +41,3 @@ def prepare_text_chunk(s: str, normalize_form: Optional[str] = None, ascii_only:
     if ascii_only:
         s = unicodedata.normalize("NFKD", s).encode("ascii", "ignore").decode("ascii")
     return s
-
@@ -0,0 +1,227 @@
+import ctypes
+import ctypes.util
+import hashlib
+import io
+import os
+import select
+import time
+import zlib
+from typing import Dict, Iterator, List, Optional, Sequence, Set, Tuple
+
+from .corpus import STDIN, open_binary, split_member, walk_files
+from .metrics.engine import Analyzer
+from .utils.tokenization import prepare_text_chunk
+
+# Files are cut into content-defined chunks: after any line whose CRC has
+# its low CHUNK_BITS bits clear, once the chunk holds MIN_CHUNK_BYTES. An
+# edit changes only the chunks around it; the chunks before and after it
+# keep their contents (if not their offsets) and their Analyzers are reused.
+CHUNK_BITS = 8
+MIN_CHUNK_BYTES = 8 * 1024
+MAX_CHUNK_BYTES = 256 * 1024
+
+DEBOUNCE_SECONDS = 0.05
+POLL_SECONDS = 0.5
+
+
+def split_chunks(data: bytes) -> List[bytes]:
+    mask = (1 << CHUNK_BITS) - 1
+    chunks = []
+    start = pos = 0
+    for line in data.split(b"\n"):
+        pos += len(line) + 1
+        size = pos - start
+        if size >= MAX_CHUNK_BYTES or (size >= MIN_CHUNK_BYTES and not zlib.crc32(line) & mask):
+            chunks.append(data[start:pos])
+            start = pos
+    if start < len(data):
+        chunks.append(data[start:])
+    return chunks
+
+
+class FileState:
+    # The per-chunk Analyzers of one file's latest contents. update() analyzes
+    # only chunks not seen in the previous version and merges all of them in
+    # order, which equals analyzing the whole file (see Analyzer.merge).
+
+    def __init__(
+        self,
+        metrics: Sequence[str],
+        letters_only: bool = False,
+        stopwords: Optional[Set[str]] = None,
+        n: int = 2,
+        normalize_form: Optional[str] = None,
+        ascii_only: bool = False,
+    ):
+        self.options = dict(metrics=metrics, letters_only=letters_only, stopwords=stopwords, n=n)
+        self.normalize_form = normalize_form
+        self.ascii_only = ascii_only
+        self.chunks: Dict[Tuple[bytes, bool], Analyzer] = {}
+        self.reused = 0
+
+    def _analyze_chunk(self, chunk: bytes, first: bool) -> Analyzer:
+        analyzer = Analyzer(detached=not first, **self.options)
+        f = io.TextIOWrapper(io.BytesIO(chunk), encoding="utf-8", errors="ignore")
+        analyzer.feed(prepare_text_chunk(line, self.normalize_form, self.ascii_only) for line in f)
+        return analyzer
+
+    def update(self, data: bytes) -> Dict[str, object]:
+        chunks: Dict[Tuple[bytes, bool], Analyzer] = {}
+        total = Analyzer(**self.options)
+        self.reused = 0
+        for i, chunk in enumerate(split_chunks(data)):
+            key = (hashlib.blake2b(chunk, digest_size=16).digest(), i == 0)
+            analyzer = chunks.get(key) or self.chunks.get(key)
+            if analyzer is None:
+                analyzer = self._analyze_chunk(chunk, i == 0)
+            else:
+                self.reused += 1
+            chunks[key] = analyzer
+            total.merge(analyzer)
+        self.chunks = chunks
+        return total.result()
+
+
+# inotify(7) event bits: anything that can change, add or remove a file.
+_IN_MODIFY = 0x002
+_IN_CLOSE_WRITE = 0x008
+_IN_MOVED_FROM = 0x040
+_IN_MOVED_TO = 0x080
+_IN_CREATE = 0x100
+_IN_DELETE = 0x200
+_WATCH_MASK = _IN_MODIFY | _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE
+
+
+class _Inotify:
+    # Directory watches through libc's inotify calls (Linux only). Events are
+    # only used as a wake-up: what changed is found by comparing stats.
+
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._libc = libc
+        self.fd = fd
+        self._watched: Set[str] = set()
+
+    def add(self, directory: str) -> None:
+        if directory not in self._watched:
+            if self._libc.inotify_add_watch(self.fd, os.fsencode(directory), _WATCH_MASK) >= 0:
+                self._watched.add(directory)
+
+    def wait(self, timeout: Optional[float]) -> bool:
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return False
+        try:
+            while os.read(self.fd, 1 << 16):
+                pass
+        except BlockingIOError:
+            pass
+        return True
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+class Watcher:
+    # Reports files under `paths` (with the walk_files filters) that were
+    # added, changed or removed, waiting for inotify events or, without
+    # inotify, polling every `poll` seconds. Bursts of events (an editor's
+    # write-rename-chmod on save) are debounced into one rescan.
+
+    def __init__(
+        self,
+        paths: Sequence[str],
+        include: Optional[Sequence[str]] = None,
+        exclude: Optional[Sequence[str]] = None,
+        extensions: Optional[Sequence[str]] = None,
+        debounce: float = DEBOUNCE_SECONDS,
+        poll: float = POLL_SECONDS,
+        use_inotify: bool = True,
+    ):
+        if STDIN in map(str, paths):
+            raise ValueError("cannot watch standard input")
+        self.paths = [str(p) for p in paths]
+        self.filters = (include, exclude, extensions)
+        self.debounce = debounce
+        self.poll = poll
+        self.stats: Dict[str, Tuple[int, int]] = {}
+        self.inotify = None
+        if use_inotify:
+            try:
+                self.inotify = _Inotify()
+            except (OSError, AttributeError):
+                self.inotify = None
+
+    def _watch_dirs(self) -> None:
+        for p in self.paths:
+            p = split_member(p)[0]
+            if os.path.isdir(p):
+                for root, _, _ in os.walk(p):
+                    self.inotify.add(root)
+            else:
+                self.inotify.add(os.path.dirname(os.path.abspath(p)))
+
+    def scan(self) -> Tuple[List[str], List[str]]:
+        # (changed or new paths, removed paths) since the previous scan.
+        if self.inotify is not None:
+            self._watch_dirs()
+        stats = {}
+        for info in walk_files(self.paths, *self.filters):
+            path = str(info.path)
+            try:
+                st = os.stat(split_member(path)[0])
+            except OSError:
+                continue
+            stats[path] = (info.size, st.st_mtime_ns)
+        changed = [p for p, st in stats.items() if self.stats.get(p) != st]
+        removed = [p for p in self.stats if p not in stats]
+        self.stats = stats
+        return changed, removed
+
+    def wait(self) -> None:
+        # Blocks until something may have changed and has settled.
+        if self.inotify is None:
+            time.sleep(self.poll)
+            return
+        self.inotify.wait(None)
+        while self.inotify.wait(self.debounce):
+            pass
+
+    def close(self) -> None:
+        if self.inotify is not None:
+            self.inotify.close()
+            self.inotify = None
+
+
+def watch_results(
+    watcher: Watcher,
+    metrics: Sequence[str],
+    letters_only: bool = False,
+    stopwords: Optional[Set[str]] = None,
+    n: int = 2,
+    normalize_form: Optional[str] = None,
+    ascii_only: bool = False,
+) -> Iterator[Tuple[str, Optional[Dict[str, object]]]]:
+    # Yields (path, results) for every file at start and again whenever it
+    # changes, and (path, None) when it is removed. Per-file state stays in
+    # memory between changes.
+    states: Dict[str, FileState] = {}
+    while True:
+        changed, removed = watcher.scan()
+        for path in removed:
+            states.pop(path, None)
+            yield path, None
+        for path in changed:
+            state = states.get(path)
+            if state is None:
+                state = states[path] = FileState(metrics, letters_only, stopwords, n, normalize_form, ascii_only)
+            try:
+                with open_binary(path) as f:
+                    data = f.read()
+            except OSError:
+                continue
+            yield path, state.update(data)
+        watcher.wait()
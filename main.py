@@ -1,4 +1,4 @@
-from bookbot.cli import main
+from bookbot.client import main
 
 
 if __name__ == "__main__":
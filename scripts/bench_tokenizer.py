@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: per-line `iter_words` generator vs the batched `Tokenizer`.
+
+Usage:
+  python scripts/bench_tokenizer.py [FILE] [--repeat 5] [--stopwords]
+
+Without FILE a synthetic text of ~200k lines is used.
+"""
+from __future__ import annotations
+
+import argparse
+import re
+import sys
+import timeit
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from bookbot.corpus import iter_line_batches  # noqa: E402
+from bookbot.metrics.vocabulary import STOPWORDS_EN  # noqa: E402
+from bookbot.utils.tokenization import Tokenizer  # noqa: E402
+
+
+def legacy_iter_words(text):
+    # The generator as it was before Tokenizer existed.
+    for token in re.findall(r"[A-Za-z]+(?:'[A-Za-z]+)?", text.lower()):
+        token = token.strip("'")
+        if token:
+            yield token
+
+
+def legacy(lines, stopwords):
+    out = []
+    for line in lines:
+        out.append([t for t in legacy_iter_words(line) if not (stopwords and t in stopwords)])
+    return out
+
+
+def batched(lines, stopwords):
+    tokenizer = Tokenizer(stopwords)
+    out = []
+    for batch in iter_line_batches(lines):
+        out.extend(tokenizer.tokenize_lines(batch))
+    return out
+
+
+def joined(lines, stopwords):
+    tokenizer = Tokenizer(stopwords)
+    out = []
+    for batch in iter_line_batches(lines):
+        out.extend(tokenizer.tokenize("\n".join(batch)))
+    return out
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("file", nargs="?", help="Text file to tokenize")
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--stopwords", action="store_true", help="Filter English stopwords")
+    args = ap.parse_args()
+
+    if args.file:
+        lines = Path(args.file).read_text(encoding="utf-8", errors="ignore").splitlines(keepends=True)
+    else:
+        lines = ["Call me Ishmael. Some years ago--never mind how long precisely--having little or no money,\n"] * 200_000
+    stopwords = STOPWORDS_EN if args.stopwords else None
+
+    expected = legacy(lines, stopwords)
+    assert batched(lines, stopwords) == expected
+    assert joined(lines, stopwords) == [t for toks in expected for t in toks]
+
+    base = None
+    for name, fn in (("legacy generator", legacy), ("tokenize_lines", batched), ("tokenize (joined)", joined)):
+        best = min(timeit.repeat(lambda: fn(lines, stopwords), number=1, repeat=args.repeat))
+        base = base or best
+        print(f"{name:>18}: {best * 1000:8.1f} ms  ({base / best:.2f}x)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -19,12 +19,19 @@ from bookbot.metrics.counts import (  # noqa: F401
     get_word_counts_stream,
     count_ngrams_stream,
 )
-from bookbot.metrics.readability import readability_metrics  # noqa: F401
+from bookbot.metrics.readability import (  # noqa: F401
+    readability_metrics,
+    readability_metrics_stream,
+)
 from bookbot.metrics.vocabulary import (  # noqa: F401
     vocabulary_metrics,
+    vocabulary_metrics_stream,
     STOPWORDS_EN,
 )
-from bookbot.metrics.categories import category_counts  # noqa: F401
+from bookbot.metrics.categories import (  # noqa: F401
+    category_counts,
+    category_counts_stream,
+)
 from bookbot.rendering import print_histogram  # noqa: F401
 
 
@@ -0,0 +1,64 @@
+import asyncio
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+
+from bookbot.aio import analyze_many, stream_results
+from bookbot.metrics.engine import analyze_stream
+
+METRICS = ["num_words", "chars", "words"]
+
+
+def _corpus(tmp_path: Path):
+    for i in range(12):
+        (tmp_path / f"f{i:02}.txt").write_text(f"Book {i}. " + "word " * i + "\n", encoding="utf-8")
+    return sorted(str(p) for p in tmp_path.glob("*.txt"))
+
+
+def test_analyze_many_matches_serial_results(tmp_path: Path):
+    paths = _corpus(tmp_path)
+    with ProcessPoolExecutor(max_workers=2) as pool:
+        results = asyncio.run(analyze_many([tmp_path, tmp_path / "missing.txt"], METRICS, executor=pool, concurrency=1))
+    assert [r.path for r in results] == paths
+    assert all(r.error is None and r.results == analyze_stream(r.path, METRICS) for r in results)
+
+
+def test_stream_results_can_stop_early(tmp_path: Path):
+    paths = _corpus(tmp_path)
+
+    async def first_two(pool):
+        seen = []
+        results = stream_results(paths, ["num_words"], executor=pool, concurrency=2)
+        async for res in results:
+            seen.append(res)
+            if len(seen) == 2:
+                break
+        await results.aclose()
+        return seen
+
+    with ProcessPoolExecutor(max_workers=2) as pool:
+        seen = asyncio.run(first_two(pool))
+    assert len(seen) == 2 and {r.path for r in seen} <= set(paths)
+
+
+def test_ordered_results_count_against_concurrency(tmp_path: Path):
+    # Later paths are larger, so they are planned first; the first path
+    # must still be yielded before more than `concurrency` units start.
+    for i in range(8):
+        (tmp_path / f"f{i}.txt").write_text("word " * (60_000 + 1000 * i), encoding="utf-8")
+    submitted = []
+
+    class Counting(ThreadPoolExecutor):
+        def submit(self, fn, /, *args, **kwargs):
+            submitted.append(args[0])
+            return super().submit(fn, *args, **kwargs)
+
+    async def run(pool):
+        seen = []
+        async for res in stream_results([tmp_path], ["num_words"], executor=pool, concurrency=2, ordered=True):
+            seen.append((res.path, len(submitted)))
+        return seen
+
+    with Counting(max_workers=2) as pool:
+        seen = asyncio.run(run(pool))
+    assert [Path(p).name for p, _ in seen] == [f"f{i}.txt" for i in range(8)]
+    assert seen[0][1] <= 2 and all(n <= i + 3 for i, (_, n) in enumerate(seen))
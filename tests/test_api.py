@@ -0,0 +1,50 @@
+import pickle
+from pathlib import Path
+
+import stats as S
+from bookbot.api import FileAnalysis, Table, analyze, analyze_files
+from bookbot.metrics.counts import WordCounter, rank_rows, sort_counts, sort_ngrams, sort_words
+from bookbot.metrics.engine import analyze_stream
+
+METRICS = ["num_words", "chars", "words", "ngrams", "ngrams3", "readability", "vocab"]
+TEXT = "The whale, the white whale. Call me Ishmael; the whale is white.\n" * 3 + "Ishmael sails.\n"
+
+
+def test_tables_rank_like_the_row_functions(tmp_path: Path):
+    book = tmp_path / "book.txt"
+    book.write_text(TEXT, encoding="utf-8")
+    res = analyze_stream(book, METRICS, stopwords=S.STOPWORDS_EN)
+    a = analyze(book, METRICS, stopwords=S.STOPWORDS_EN)
+    for top in (None, 3, 0):
+        assert a.chars.top(top).to_json() == sort_counts(res["chars"], top)
+        assert a.words.top(top).to_json() == sort_words(res["words"], top)
+        assert a.ngrams["ngrams"].top(top).to_json() == sort_ngrams(res["ngrams"], top)
+        assert a.ngrams["ngrams3"].top(top).to_json() == sort_ngrams(res["ngrams3"], top)
+    assert list(a.words.top(2, "word", desc=False).items()) == rank_rows(res["words"], "word", False, 2)[0]
+    assert a.num_words == res["num_words"] and a.vocab == res["vocab"] and a.readability == res["readability"]
+    assert a.words.total == sum(res["words"].values()) and a.words.top(1).total == a.words.total
+    assert a.words["whale"] == res["words"]["whale"] == 9
+    assert a.ngrams["ngrams"][("white", "whale")] == a.ngrams["ngrams"]["white whale"] == res["ngrams"][("white", "whale")]
+    assert "moby" not in a.words
+    copy = pickle.loads(pickle.dumps(a))
+    assert copy.to_json(5) == a.to_json(5) and copy.to_json(5)["ngrams"] == sort_ngrams(res["ngrams"], 5)
+
+
+def test_approximate_tables_carry_error_bounds():
+    counts = WordCounter(capacity=2)
+    counts.update("a b a c a d b".split())
+    approx = counts.result()
+    table = Table.from_counts(approx, "word")
+    pairs, errors = rank_rows(approx)
+    assert table.top().to_json() == [{"word": k, "num": v, "err": e} for (k, v), e in zip(pairs, errors)]
+    assert (table.max_error, table.total) == (approx.floor, approx.total)
+
+
+def test_analyze_files_in_path_order(tmp_path: Path):
+    for i in range(5):
+        (tmp_path / f"f{i}.txt").write_text("word " * (i + 1) + "\n", encoding="utf-8")
+    serial = list(analyze_files([tmp_path], ["num_words", "words"]))
+    pooled = list(analyze_files([tmp_path], ["num_words", "words"], jobs=2))
+    assert all(isinstance(f, FileAnalysis) for f in pooled)
+    assert [f.to_json() for f in pooled] == [f.to_json() for f in serial]
+    assert [f.num_words for f in serial] == [1, 2, 3, 4, 5]
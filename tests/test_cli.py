@@ -1,3 +1,5 @@
+import json
+
 from bookbot.cli import main as cli_main
 
 
@@ -7,3 +9,66 @@ def test_cli_smoke_chars_letters_only(capsys):
     assert "BOOKBOT" in out
     assert "e:" in out
 
+
+
+def test_cli_analyze_bundle_matches_single_commands(tmp_path, capsys):
+    p = tmp_path / "a.txt"
+    p.write_text("The whale. The white whale!\nCall me Ishmael.\n", encoding="utf-8")
+    cli_main(["analyze", str(p), "--metrics", "words,ngrams2,readability", "--top", "2", "--format", "json"])
+    bundle = json.loads(capsys.readouterr().out)["files"][0]
+    cli_main(["words", str(p), "--top", "2", "--format", "json"])
+    words = json.loads(capsys.readouterr().out)["files"][0]
+    assert bundle["num_words"] == words["num_words"]
+    assert bundle["words"] == words["items"]
+    assert [it["ngram"] for it in bundle["ngrams2"]] == ["the whale", "whale the"]
+    assert bundle["readability"]["num_sentences"] == 3.0
+
+
+def test_cli_analyze_out_dir_writes_one_bundle_per_file(tmp_path):
+    src = tmp_path / "src"
+    src.mkdir()
+    (src / "a.txt").write_text("One. Two.", encoding="utf-8")
+    (src / "b.txt").write_text("Three.", encoding="utf-8")
+    out = tmp_path / "out"
+    cli_main(["analyze", str(src), "--format", "md", "--out-dir", str(out)])
+    assert len(list(out.glob("*.md"))) == 2
+
+
+def test_bundle_file_names_do_not_collide():
+    from bookbot.cli import _bundle_file_name
+
+    paths = ["a/b__c.txt", "a__b/c.txt", "a_/b.txt", "a/_b.txt", "a/b.txt", "a__b.txt", "books.zip::ch_1.txt"]
+    names = [_bundle_file_name(p, "md") for p in paths]
+    assert len(set(names)) == len(paths)
+    assert names[4] == "a__b.txt.md" and names[6] == "books.zip__ch_1.txt.md"
+
+
+def test_cli_words_aggregate_sums_files(tmp_path, capsys):
+    (tmp_path / "a.txt").write_text("whale whale sea", encoding="utf-8")
+    (tmp_path / "b.txt").write_text("sea ship whale", encoding="utf-8")
+    cli_main(["words", str(tmp_path), "--aggregate", "--format", "json", "-j", "2"])
+    data = json.loads(capsys.readouterr().out)
+    assert data["aggregate"] is True
+    [corpus] = data["files"]
+    assert corpus["num_words"] == 6
+    assert {it["word"]: it["num"] for it in corpus["items"]} == {"whale": 3, "sea": 2, "ship": 1}
+
+
+def test_cli_cache_reuses_and_invalidates_results(tmp_path, capsys):
+    p = tmp_path / "a.txt"
+    p.write_text("whale sea whale", encoding="utf-8")
+    cache_dir = tmp_path / "cache"
+    argv = ["words", str(p), "--format", "json", "--cache-dir", str(cache_dir)]
+    cli_main(argv)
+    first = json.loads(capsys.readouterr().out)["files"][0]
+    assert len(list(cache_dir.rglob("*.pkl"))) == 1
+    cli_main(argv)
+    assert json.loads(capsys.readouterr().out)["files"][0] == first
+    p.write_text("whale sea whale ship", encoding="utf-8")
+    cli_main(argv)
+    assert json.loads(capsys.readouterr().out)["files"][0]["num_words"] == 4
+    (cache_dir / "notes.txt").write_text("not a cache entry", encoding="utf-8")
+    cli_main(["cache", "clear", "--cache-dir", str(cache_dir)])
+    assert "Removed 2 entries" in capsys.readouterr().out
+    assert not list(cache_dir.rglob("*.pkl"))
+    assert [p.name for p in cache_dir.iterdir()] == ["notes.txt"]
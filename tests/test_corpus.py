@@ -0,0 +1,63 @@
+from bookbot.corpus import collect_file_infos, collect_files, walk_files
+
+
+def _tree(tmp_path):
+    for rel in ["a/b/one.txt", "a-c/two.md", "skip/three.txt", "four.TXT"]:
+        p = tmp_path / rel
+        p.parent.mkdir(parents=True, exist_ok=True)
+        p.write_text("x" * len(rel), encoding="utf-8")
+
+
+def test_collect_files_sorted_like_path_sort_with_sizes(tmp_path):
+    _tree(tmp_path)
+    files = collect_files([tmp_path])
+    assert files == sorted(p for p in tmp_path.rglob("*") if p.is_file())
+    infos = collect_file_infos([tmp_path], workers=3)
+    assert [i.path for i in infos] == files
+    assert all(i.size == i.path.stat().st_size for i in infos)
+
+
+def names(infos):
+    return sorted(i.path.name for i in infos)
+
+
+def test_walk_files_filters_and_dedupes(tmp_path):
+    _tree(tmp_path)
+    assert names(walk_files([tmp_path], include=["*.txt"])) == ["one.txt", "three.txt"]
+    assert names(walk_files([tmp_path], exclude=["skip"], extensions=[".txt"])) == ["four.TXT", "one.txt"]
+    explicit = tmp_path / "a-c" / "two.md"
+    assert names(walk_files([explicit, tmp_path], extensions=[".txt"])) == ["four.TXT", "one.txt", "three.txt", "two.md"]
+
+
+def test_compressed_files_and_archive_members(tmp_path):
+    import gzip
+    import io
+    import tarfile
+    import zipfile
+
+    from bookbot.corpus import get_book_text
+    from bookbot.metrics.engine import analyze_stream
+
+    text = "The whale. The white whale!\n" * 50
+    (tmp_path / "plain.txt").write_text(text, encoding="utf-8")
+    (tmp_path / "packed.txt.gz").write_bytes(gzip.compress(text.encode("utf-8")))
+    (tmp_path / "sniffed.dat").write_bytes(gzip.compress(text.encode("utf-8")))
+    with zipfile.ZipFile(tmp_path / "books.zip", "w") as z:
+        z.writestr("inner/one.txt", text)
+        z.writestr("inner/two.md", "skipped")
+    with tarfile.open(tmp_path / "books.tar.gz", "w:gz") as t:
+        data = text.encode("utf-8")
+        info = tarfile.TarInfo("deep/one.txt")
+        info.size = len(data)
+        t.addfile(info, io.BytesIO(data))
+
+    paths = [str(i.path) for i in collect_file_infos([tmp_path], extensions=[".txt"])]
+    zip_member = f"{tmp_path / 'books.zip'}::inner/one.txt"
+    tar_member = f"{tmp_path / 'books.tar.gz'}::deep/one.txt"
+    assert paths == sorted([tar_member, zip_member, str(tmp_path / "packed.txt.gz"), str(tmp_path / "plain.txt")])
+    assert [i.size for i in walk_files([zip_member])] == [len(text)]
+
+    expected = analyze_stream(tmp_path / "plain.txt", ["chars", "words", "readability"])
+    for path in [zip_member, tar_member, tmp_path / "packed.txt.gz", tmp_path / "sniffed.dat"]:
+        assert get_book_text(path) == text
+        assert analyze_stream(path, ["chars", "words", "readability"], jobs=2) == expected
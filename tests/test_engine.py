@@ -0,0 +1,101 @@
+from pathlib import Path
+
+import stats as S
+from bookbot.metrics.engine import METRICS, analyze_stream
+
+
+SAMPLE = """Call me Ishmael. Some years ago, never mind
+how long precisely! The whale; the white whale.
+Ahab's ship sailed on? Yes.
+"""
+
+
+def test_engine_single_pass_matches_individual_metrics(tmp_path: Path):
+    p = tmp_path / "s.txt"
+    p.write_text(SAMPLE, encoding="utf-8")
+    res = analyze_stream(p, METRICS, n=2, stopwords=S.STOPWORDS_EN)
+    assert res["num_words"] == S.get_num_words_whitespace_stream(str(p))
+    assert res["chars"] == S.count_chars_stream(str(p))
+    assert res["words"] == S.get_word_counts(SAMPLE, stopwords=S.STOPWORDS_EN)
+    assert res["ngrams"] == S.count_ngrams_stream(str(p), n=2, stopwords=S.STOPWORDS_EN)
+    assert res["categories"] == S.category_counts(SAMPLE)
+    assert res["readability"] == S.readability_metrics(SAMPLE)
+    assert res["vocab"] == S.vocabulary_metrics(SAMPLE, stopwords=S.STOPWORDS_EN)
+
+
+def test_engine_sentences_span_line_breaks(tmp_path: Path):
+    p = tmp_path / "s.txt"
+    p.write_text("One sentence\ncontinues here.\nTwo.   Three\n", encoding="utf-8")
+    res = analyze_stream(p, ["readability"])
+    assert res["readability"]["num_sentences"] == 3.0
+
+
+def test_engine_rejects_unknown_metric(tmp_path: Path):
+    p = tmp_path / "s.txt"
+    p.write_text("x", encoding="utf-8")
+    try:
+        analyze_stream(p, ["syllables"])
+        assert False, "expected ValueError"
+    except ValueError as e:
+        assert "syllables" in str(e)
+
+
+def test_ascii_byte_scan_matches_decoding_path(tmp_path: Path):
+    from bookbot.corpus import stream_normalized_lines
+    from bookbot.metrics.engine import Analyzer
+
+    p = tmp_path / "s.txt"
+    p.write_bytes(b"Ab c\r\nd\rE\x1cf\n\n  x.Y\r\n" * 3 + "café tail\n".encode("utf-8"))
+    for letters_only in (False, True):
+        fast = analyze_stream(p, ["num_words", "chars"], letters_only=letters_only)
+        slow = Analyzer(["num_words", "chars"], letters_only=letters_only)
+        slow.feed(stream_normalized_lines(p))
+        assert fast == slow.result()
+        assert list(fast["chars"]) == list(slow.result()["chars"])
+
+
+def test_readability_reuses_unfiltered_word_counts(tmp_path: Path):
+    from bookbot.metrics.engine import Analyzer
+    from bookbot.metrics.readability import _count_syllables
+
+    p = tmp_path / "s.txt"
+    p.write_text(SAMPLE * 5, encoding="utf-8")
+    assert Analyzer(["words", "readability"]).readability.words is None
+    assert Analyzer(["words", "readability"], stopwords=S.STOPWORDS_EN).readability.words is not None
+    _count_syllables.cache_clear()
+    shared = analyze_stream(p, ["words", "readability"])
+    assert shared["readability"] == S.readability_metrics(SAMPLE * 5)
+    assert _count_syllables.cache_info().currsize == len(shared["words"])
+
+
+def test_incremental_analysis_resumes_appended_files(tmp_path: Path):
+    from bookbot.cache import ResultCache
+    from bookbot.metrics.engine import _cache_options
+
+    p = tmp_path / "grow.txt"
+    cache = ResultCache(tmp_path / "cache", checkpoints=True)
+    metrics = ["num_words", "words", "ngrams", "readability"]
+    text = ""
+    # Appends (one ending mid-sentence, one mid-word), then a truncation
+    # and a same-length rewrite, which must fall back to a full recount.
+    for edit in ["Call me Ishmael. Some years", " ago, never mind\nhow long", " precisely! The wh", "ale.\n" + SAMPLE]:
+        text += edit
+        p.write_text(text, encoding="utf-8")
+        assert analyze_stream(p, metrics, cache=cache) == analyze_stream(p, metrics)
+    options = _cache_options(metrics, False, None, 2, None, False, 0, None, None)
+    offset = cache.get_checkpoint(p, options)[0]
+    assert offset == len(text.encode("utf-8"))
+    for text in [text[:40] + "\n", "X" + text[1:40] + "\n" + SAMPLE]:
+        p.write_text(text, encoding="utf-8")
+        assert analyze_stream(p, metrics, cache=cache) == analyze_stream(p, metrics)
+    # A same-length edit deep inside a large file, then an append.
+    text = SAMPLE * (300_000 // len(SAMPLE))
+    p.write_text(text, encoding="utf-8")
+    analyze_stream(p, metrics, cache=cache)
+    middle = text.index(" the ", len(text) // 2)
+    text = text[:middle] + " cat " + text[middle + 5 :]
+    for edit in ["", "More.\n"]:
+        text += edit
+        p.write_text(text, encoding="utf-8")
+        res = analyze_stream(p, metrics, cache=cache)
+        assert res == analyze_stream(p, metrics) and res["words"]["cat"] == 1
@@ -0,0 +1,108 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from bookbot.metrics.counts import merge_counts
+from bookbot.parallel import bounded_map, map_largest_first, plan_in_segments, plan_largest_first, tree_reduce, tree_reduce_stream
+
+
+def _merge(a, b):
+    return merge_counts(dict(a), b)
+
+
+def test_tree_reduce_matches_serial_fold_including_order():
+    parts = [{"a": 1, "b": 2}, {"c": 1}, {"b": 5, "d": 1}, {"e": 2, "a": 1}, {"f": 1}]
+    serial = {}
+    for p in parts:
+        merge_counts(serial, p)
+    with ThreadPoolExecutor(max_workers=3) as ex:
+        futs = [ex.submit(dict, p) for p in parts]
+        merged = tree_reduce(ex, futs, _merge)
+    assert merged == serial
+    assert list(merged) == list(serial)
+
+
+
+def test_tree_reduce_stream_merges_on_the_executor_in_order():
+    parts = [{chr(97 + (i * 7) % 11): i + 1, chr(97 + i % 5): 1} for i in range(13)]
+    serial = {}
+    for p in parts:
+        merge_counts(serial, p)
+    merges = []
+
+    def merge(a, b):
+        merges.append(threading.current_thread().name)
+        return _merge(a, b)
+
+    with ThreadPoolExecutor(max_workers=2, thread_name_prefix="pool") as ex:
+        merged = tree_reduce_stream(ex, iter(parts), merge)
+    assert merged == serial and list(merged) == list(serial)
+    assert len(merges) == len(parts) - 1 and all(name.startswith("pool") for name in merges)
+
+
+def test_byte_range_chunks_match_serial_counts(tmp_path):
+    from bookbot.corpus import split_byte_ranges
+    from bookbot.metrics.engine import METRICS, analyze_range, analyze_stream
+    from bookbot.parallel import map_byte_ranges
+
+    p = tmp_path / "s.txt"
+    p.write_text("One two.\nthree\n\nfour five six. Seven\r\neight!\n nine ten\nx\n", encoding="utf-8")
+    assert len(split_byte_ranges(p, 4, min_chunk=1)) == 4
+    metrics = list(METRICS) + ["ngrams3"]
+    serial = analyze_stream(p, metrics)
+    merged = map_byte_ranges(p, 4, analyze_range, metrics, False, None, 2, None, False, min_chunk=1).result()
+    for k, v in serial.items():
+        assert merged[k] == v
+        if isinstance(v, dict):
+            assert list(merged[k]) == list(v)
+
+
+def test_bounded_map_window_and_ordering():
+    lock = threading.Lock()
+    live = [0, 0]
+
+    def slow_square(x):
+        with lock:
+            live[0] += 1
+            live[1] = max(live[1], live[0])
+        time.sleep(0.02 if x == 0 else 0.001)
+        with lock:
+            live[0] -= 1
+        return x * x
+
+    with ThreadPoolExecutor(max_workers=4) as ex:
+        ordered = list(bounded_map(ex, slow_square, range(20), window=3))
+        unordered = list(bounded_map(ex, slow_square, range(20), window=3, ordered=False))
+    assert ordered == [x * x for x in range(20)]
+    assert sorted(unordered) == ordered and unordered[0] != 0
+    assert live[1] <= 3
+
+
+def test_largest_first_plan_batches_small_files_and_keeps_output_order():
+    paths = ["a", "b", "c", "d", "e"]
+    sizes = [10, 5000, 20, 300, 7000]
+    units = plan_largest_first(paths, sizes, small_bytes=100, batch_bytes=25, batch_files=8)
+    assert units == [[(4, "e")], [(1, "b")], [(3, "d")], [(2, "c"), (0, "a")]]
+    with ThreadPoolExecutor(max_workers=2) as ex:
+        out = list(map_largest_first(ex, str.upper, paths, window=2))
+    assert out == ["A", "B", "C", "D", "E"]
+
+
+def test_ordered_largest_first_output_does_not_run_ahead():
+    # Sizes grow with the index, so a single largest-first plan would put
+    # path 0 last and hold every other result until the end.
+    paths = [f"p{i:03}" for i in range(200)]
+    sizes = [(i + 1) << 20 for i in range(200)]
+    started = []
+
+    def task(path):
+        started.append(path)
+        return path
+
+    with ThreadPoolExecutor(max_workers=2) as ex:
+        out = map_largest_first(ex, task, paths, window=4, sizes=sizes)
+        assert next(out) == "p000" and len(started) <= 4
+        assert [next(out) for _ in range(99)] == paths[1:100] and len(started) <= 104
+        assert list(out) == paths[100:]
+    units = list(plan_in_segments(paths, [s // 1024 for s in sizes], 3, small_bytes=2048, batch_bytes=4096))
+    assert sorted(i for unit in units for i, _ in unit) == list(range(200))
@@ -0,0 +1,70 @@
+import json
+import os
+import threading
+from pathlib import Path
+
+import pytest
+
+from bookbot.cli import build_parser, run_args
+from bookbot.client import TOKEN_HEADER, Client, _UnixHTTPConnection, token_path
+from bookbot.server import _Daemon, _Handler, _UnixHTTPServer, command_argv, write_token
+
+
+def test_command_argv_maps_fields_to_flags():
+    argv = command_argv("chars", {"paths": ["a", "b"], "top": 5, "letters_only": True, "ascii_only": False, "include": ["*.txt", "*.md"]})
+    assert argv == ["chars", "a", "b", "--top", "5", "--letters-only", "--include", "*.txt", "--include", "*.md"]
+
+
+def test_daemon_answers_like_the_cli(tmp_path: Path, capsys):
+    book = tmp_path / "book.txt"
+    book.write_text("The whale, the white whale. Call me Ishmael.\n", encoding="utf-8")
+    argv = ["words", "book.txt", "--top", "2", "--format", "json", "--cache-dir", str(tmp_path / "cache")]
+    sock = str(tmp_path / "bookbot.sock")
+    daemon = _Daemon(build_parser(), run_args, jobs=1, memory_entries=8, token="s3cret")
+    write_token(token_path(sock), "s3cret")
+    server = _UnixHTTPServer(sock, _Handler)
+    server.daemon = daemon
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        client = Client(sock)
+        res = client.run(argv, cwd=str(tmp_path))
+        assert res["exit"] == 0
+        run_args(build_parser().parse_args(argv[:1] + [str(book)] + argv[2:]))
+        local = json.loads(capsys.readouterr().out)
+        local["files"][0]["path"] = "book.txt"
+        assert json.loads(res["stdout"]) == local
+        assert client.call("words", paths=["book.txt"], top=2, cwd=str(tmp_path))["files"] == local["files"]
+        responses = client.batch([{"command": "nope"}, {"argv": ["chars", "missing.txt"], "cwd": str(tmp_path)}, {"argv": []}])
+        assert [r["status"] for r in responses] == [404, 200, 200]
+        assert responses[1]["exit"] == 1 and "no files" in responses[1]["stderr"]
+        assert responses[2]["exit"] == 1 and responses[2]["stdout"].startswith("usage: bookbot")
+        assert client.status()["requests"] == 4
+        refused = client.batch(
+            [
+                {"argv": ["words", "book.txt", "--out", "x.json"]},
+                {"argv": ["cache", "clear", "--cache-dir", "."]},
+                {"argv": ["compare", "book.txt", "-"]},
+            ]
+        )
+        assert [r["status"] for r in refused] == [403, 403, 403] and not (tmp_path / "x.json").exists()
+        with pytest.raises(ValueError, match="standard input"):
+            client.call("words", paths=["-"], cwd=str(tmp_path))
+        with pytest.raises(ValueError, match="out-dir"):
+            client.call("analyze", paths=["book.txt"], out_d="reports", cwd=str(tmp_path))
+        body = json.dumps({"argv": ["words", "book.txt"]})
+        for headers, status in [
+            ({}, 401),
+            ({TOKEN_HEADER: "guess", "Content-Type": "application/json"}, 401),
+            ({TOKEN_HEADER: "s3cret", "Content-Type": "text/plain"}, 415),
+            ({TOKEN_HEADER: "s3cret", "Content-Type": "application/json", "Origin": "http://example.com"}, 403),
+        ]:
+            conn = _UnixHTTPConnection(sock)
+            conn.request("POST", "/v1/run", body=body, headers=headers)
+            assert conn.getresponse().status == status
+            conn.close()
+        assert oct(os.stat(token_path(sock)).st_mode & 0o777) == "0o600"
+    finally:
+        server.shutdown()
+        server.server_close()
+        daemon.close()
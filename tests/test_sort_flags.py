@@ -45,3 +45,15 @@ def test_compare_sort_by_word_key():
     # Just ensure command accepted and returned correct structure
     assert data["command"] == "compare"
     assert data["type"] == "words"
+
+
+def test_rank_counts_top_k_matches_full_sort_with_ties():
+    from bookbot.metrics.counts import rank_counts
+
+    counts = {"b": 2, "a": 1, "d": 2, "c": 1, "e": 3}
+    for sort_by in ("count", "word"):
+        for desc in (True, False):
+            full = rank_counts(counts, "word", sort_by, desc)
+            assert rank_counts(counts, "word", sort_by, desc, top=3) == full[:3]
+    assert [it["word"] for it in rank_counts(counts, "word", top=3)] == ["e", "b", "d"]
+    assert [it["word"] for it in rank_counts(counts, "word", desc=False, top=3)] == ["a", "c", "b"]
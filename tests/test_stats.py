@@ -68,3 +68,148 @@ def test_category_counts_sums():
     total = sum(m.values())
     assert total == len(SAMPLE)
 
+
+
+def test_stream_metrics_match_whole_text(tmp_path):
+    p = tmp_path / "s.txt"
+    text = "First sentence spans\ntwo lines. Second!\n\nThird one?  Yes.\n"
+    p.write_text(text, encoding="utf-8")
+    assert S.readability_metrics_stream(p) == S.readability_metrics(text)
+    assert S.vocabulary_metrics_stream(p, S.STOPWORDS_EN) == S.vocabulary_metrics(text, S.STOPWORDS_EN)
+    assert S.category_counts_stream(p) == S.category_counts(text)
+
+
+def test_ngram_counts_packed_keys_read_like_tuples():
+    import pickle
+
+    c = S.count_ngrams("a b a b c", n=2)
+    assert dict(c.items()) == {("a", "b"): 2, ("b", "a"): 1, ("b", "c"): 1}
+    assert c[("a", "b")] == 2 and ("c", "a") not in c
+    assert pickle.loads(pickle.dumps(c)) == c
+    assert S.sort_ngrams(c, top=1) == [{"ngram": "a b", "num": 2}]
+
+
+def test_skip_grams_count_every_shape_once():
+    c = S.count_ngrams("a b c d", n=2, skip=1)
+    assert dict(c.items()) == {("a", "b"): 1, ("b", "c"): 1, ("a", "c"): 1, ("c", "d"): 1, ("b", "d"): 1}
+    assert len(S.count_ngrams("a b c d e f", n=5)) == 2
+    assert dict(S.count_ngrams("a b a", n=1).items()) == {("a",): 2, ("b",): 1}
+
+
+def test_skip_grams_carry_short_lines_like_one_stream():
+    from collections import Counter
+    from itertools import combinations
+
+    from bookbot.metrics.counts import NgramCounter
+
+    lines = [["the", "whale"], ["swam", "far", "away"], ["a"], ["b"], [], ["c"], ["d", "e"], ["f"]]
+    stream = [t for line in lines for t in line]
+    for n, skip in ((2, 0), (3, 0), (2, 1), (2, 2), (3, 1)):
+        span = n + skip
+        truth = Counter()
+        for end in range(len(stream)):
+            window = stream[max(0, end - span + 1) : end + 1]
+            for rest in combinations(range(len(window) - 1), n - 1):
+                truth[tuple(window[i] for i in rest) + (window[-1],)] += 1
+        serial = NgramCounter(n, skip=skip)
+        for line in lines:
+            serial.update(line)
+        assert Counter(dict(serial.result().items())) == truth, (n, skip)
+        # Chunks starting mid-stream do not know their left context.
+        for cut in range(1, len(lines)):
+            for cut2 in range(cut, len(lines) + 1):
+                parts = [NgramCounter(n, skip=skip), NgramCounter(n, skip=skip, detached=True)]
+                parts.append(NgramCounter(n, skip=skip, detached=True))
+                for i, line in enumerate(lines):
+                    parts[(i >= cut) + (i >= cut2)].update(line)
+                merged = parts[0].merge(parts[1].merge(parts[2]))
+                assert Counter(dict(merged.result().items())) == truth, (n, skip, cut, cut2)
+
+
+def test_lossy_ngram_counts_report_honest_bounds(tmp_path):
+    from collections import Counter
+
+    p = tmp_path / "s.txt"
+    words = [a + b for a in "abcdefghijklmnopqrst" for b in "abcdefghijklmnopqrst"]
+    lines = [f"common pair {w} {w}x\n" for w in words]
+    p.write_text("".join(lines), encoding="utf-8")
+    exact = S.count_ngrams_stream(str(p), n=2)
+    lossy = S.count_ngrams_stream(str(p), n=2, epsilon=0.05)
+    assert lossy.total == sum(exact.values()) and 0 < lossy.floor <= 0.05 * lossy.total
+    assert len(lossy) < len(exact)
+    truth = Counter(dict(exact.items()))
+    for key, num in lossy.packed.items():
+        gram = lossy.decode(key)
+        assert num <= truth[gram] <= num + lossy.error(key)
+    assert all(num <= lossy.floor for gram, num in truth.items() if gram not in lossy)
+
+
+def test_space_saving_word_counts_merge_with_bounds(tmp_path):
+    from collections import Counter
+
+    from bookbot.metrics.counts import merge_packed_counts, rank_rows
+
+    words = [a + b for a in "abcdefghijklmnopqrst" for b in "abcdefghijklmnopqrst"]
+    halves = []
+    for i in range(2):
+        p = tmp_path / f"{i}.txt"
+        p.write_text("".join(f"whale {w} ahab whale\n" for w in words[i::2]), encoding="utf-8")
+        halves.append(p)
+    truth = Counter()
+    for p in halves:
+        truth.update(S.get_word_counts_stream(str(p)))
+    approx = [S.get_word_counts_stream(str(p), approx=5) for p in halves]
+    merged = merge_packed_counts(approx[0], approx[1])
+    assert len(merged) <= 5 and merged.total == sum(truth.values())
+    assert rank_rows(merged, top=2) == ([("whale", 800), ("ahab", 400)], [0, 0])
+    for word, num in truth.items():
+        if word in merged:
+            assert merged[word] <= num <= merged[word] + merged.error(word)
+        else:
+            assert num <= merged.floor
+
+
+def test_space_saving_memory_scales_with_capacity():
+    from bookbot.metrics.counts import WordCounter
+
+    counter = WordCounter(capacity=100)
+    held = 0
+    for i in range(5000):
+        counter.update([f"w{i}", "whale"])
+        held = max(held, len(counter._counts))
+    assert held <= 100 + 1024 + 2
+    assert len(counter.result()) == 100
+
+def test_category_counts_classify_each_distinct_char_like_per_char_checks():
+    import string
+    import unicodedata
+
+    text = "Ahab SAW 3 whales—½ ① ² «Ǆ» ǅ   ∑ €, ’tis!\t\x00́"
+    expected = dict.fromkeys(["uppercase", "lowercase", "digits", "punctuation", "whitespace", "other"], 0)
+    for ch in text:
+        if ch.isupper():
+            expected["uppercase"] += 1
+        elif ch.islower():
+            expected["lowercase"] += 1
+        elif ch.isdigit():
+            expected["digits"] += 1
+        elif ch.isspace():
+            expected["whitespace"] += 1
+        elif unicodedata.category(ch).startswith("P") or ch in string.punctuation:
+            expected["punctuation"] += 1
+        else:
+            expected["other"] += 1
+    assert S.category_counts(text) == expected
+    assert S.category_counts(text * 3) == {k: v * 3 for k, v in expected.items()}
+
+
+def test_readability_streams_from_stdin_in_bounded_chunks(monkeypatch):
+    import io
+
+    import bookbot.metrics.readability as R
+
+    text = "Call me Ishmael.  Some years\nago! Never mind how long.\n\nPrecisely?Yes. " * 40
+    monkeypatch.setattr(R, "WORD_TABLE_LIMIT", 3)
+    monkeypatch.setattr("sys.stdin", io.TextIOWrapper(io.BytesIO(text.encode("utf-8"))))
+    assert S.readability_metrics_stream("-") == S.readability_metrics(text)
+    assert S.readability_metrics(text)["num_sentences"] == 40 * 4
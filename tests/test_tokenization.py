@@ -1,6 +1,6 @@
 from pathlib import Path
 
-from bookbot.utils.tokenization import prepare_text_chunk, iter_words
+from bookbot.utils.tokenization import Tokenizer, prepare_text_chunk, iter_words
 from bookbot.corpus import stream_normalized_lines
 from bookbot.metrics.counts import count_chars_stream
 
@@ -36,3 +36,10 @@ def test_chars_ascii_only_vs_unicode(tmp_path: Path):
     # After ascii_only with NFKD, diacritics dropped -> 'e' increases
     assert counts2.get("é", 0) == 0
     assert counts2.get("e", 0) >= 3
+
+
+def test_tokenizer_batches_lines_and_filters_stopwords():
+    lines = ["The whale's tail,", "", "AND the 'sea'\n"]
+    assert Tokenizer().tokenize_lines(lines) == [list(iter_words(line)) for line in lines]
+    assert Tokenizer({"the", "and"}).tokenize_lines(lines) == [["whale's", "tail"], [], ["sea"]]
+    assert Tokenizer({"the"}).tokenize(" ".join(lines)) == ["whale's", "tail", "and", "sea"]
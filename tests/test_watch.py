@@ -0,0 +1,38 @@
+from pathlib import Path
+
+import stats as S
+from bookbot.metrics.engine import analyze_stream
+from bookbot.watch import FileState, Watcher, watch_results
+
+METRICS = ["num_words", "chars", "words", "ngrams", "readability", "vocab"]
+
+
+def test_file_state_reuses_unchanged_chunks(tmp_path: Path, monkeypatch):
+    import bookbot.watch as W
+
+    monkeypatch.setattr(W, "MIN_CHUNK_BYTES", 64)
+    monkeypatch.setattr(W, "CHUNK_BITS", 1)
+    p = tmp_path / "ch.txt"
+    lines = [f"Line {i} of the chapter. It goes on, and on!\n" for i in range(400)]
+    state = FileState(METRICS, stopwords=S.STOPWORDS_EN)
+    for edit in [None, 10, 200, 399]:
+        if edit is not None:
+            lines[edit] = "An edited line\r\nsplit in two. "
+        data = "".join(lines).encode("utf-8")
+        p.write_bytes(data)
+        assert state.update(data) == analyze_stream(p, METRICS, stopwords=S.STOPWORDS_EN)
+    assert len(state.chunks) > 4 and state.reused >= len(state.chunks) - 3
+
+
+def test_watch_results_reports_changes(tmp_path: Path):
+    a = tmp_path / "a.txt"
+    b = tmp_path / "b.txt"
+    a.write_text("One two.\n", encoding="utf-8")
+    b.write_text("Three.\n", encoding="utf-8")
+    watcher = Watcher([tmp_path], use_inotify=False, poll=0.01)
+    results = watch_results(watcher, ["num_words"])
+    assert sorted((Path(p).name, r["num_words"]) for p, r in [next(results), next(results)]) == [("a.txt", 2), ("b.txt", 1)]
+    a.write_text("One two three four.\n", encoding="utf-8")
+    assert next(results) == (str(a), {"num_words": 4})
+    b.unlink()
+    assert next(results) == (str(b), None)